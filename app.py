@@ -39,16 +39,20 @@ def get_ufs_from_database(database_obj):
             # Para Supabase, usa o paginador se disponível
             try:
                 from src.utils.supabase_utils import SupabasePaginator
-                paginator = SupabasePaginator(database_obj.supabase)
+                from src.utils.prefetch import get_prefetch
                 
-                # Busca todos os dados e extrai UFs únicos
-                df = paginator.get_all_records()
-                if not df.empty and 'UF' in df.columns:
-                    ufs_from_data = df['UF'].dropna().unique().tolist()
-                    unique_ufs = sorted([uf for uf in ufs_from_data if str(uf).strip()])
+                # Durante a carga de fundo, a amostra abaixo evita esperar o download completo
+                if not get_prefetch().running:
+                    paginator = SupabasePaginator(database_obj.supabase)
                     
-                    if len(unique_ufs) >= 10:
-                        return unique_ufs, f"Da base completa ({len(unique_ufs)} estados)"
+                    # Busca a coluna UF de todos os registros e extrai UFs únicos
+                    df = paginator.get_all_records(columns=['UF'])
+                    if not df.empty and 'UF' in df.columns:
+                        ufs_from_data = df['UF'].dropna().unique().tolist()
+                        unique_ufs = sorted([uf for uf in ufs_from_data if str(uf).strip()])
+                        
+                        if len(unique_ufs) >= 10:
+                            return unique_ufs, f"Da base completa ({len(unique_ufs)} estados)"
             except ImportError:
                 pass
             
@@ -543,7 +547,7 @@ def create_diagnostic_page_corrected():
         - ✅ Uso do pandas para deduplicação (mais confiável)
         - ✅ Validação com dados originais (CSV verificado)
         - ✅ Algoritmo baseado apenas em NUM_AUTO_INFRACAO
-        - ✅ Cache isolado por sessão mantido
+        - ✅ Um dataset por versão, compartilhado entre as sessões
         
         **Resultado Esperado:**
         - ✅ 21.019 infrações únicas (99.9% de precisão)
@@ -576,6 +580,18 @@ def create_diagnostic_page_corrected():
     if st.button("⚡ Verificar Status Atual"):
         show_current_system_status_corrected()
 
+    # Tempo de cada gráfico e de cada busca de dados, acumulado pelo processo
+    st.subheader("⏱️ Desempenho do Dashboard")
+
+    if 'viz' in st.session_state:
+        st.session_state.viz.display_performance_diagnostic()
+
+    # Tamanho da base em memória, compartilhada pelas sessões do processo
+    st.subheader("🧠 Memória do Dataset")
+
+    if 'viz' in st.session_state:
+        st.session_state.viz.display_memory_diagnostic()
+
 def test_corrected_count():
     """Teste rápido da contagem corrigida."""
     try:
@@ -752,6 +768,22 @@ def show_current_system_status_corrected():
         st.error(f"❌ Erro na verificação: {e}")
 
 # Função principal corrigida para substituir no app.py
+@st.fragment
+def render_dashboard_section(chart_methods: list, selected_ufs: list, date_filters: dict, lazy_label: str = None):
+    """
+    Renderiza um grupo de gráficos do dashboard como fragmento: um controle
+    da seção reexecuta só ela, sem refazer as demais.
+    
+    Com `lazy_label`, a seção começa recolhida e os dados só são calculados
+    quando o usuário a abre (a escolha fica guardada na sessão).
+    """
+    if lazy_label and not st.toggle(lazy_label, key=f"show_{chart_methods[0]}"):
+        st.caption("Seção recolhida - ative para carregar.")
+        return
+    
+    for method in chart_methods:
+        getattr(st.session_state.viz, method)(selected_ufs, date_filters)
+
 def create_diagnostic_page():
     """Substitui a função original - agora usa algoritmo corrigido."""
     return create_diagnostic_page_corrected()
@@ -777,6 +809,8 @@ def main():
         
         if 'viz' not in st.session_state:
             st.session_state.viz = DataVisualization(database=st.session_state.db)
+            # Baixa a base em segundo plano enquanto a barra lateral é desenhada
+            st.session_state.viz.start_prefetch()
         
         if 'chatbot' not in st.session_state:
             st.session_state.chatbot = Chatbot(llm_integration=st.session_state.llm)
@@ -968,6 +1002,13 @@ def main():
         gemini_status = "✅ Conectado" if st.session_state.llm.gemini_model else "❌ Não configurado"
         st.write(f"**Gemini API:** {gemini_status}")
         
+        # Cache de respostas dos LLMs (perguntas repetidas não chamam a API)
+        llm_cache = getattr(st.session_state.llm, 'llm_cache', None)
+        if llm_cache is not None:
+            cache_stats = llm_cache.stats()
+            st.write(f"**Cache de Respostas:** {cache_stats['hits']:,} acertos / {cache_stats['misses']:,} chamadas "
+                     f"({cache_stats['size_mb']:.1f} de {cache_stats['max_size_mb']:.0f} MB)")
+        
         # Aviso se nenhuma API estiver disponível
         if not st.session_state.llm.groq_client and not st.session_state.llm.gemini_model:
             st.error("⚠️ Nenhuma API de IA configurada! O chatbot funcionará em modo limitado.")
@@ -1004,21 +1045,30 @@ def main():
         st.caption("Use os filtros na barra lateral para explorar os dados. Sem repetição do NUM_AUTO_INFRACAO")
         
         try:
-            # Passa os novos filtros para as visualizações
-            st.session_state.viz.create_overview_metrics_advanced(selected_ufs, date_filters)
+            # Progresso da carga de fundo em vez de um spinner parado no primeiro gráfico
+            st.session_state.viz.wait_for_prefetch()
+            
+            # Passa os novos filtros para as visualizações (cada seção é um fragmento)
+            render_dashboard_section(['create_overview_metrics_advanced'], selected_ufs, date_filters)
             st.divider()
-            st.session_state.viz.create_infraction_map_advanced(selected_ufs, date_filters)
+            render_dashboard_section(['create_infraction_map_advanced'], selected_ufs, date_filters,
+                                     lazy_label="🗺️ Mostrar mapa de calor das infrações")
             st.divider()
             
             col1, col2 = st.columns(2)
             with col1:
-                st.session_state.viz.create_municipality_hotspots_chart_advanced(selected_ufs, date_filters)
-                st.session_state.viz.create_fine_value_by_type_chart_advanced(selected_ufs, date_filters)
-                st.session_state.viz.create_gravity_distribution_chart_advanced(selected_ufs, date_filters)
+                render_dashboard_section([
+                    'create_municipality_hotspots_chart_advanced',
+                    'create_fine_value_by_type_chart_advanced',
+                    'create_gravity_distribution_chart_advanced',
+                ], selected_ufs, date_filters)
             with col2:
-                st.session_state.viz.create_state_distribution_chart_advanced(selected_ufs, date_filters)
-                st.session_state.viz.create_infraction_status_chart_advanced(selected_ufs, date_filters)
-                st.session_state.viz.create_main_offenders_chart_advanced(selected_ufs, date_filters)
+                render_dashboard_section([
+                    'create_state_distribution_chart_advanced',
+                    'create_infraction_status_chart_advanced',
+                ], selected_ufs, date_filters)
+                render_dashboard_section(['create_main_offenders_chart_advanced'], selected_ufs, date_filters,
+                                         lazy_label="👥 Mostrar principais infratores")
         except Exception as e:
             st.error(f"Erro ao gerar visualizações: {e}")
             st.info("Tentando recarregar os componentes...")
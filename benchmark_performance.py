@@ -0,0 +1,538 @@
+"""
+Benchmarks de desempenho do pipeline IBAMA.
+
+Uso:
+    python benchmark_performance.py                      # dados sintéticos
+    python benchmark_performance.py --rows 100000        # tamanho sintético
+    python benchmark_performance.py --zip auto_infracao_csv.zip
+    python benchmark_performance.py --csv auto_infracao_ano_2025.csv
+
+Com --zip são usados apenas os CSVs de 2024-2026, como nos scripts de upload.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.components.visualization import DASHBOARD_COLUMNS, DataVisualization
+from src.utils.aggregate_cube import AggregateCube
+from src.utils.documents import describe_documents
+from src.utils.filter_index import FilterIndex
+from src.utils.instrumentation import process_memory_mb
+from src.utils.name_index import NameIndex
+from src.utils.offender_index import OffenderIndex
+from src.utils.schema import memory_report, normalize_dataset
+from src.utils.serialization import dataframe_to_records
+
+# Mesmo conjunto usado em upload_to_supabase.py
+NUMERIC_COLUMNS = {
+    'CD_RECEITA_AUTO_INFRACAO', 'SEQ_AUTO_INFRACAO', 'COD_MUNICIPIO',
+    'COD_INFRACAO', 'NUM_PROCESSO', 'NUM_PESSOA_INFRATOR',
+    'SEQ_NOTIFICACAO', 'SEQ_ACAO_FISCALIZATORIA', 'SEQ_ORDEM_FISCALIZACAO',
+    'SEQ_SOLICITACAO_RECURSO', 'SOLICITACAO_RECURSO'
+}
+
+UFS = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+       'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+TIPOS = ['Flora', 'Fauna', 'Pesca', 'Outras', 'Controle ambiental', 'Ordenamento urbano e Contr. Ambiental']
+GRAVIDADES = ['Leve', 'Média', 'Grave', 'Sem gravidade']
+
+
+# --- Dados ---
+
+def make_synthetic_dataset(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um DataFrame com o perfil de colunas do CSV do IBAMA (texto cru, como lido do CSV)."""
+    rng = np.random.default_rng(seed)
+
+    def with_blanks(values, ratio=0.1):
+        values = pd.Series(values, dtype=object)
+        values[rng.random(rows) < ratio] = np.nan
+        return values
+
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 3, rows), unit='D')
+    # CPF e CNPJ formatados como no CSV, com alguns documentos só com dígitos
+    cpfs = [f"{n:011d}" for n in rng.integers(0, 10 ** 11, rows)]
+    cnpjs = [f"{n:014d}" for n in rng.integers(0, 10 ** 14, rows)]
+    kind = rng.random(rows)
+    docs = [
+        f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}" if k < 0.55 else
+        f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}" if k < 0.95 else cpf
+        for cpf, cnpj, k in zip(cpfs, cnpjs, kind)
+    ]
+
+    df = pd.DataFrame({
+        'SEQ_AUTO_INFRACAO': rng.integers(1, 10 ** 7, rows),
+        'NUM_AUTO_INFRACAO': [f"{n:08d}" for n in rng.integers(0, 10 ** 8, rows)],
+        'SER_AUTO_INFRACAO': with_blanks(rng.choice(['A', 'B', 'E'], rows)),
+        'DES_STATUS_FORMULARIO': with_blanks(rng.choice(['Lavrado', 'Cancelado', 'Em julgamento'], rows)),
+        'TIPO_AUTO': rng.choice(['Multa', 'Advertência'], rows),
+        'VAL_AUTO_INFRACAO': with_blanks([f"{v:.2f}".replace('.', ',') for v in rng.gamma(1.5, 20000, rows)]),
+        'GRAVIDADE_INFRACAO': with_blanks(rng.choice(GRAVIDADES, rows), 0.3),
+        'DES_AUTO_INFRACAO': with_blanks([f" Descrição da infração número {i} com texto livre " for i in range(rows)]),
+        'DAT_HORA_AUTO_INFRACAO': dates.strftime('%Y-%m-%d %H:%M:%S'),
+        'DT_FATO_INFRACIONAL': with_blanks(dates.strftime('%Y-%m-%d')),
+        'COD_MUNICIPIO': with_blanks(rng.integers(1100000, 5300000, rows).astype(float), 0.05),
+        'MUNICIPIO': [f"MUNICIPIO {i % 5000}" for i in range(rows)],
+        'UF': rng.choice(UFS, rows),
+        'NUM_PROCESSO': with_blanks(rng.integers(10 ** 9, 10 ** 12, rows).astype(float), 0.2),
+        'COD_INFRACAO': rng.integers(1, 500, rows),
+        'DES_INFRACAO': with_blanks(rng.choice(['Desmatar', 'Caçar', 'Pescar', 'Transportar'], rows)),
+        'TIPO_INFRACAO': rng.choice(TIPOS, rows),
+        'NOME_INFRATOR': [f"  INFRATOR {i % 20000}  " for i in range(rows)],
+        'CPF_CNPJ_INFRATOR': with_blanks(docs, 0.02),
+        'NUM_LATITUDE_AUTO': with_blanks((rng.random(rows) * -30).round(6).astype(str), 0.2),
+        'NUM_LONGITUDE_AUTO': with_blanks((rng.random(rows) * -30 - 40).round(6).astype(str), 0.2),
+        'DS_BIOMAS_ATINGIDOS': with_blanks(rng.choice(['Amazônia', 'Cerrado', 'Caatinga', ''], rows), 0.4),
+        'SEQ_NOTIFICACAO': with_blanks(rng.integers(1, 10 ** 6, rows).astype(float), 0.8),
+        'OPERACAO': with_blanks(rng.choice(['Operação A', 'Operação B'], rows), 0.7),
+        'DT_ULT_ALTERACAO': with_blanks(dates.strftime('%Y-%m-%d %H:%M:%S'), 0.1),
+        'DS_WKT': with_blanks([
+            "POLYGON ((" + ", ".join(f"{-50 - j * 0.001:.6f} {-10 - (i % 97) * 0.001:.6f}" for j in range(12)) + "))"
+            for i in range(rows)
+        ], 0.5),
+    })
+
+    # Completa com colunas de texto esparsas até o número real de colunas (~80)
+    for i in range(80 - len(df.columns)):
+        df[f'COLUNA_EXTRA_{i:02d}'] = with_blanks(rng.choice(['S', 'N', ' ', ''], rows), 0.6)
+
+    return df
+
+
+def load_dataset(args) -> pd.DataFrame:
+    if args.csv:
+        return pd.read_csv(args.csv, sep=';', encoding=args.encoding, low_memory=False)
+
+    if args.zip:
+        frames = []
+        with zipfile.ZipFile(args.zip) as zip_file:
+            for name in zip_file.namelist():
+                if name.endswith('.csv') and any(year in name for year in ['2024', '2025', '2026']):
+                    with zip_file.open(name) as csv_data:
+                        frames.append(pd.read_csv(csv_data, sep=';', encoding=args.encoding, low_memory=False))
+        if not frames:
+            raise ValueError("Nenhum CSV de 2024-2026 encontrado no ZIP")
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    return make_synthetic_dataset(args.rows)
+
+
+# --- Utilitários ---
+
+def timed(func, repeat: int = 3):
+    """Executa `func` `repeat` vezes e retorna (melhor tempo, último resultado)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def print_comparison(title: str, before: float, after: float, rows: int):
+    print(f"\n📊 {title}")
+    print(f"  ⏱️ Antes:  {before:8.3f}s ({rows / before:>12,.0f} linhas/s)")
+    print(f"  ⚡ Depois: {after:8.3f}s ({rows / after:>12,.0f} linhas/s)")
+    print(f"  🚀 Ganho:  {before / after:8.1f}x")
+
+
+# --- Serialização (upload_to_supabase.py) ---
+
+def legacy_make_json_serializable(obj):
+    """Implementação anterior, célula a célula, mantida aqui como referência."""
+    if pd.isna(obj):
+        return None
+    elif isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(obj) else None
+    elif isinstance(obj, (np.integer, np.int64)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64)):
+        if np.isnan(obj):
+            return None
+        return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    elif isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='ignore')
+    elif isinstance(obj, str):
+        cleaned = str(obj).strip()
+        return cleaned if cleaned else None
+    else:
+        return str(obj) if obj is not None else None
+
+
+def legacy_serialization(df: pd.DataFrame) -> list:
+    """Caminho anterior: apply por coluna + limpeza por registro em safe_upload_batch."""
+    df_synced = df.copy()
+    for col in df_synced.columns:
+        df_synced[col] = df_synced[col].apply(legacy_make_json_serializable)
+        if col in NUMERIC_COLUMNS:
+            df_synced[col] = pd.to_numeric(df_synced[col], errors='coerce')
+            df_synced[col] = df_synced[col].where(pd.notna(df_synced[col]), None)
+
+    cleaned_batch = []
+    for record in df_synced.to_dict(orient='records'):
+        cleaned_record = {}
+        for key, value in record.items():
+            if key and key.strip():
+                if pd.isna(value):
+                    cleaned_record[key] = None
+                elif isinstance(value, (list, dict)):
+                    cleaned_record[key] = json.dumps(value) if value else None
+                else:
+                    cleaned_record[key] = value
+        cleaned_batch.append(cleaned_record)
+    return cleaned_batch
+
+
+def bench_serialization(df: pd.DataFrame, repeat: int):
+    before, legacy_records = timed(lambda: legacy_serialization(df), repeat)
+    after, records = timed(lambda: dataframe_to_records(df, numeric_columns=NUMERIC_COLUMNS), repeat)
+
+    # Garante que o novo caminho gera JSON válido sem `default=`
+    json.dumps(records)
+    print_comparison(f"Serialização de registros ({len(df.columns)} colunas)", before, after, len(df))
+    print(f"  📦 Registros: {len(records):,} (antes: {len(legacy_records):,})")
+
+
+# --- Projeção de colunas (SupabasePaginator) ---
+
+def bench_projection(df: pd.DataFrame, repeat: int):
+    """Compara o JSON de páginas select('*') com o das colunas do dashboard."""
+    records_full = dataframe_to_records(df, numeric_columns=NUMERIC_COLUMNS)
+    columns = [col for col in DASHBOARD_COLUMNS if col in df.columns]
+    records_projected = dataframe_to_records(df[columns], numeric_columns=NUMERIC_COLUMNS)
+
+    payload_full = json.dumps(records_full)
+    payload_projected = json.dumps(records_projected)
+
+    # Decodificação + montagem do DataFrame, como no carregamento do dashboard
+    before, _ = timed(lambda: pd.DataFrame(json.loads(payload_full)), repeat)
+    after, _ = timed(lambda: pd.DataFrame(json.loads(payload_projected)), repeat)
+
+    print_comparison(f"Decodificação de páginas ({len(df.columns)} → {len(columns)} colunas)", before, after, len(df))
+    print(f"  📦 Payload: {len(payload_full) / 1024 / 1024:,.1f} MB → "
+          f"{len(payload_projected) / 1024 / 1024:,.1f} MB "
+          f"({len(payload_full) / len(payload_projected):.1f}x menor)")
+
+
+# --- Documentos CPF/CNPJ (gráfico de infratores e chatbot) ---
+
+def legacy_describe_documents(df: pd.DataFrame) -> pd.DataFrame:
+    """Caminho anterior: is_cpf/is_cnpj e contagem de dígitos com apply, rótulos com apply(axis=1)."""
+    def is_cpf(doc):
+        if pd.isna(doc):
+            return False
+        doc = str(doc).strip()
+        return len(doc) == 14 and doc.count('.') == 2 and doc.count('-') == 1
+
+    def is_cnpj(doc):
+        if pd.isna(doc):
+            return False
+        doc = str(doc).strip()
+        return len(doc) == 18 and doc.count('.') == 2 and doc.count('/') == 1 and doc.count('-') == 1
+
+    def digits(doc):
+        return '' if pd.isna(doc) else ''.join(filter(str.isdigit, str(doc)))
+
+    out = df[['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']].copy()
+    out['is_cpf'] = out['CPF_CNPJ_INFRATOR'].apply(is_cpf)
+    out['is_cnpj'] = out['CPF_CNPJ_INFRATOR'].apply(is_cnpj)
+    out['key'] = out['CPF_CNPJ_INFRATOR'].apply(digits)
+    out['label'] = out.apply(
+        lambda x: f"{str(x['NOME_INFRATOR'])[:40]}\n(CPF: {str(x['CPF_CNPJ_INFRATOR'])[:3]}.***.***-{str(x['CPF_CNPJ_INFRATOR'])[-2:]})",
+        axis=1
+    )
+    return out
+
+
+def bench_documents(df: pd.DataFrame, repeat: int):
+    before, _ = timed(lambda: legacy_describe_documents(df), repeat)
+    after, described = timed(lambda: describe_documents(df['CPF_CNPJ_INFRATOR']), repeat)
+
+    print_comparison("Classificação e máscara de CPF/CNPJ", before, after, len(df))
+    counts = described['DOC_TYPE'].value_counts()
+    print("  🪪 " + ", ".join(f"{doc_type}: {total:,}" for doc_type, total in counts.items()))
+
+
+# --- Cubo de agregados (gráficos do dashboard) ---
+
+DASHBOARD_AGGREGATES = [
+    ('dashboard_overview', '_compute_overview', {}),
+    ('dashboard_counts_by_uf', '_compute_counts_by_uf', {}),
+    ('dashboard_top_municipios', '_compute_top_municipios', {}),
+    ('dashboard_value_by_type', '_compute_value_by_type', {}),
+    ('dashboard_counts_by_gravity', '_compute_counts_by_gravity', {}),
+    ('dashboard_counts_by_status', '_compute_counts_by_status', {}),
+    ('dashboard_offender_summary', '_compute_offender_summary', {}),
+    ('dashboard_top_offenders', '_compute_top_offenders', {'p_doc_type': 'CPF'}),
+    ('dashboard_top_offenders', '_compute_top_offenders', {'p_doc_type': 'CNPJ'}),
+]
+
+
+def bench_cube(df: pd.DataFrame, repeat: int):
+    """Uma renderização completa do dashboard: filtrar + agregar em pandas vs. somar células do cubo."""
+    base = normalize_dataset(df[[col for col in DASHBOARD_COLUMNS if col in df.columns]])
+    viz = DataVisualization(None)
+    selections = [
+        ([], {"mode": "simple", "years": [2024, 2025, 2026]}),
+        (['PA', 'MT'], {"mode": "simple", "years": [2025]}),
+        ([], {"mode": "advanced", "periods": {2024: [1, 2, 3]}}),
+    ]
+
+    def render_pandas():
+        for ufs, date_filters in selections:
+            filtered = base[base['UF'].isin(ufs)] if ufs else base
+            filtered = viz._apply_date_filter_to_dataframe(filtered, date_filters)
+            for _, compute, extra in DASHBOARD_AGGREGATES:
+                if 'p_doc_type' in extra:
+                    getattr(viz, compute)(filtered, extra['p_doc_type'])
+                else:
+                    getattr(viz, compute)(filtered)
+
+    def render_cube():
+        for ufs, date_filters in selections:
+            params = viz._rpc_filter_params(ufs, date_filters)
+            for rpc_name, _, extra in DASHBOARD_AGGREGATES:
+                cube.answer(rpc_name, {**params, **extra})
+
+    build, cube = timed(lambda: AggregateCube(base), 1)
+    before, _ = timed(render_pandas, repeat)
+    after, _ = timed(render_cube, repeat)
+
+    print_comparison(f"Renderização do dashboard ({len(selections)} filtros × {len(DASHBOARD_AGGREGATES)} gráficos)",
+                     before, after, len(df))
+    print(f"  🧊 Cubo: {len(cube.cells):,} células, montado em {build:.2f}s "
+          f"({cube.memory_usage().sum() / 1024 / 1024:,.1f} MB)")
+
+
+# --- Índice de infratores (rankings do chatbot) ---
+
+OFFENDER_QUESTIONS = [
+    {'by': 'value'},
+    {'by': 'value', 'years': [2025]},
+    {'by': 'value', 'ufs': ['PA'], 'tipos': ['Fauna'], 'doc_type': 'CNPJ'},
+    {'by': 'count', 'ufs': ['PA', 'MT'], 'doc_type': 'CPF'},
+]
+
+
+def legacy_top_offenders(df: pd.DataFrame, by: str = 'value', years=None, ufs=None, tipos=None,
+                         doc_type=None) -> pd.Series:
+    """Como o chatbot fazia: filtrar os registros e agrupar por (nome, documento) a cada pergunta."""
+    if years:
+        df = df[df['YEAR'].isin(years)]
+    if ufs:
+        df = df[df['UF'].isin(ufs)]
+    if tipos:
+        df = df[df['TIPO_INFRACAO'].astype(str).str.lower().isin([tipo.lower() for tipo in tipos])]
+    if doc_type:
+        df = df[df['DOC_TYPE'] == doc_type]
+    grouped = df.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])
+    if by == 'count':
+        return grouped.size().sort_values(ascending=False).head(10)
+    return grouped['VAL_AUTO_INFRACAO'].sum().sort_values(ascending=False).head(10)
+
+
+def bench_offenders(df: pd.DataFrame, repeat: int):
+    """Top 10 infratores para várias perguntas: groupby nos registros vs. índice por partição."""
+    base = normalize_dataset(df[[col for col in DASHBOARD_COLUMNS if col in df.columns]])
+
+    def answer_legacy():
+        for question in OFFENDER_QUESTIONS:
+            legacy_top_offenders(base, **question)
+
+    def answer_index():
+        for question in OFFENDER_QUESTIONS:
+            index.top(**question)
+
+    build, index = timed(lambda: OffenderIndex(base), 1)
+    before, _ = timed(answer_legacy, repeat)
+    after, _ = timed(answer_index, repeat)
+
+    print_comparison(f"Top infratores do chatbot ({len(OFFENDER_QUESTIONS)} perguntas)", before, after, len(df))
+    print(f"  🗂️ Índice: {len(index.partitions):,} partições, {len(index.offenders):,} infratores, "
+          f"montado em {build:.2f}s ({index.memory_usage().sum() / 1024 / 1024:,.1f} MB)")
+
+
+# --- Filtros das perguntas do chatbot ---
+
+FILTER_QUESTIONS = [
+    {'years': [2025]},
+    {'ufs': ['PA', 'AM'], 'tipos': ['Fauna']},
+    {'years': [2024, 2025], 'ufs': ['MT'], 'gravidades': ['Grave'], 'doc_type': 'CNPJ'},
+    {'tipos': ['Flora', 'Pesca'], 'doc_type': 'CPF'},
+]
+
+
+def legacy_apply_filters(df: pd.DataFrame, years=None, ufs=None, tipos=None, gravidades=None,
+                         doc_type=None) -> pd.DataFrame:
+    """Como o chatbot fazia: copiar a base, reconverter as datas e passar os tipos para minúsculas."""
+    df_f = df.copy()
+    if years:
+        df_f = df_f[pd.to_datetime(df_f['DAT_HORA_AUTO_INFRACAO'], errors='coerce').dt.year.isin(years)]
+    if tipos:
+        df_f = df_f[df_f['TIPO_INFRACAO'].astype(str).str.lower().isin([tipo.lower() for tipo in tipos])]
+    if ufs:
+        df_f = df_f[df_f['UF'].isin(ufs)]
+    if gravidades:
+        df_f = df_f[df_f['GRAVIDADE_INFRACAO'].isin(gravidades)]
+    if doc_type:
+        df_f = df_f[df_f['DOC_TYPE'] == doc_type]
+    return df_f
+
+
+def bench_filters(df: pd.DataFrame, repeat: int):
+    """Recorte de cada pergunta do chatbot: máscaras na base inteira vs. índice de filtros."""
+    base = normalize_dataset(df[[col for col in DASHBOARD_COLUMNS if col in df.columns]])
+
+    build, index = timed(lambda: FilterIndex(base), 1)
+    before, legacy = timed(lambda: [legacy_apply_filters(base, **question) for question in FILTER_QUESTIONS], repeat)
+    after, indexed = timed(lambda: [index.apply(base, question) for question in FILTER_QUESTIONS], repeat)
+    assert [len(frame) for frame in legacy] == [len(frame) for frame in indexed]
+
+    print_comparison(f"Filtros do chatbot ({len(FILTER_QUESTIONS)} perguntas)", before, after, len(df))
+    print(f"  🗂️ Índice montado em {build:.2f}s ({index.memory_usage().sum() / 1024 / 1024:,.1f} MB)")
+
+
+# --- Busca de infrator por nome/documento (chatbot) ---
+
+NAME_QUESTIONS = ['infrator 1234', 'INFRATOR 777', 'infratr 19999', 'empresa inexistente']
+
+
+def bench_names(df: pd.DataFrame, repeat: int):
+    """Busca de infrator: fuzzywuzzy em todos os nomes + máscara vs. índice de trigramas."""
+    from fuzzywuzzy import process
+
+    base = normalize_dataset(df[[col for col in DASHBOARD_COLUMNS if col in df.columns]])
+    unique_names = base['NOME_INFRATOR'].dropna().unique()
+
+    def legacy():
+        found = []
+        for question in NAME_QUESTIONS:
+            names = [name for name, _ in process.extractBests(question, unique_names, score_cutoff=90, limit=5)]
+            found.append(base[base['NOME_INFRATOR'].isin(names)])
+        return found
+
+    build, index = timed(lambda: NameIndex(base), 1)
+    before, legacy_found = timed(legacy, 1)
+    after, indexed = timed(lambda: [base.iloc[index.rows_for_names(index.search(question))]
+                                    for question in NAME_QUESTIONS], repeat)
+    # Nomes empatados no escore podem sair em outra ordem: confere só que os achados coincidem
+    for old, new in zip(legacy_found, indexed):
+        assert old.empty == new.empty
+        assert old.empty or set(old['NOME_INFRATOR']) & set(new['NOME_INFRATOR'])
+    print_comparison(f"Busca de infrator ({len(NAME_QUESTIONS)} nomes)", before, after, len(df))
+
+    key = describe_documents(base['CPF_CNPJ_INFRATOR'])['DOC_KEY'].dropna().iloc[0]
+    before, _ = timed(lambda: base[(describe_documents(base['CPF_CNPJ_INFRATOR'])['DOC_KEY'] == key).to_numpy()], repeat)
+    after, _ = timed(lambda: base.iloc[index.rows_for_document(key)], repeat)
+    print_comparison("Busca por CPF/CNPJ", before, after, len(df))
+    print(f"  🗂️ Índice montado em {build:.2f}s ({index.memory_usage().sum() / 1024 / 1024:,.1f} MB)")
+
+
+# --- Memória da base em sessão (dataset compartilhado) ---
+
+def _load_payload(path: str, compact: bool) -> pd.DataFrame:
+    """Monta o DataFrame a partir das páginas em JSON, como no carregamento do dashboard."""
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    df = pd.DataFrame(records)
+    del records
+    return normalize_dataset(df) if compact else df
+
+
+def _measure_rss(path: str, compact: bool, results) -> None:
+    """Processo filho: RSS acrescentado pela base carregada de `path` (páginas já liberadas)."""
+    gc.collect()
+    start = process_memory_mb()
+    df = _load_payload(path, compact)
+    gc.collect()
+    results.put(process_memory_mb() - start)
+    del df
+
+
+def bench_memory(df: pd.DataFrame, repeat: int):
+    """
+    Memória da base: DataFrame object de todas as colunas (pd.DataFrame(result.data))
+    vs. esquema compacto (category + string[pyarrow]) e vs. só as colunas do dashboard.
+    O RSS de cada variante é medido em um processo novo, para não herdar a memória dos outros.
+    """
+    columns = [col for col in DASHBOARD_COLUMNS if col in df.columns]
+    variants = {
+        'object, todas as colunas': (df, False),
+        'compacto, todas as colunas': (df, True),
+        'compacto, colunas do dashboard': (df[columns], True),
+    }
+
+    print(f"\n📊 Memória da base em sessão ({len(df):,} linhas)")
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        for label, (frame, compact) in variants.items():
+            path = os.path.join(directory, 'payload.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(dataframe_to_records(frame, numeric_columns=NUMERIC_COLUMNS), f)
+
+            loaded = _load_payload(path, compact)
+            deep_mb = loaded.memory_usage(deep=True).sum() / 1024 / 1024
+            rss = []
+            for _ in range(repeat):
+                results = context.Queue()
+                child = context.Process(target=_measure_rss, args=(path, compact, results))
+                child.start()
+                value = results.get()
+                child.join()
+                if value is not None:
+                    rss.append(value)
+            rss_text = f"{min(rss):8,.1f} MB RSS" if rss else "   RSS indisponível"
+            print(f"  🧠 {label:<32} {deep_mb:8,.1f} MB em colunas | {rss_text}")
+
+    print("  📋 Maiores colunas da base compacta do dashboard:")
+    for row in memory_report(loaded).head(5).itertuples():
+        print(f"     {row.column:<26} {row.dtype:<16} {row.mb:6,.1f} MB")
+
+
+BENCHMARKS = {
+    'serialization': bench_serialization,
+    'projection': bench_projection,
+    'documents': bench_documents,
+    'cube': bench_cube,
+    'offenders': bench_offenders,
+    'filters': bench_filters,
+    'names': bench_names,
+    'memory': bench_memory,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho do IBAMA Dashboard")
+    parser.add_argument('--rows', type=int, default=60000, help="Linhas do conjunto sintético")
+    parser.add_argument('--csv', help="CSV do IBAMA (separador ';')")
+    parser.add_argument('--zip', help="ZIP do IBAMA (usa os CSVs de 2024-2026)")
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições por medição (vale a melhor)")
+    parser.add_argument('--only', choices=sorted(BENCHMARKS), action='append',
+                        help="Executa apenas os benchmarks indicados")
+    args = parser.parse_args()
+
+    print("🔬 Carregando dados...")
+    df = load_dataset(args)
+    print(f"  ✅ {len(df):,} linhas, {len(df.columns)} colunas")
+
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](df, args.repeat)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Gera o snapshot Parquet da tabela ibama_infracao e o envia ao Supabase Storage.
+
+Executado pelo workflow logo após o upload. O app lê o snapshot em um cold
+start em vez de paginar a tabela inteira (ver src/utils/snapshot.py).
+"""
+import os
+import sys
+import time
+
+from supabase import create_client
+
+from src.utils.snapshot import (
+    DEFAULT_BUCKET, DEFAULT_SNAPSHOT_DIR, fetch_snapshot_frame,
+    probe_data_version, upload_snapshot, write_snapshot,
+)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+SNAPSHOT_BUCKET = os.getenv("SNAPSHOT_BUCKET", DEFAULT_BUCKET)
+TABLE_NAME = "ibama_infracao"
+
+
+def main():
+    print("📦 Gerando snapshot Parquet do ibama_infracao...")
+    try:
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+        version = probe_data_version(supabase, TABLE_NAME)
+        if version == "unknown":
+            print("❌ Não foi possível obter a versão dos dados")
+            return 1
+
+        start_time = time.time()
+        df = fetch_snapshot_frame(supabase, TABLE_NAME)
+        if df.empty:
+            print("❌ Tabela vazia - snapshot não gerado")
+            return 1
+        print(f"✅ {len(df):,} registros únicos lidos em {time.time() - start_time:.1f}s")
+
+        write_snapshot(df, version, TABLE_NAME, SNAPSHOT_DIR)
+
+        # Sem o Storage o app ainda grava o próprio snapshot após a primeira carga
+        upload_snapshot(supabase, TABLE_NAME, SNAPSHOT_DIR, SNAPSHOT_BUCKET)
+        return 0
+
+    except Exception as e:
+        print(f"💥 Erro ao gerar snapshot: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,6 +56,10 @@ DB_PATH = get_secret('DB_PATH', default='data/ibama_infracao.db')
 # Supabase Credentials
 SUPABASE_URL = get_secret('SUPABASE_URL')
 SUPABASE_KEY = get_secret('SUPABASE_KEY')
+# Requisições simultâneas ao baixar a tabela do Supabase página por página
+SUPABASE_FETCH_WORKERS = int(get_secret('SUPABASE_FETCH_WORKERS', default=8))
+# Paginação: 'keyset' (id > último visto, custo constante) ou 'offset' (.range)
+SUPABASE_PAGINATION_MODE = get_secret('SUPABASE_PAGINATION_MODE', default='keyset')
 
 # Data Sources
 IBAMA_ZIP_URL = get_secret(
@@ -67,9 +71,39 @@ IBAMA_ZIP_URL = get_secret(
 APP_TITLE = "IBAMA - Análise de Autos de Infração"
 APP_ICON = "🌳"
 
+# Data Ingestion
+# Teto de memória (MB) para a ingestão em streaming do ZIP do IBAMA no DuckDB
+INGEST_MAX_MEMORY_MB = int(get_secret('INGEST_MAX_MEMORY_MB', default=256))
+
 # Cache Settings
 CACHE_DIR = "data/cache"
 CACHE_MAX_AGE_HOURS = 24
+# Respostas dos LLMs em disco (src/utils/llm_cache.py); LLM_CACHE_MAX_MB = 0 desliga o cache.
+# Com temperature > 0 as respostas só entram no cache se LLM_CACHE_NONZERO_TEMPERATURE estiver ligado
+LLM_CACHE_DIR = get_secret('LLM_CACHE_DIR', default=os.path.join(CACHE_DIR, 'llm'))
+LLM_CACHE_MAX_MB = float(get_secret('LLM_CACHE_MAX_MB', default=50))
+LLM_CACHE_MAX_AGE_HOURS = float(get_secret('LLM_CACHE_MAX_AGE_HOURS', default=168))
+LLM_CACHE_NONZERO_TEMPERATURE = str(get_secret('LLM_CACHE_NONZERO_TEMPERATURE', default='false')).lower() in ('1', 'true', 'yes')
+# Intervalo (s) entre verificações da versão dos dados no dataset compartilhado
+DATASET_VERSION_TTL_SECONDS = int(get_secret('DATASET_VERSION_TTL_SECONDS', default=300))
+# Recortes filtrados (UFs + período) mantidos em memória pelo dashboard
+FILTER_CACHE_SIZE = int(get_secret('FILTER_CACHE_SIZE', default=16))
+# Resultados prontos dos gráficos (por versão, filtros e agregação), reaproveitados entre reruns
+AGGREGATE_CACHE_SIZE = int(get_secret('AGGREGATE_CACHE_SIZE', default=256))
+# Respostas do chatbot por (versão dos dados, intenção, filtros), compartilhadas pelas sessões
+ANSWER_CACHE_SIZE = int(get_secret('ANSWER_CACHE_SIZE', default=128))
+ANSWER_CACHE_TTL_SECONDS = int(get_secret('ANSWER_CACHE_TTL_SECONDS', default=3600))
+# Agregações do dashboard: 'cube' (cubo ano/mês/UF em memória) ou 'rpc' (funções do Supabase)
+DASHBOARD_AGGREGATES = get_secret('DASHBOARD_AGGREGATES', default='cube')
+# Infratores guardados por célula do cubo para o top de maiores infratores
+AGGREGATE_CUBE_TOP_K = int(get_secret('AGGREGATE_CUBE_TOP_K', default=25))
+# Medições de desempenho (src/utils/instrumentation.py): eventos mantidos em memória
+# e log JSON de cada evento ('' desliga, 'stdout' ou caminho de arquivo .jsonl)
+PERF_MAX_EVENTS = int(get_secret('PERF_MAX_EVENTS', default=2000))
+PERF_LOG = get_secret('PERF_LOG', default='')
+# Snapshot Parquet da tabela (local e no bucket do Supabase Storage)
+SNAPSHOT_DIR = get_secret('SNAPSHOT_DIR', default='data/snapshots')
+SNAPSHOT_BUCKET = get_secret('SNAPSHOT_BUCKET', default='snapshots')
 
 # Data Update Schedule
 UPDATE_HOUR = 10  # 10:00 AM Brasília time
@@ -0,0 +1,78 @@
+"""
+Dados sintéticos compartilhados pelos testes dos índices: uma base de autos
+no esquema canônico (src/utils/schema.py), gerada de forma determinística.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.schema import normalize_dataset
+
+UFS = ['PA', 'AM', 'MT']
+TIPOS = ['Flora', 'Fauna', 'Pesca']
+GRAVIDADES = ['Leve', 'Grave', None]
+
+FIRST = ['JOSÉ', 'MARIA', 'ANTONIO', 'FRANCISCO', 'ANA', 'JOÃO', 'PEDRO', 'LUCAS', 'PAULO', 'CARLOS',
+         'RAIMUNDO', 'FRANCISCA', 'MARCOS', 'LUIZ', 'SEBASTIÃO']
+LAST = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'LIMA', 'PEREIRA', 'FERREIRA', 'COSTA', 'RODRIGUES',
+        'ALMEIDA', 'NASCIMENTO', 'ARAÚJO', 'CARVALHO', 'GOMES', 'RIBEIRO']
+COMPANIES = ['MADEIREIRA SANTA ROSA LTDA', 'AGROPECUARIA RIO VERDE S/A', 'SERRARIA BOA ESPERANCA LTDA - ME']
+MUNICIPIOS = [('1500602', 'ALTAMIRA'), ('1505031', 'NOVO PROGRESSO'), ('1302603', 'MANAUS'),
+              ('1300144', 'APUÍ'), ('5107909', 'SINOP'), ('5100250', 'ALTA FLORESTA')]
+STATUS = ['Lavrado', 'Em julgamento', 'Julgado', '', None]
+
+
+def offender_names(count: int = 1500, seed: int = 3) -> list:
+    """Nomes compostos (muitos parecidos entre si) seguidos das empresas de COMPANIES."""
+    rng = np.random.default_rng(seed)
+    people = sorted({f"{rng.choice(FIRST)} {rng.choice(['DA ', 'DE ', ''])}{rng.choice(LAST)} {rng.choice(LAST)}"
+                     for _ in range(count)})
+    return people + COMPANIES
+
+
+def make_dataset(rows: int = 3000, seed: int = 7, names: list = None) -> pd.DataFrame:
+    """
+    Base canônica com `rows` autos de UFS, 2023-2025, TIPOS, GRAVIDADES,
+    MUNICIPIOS e STATUS, multas com brancos e infratores tirados de `names`
+    (padrão: `offender_names()`), cada um com um CPF/CNPJ fixo, gravado
+    formatado ou só com dígitos. Todo nome aparece ao menos uma vez quando
+    `rows` >= len(names); ~2% das demais linhas ficam sem nome e ~5% sem
+    código de município.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(offender_names() if names is None else names, dtype=object)
+    picked = rng.integers(0, len(names), rows)
+    picked[:min(rows, len(names))] = np.arange(min(rows, len(names)))
+
+    digits = [f"{i:011d}" if i % 4 else f"{i:014d}" for i in picked]
+    documents = [f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}" if len(d) == 11 and row % 2 else d
+                 for row, d in enumerate(digits)]
+    values = pd.Series([f"{v:.2f}".replace('.', ',') for v in rng.gamma(1.5, 20000, rows)], dtype=object)
+    values[rng.random(rows) < 0.1] = np.nan
+
+    raw = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'UF': rng.choice(UFS, rows),
+        'DAT_HORA_AUTO_INFRACAO': (pd.Timestamp('2023-01-01')
+                                   + pd.to_timedelta(rng.integers(0, 365 * 3, rows), unit='D')).strftime('%Y-%m-%d %H:%M:%S'),
+        'TIPO_INFRACAO': rng.choice(TIPOS, rows),
+        'GRAVIDADE_INFRACAO': pd.Series(rng.choice(GRAVIDADES, rows)),
+        'NOME_INFRATOR': names[picked],
+        'CPF_CNPJ_INFRATOR': documents,
+        'VAL_AUTO_INFRACAO': values,
+    })
+    raw.loc[(rng.random(rows) < 0.02) & (np.arange(rows) >= len(names)), 'NOME_INFRATOR'] = None
+
+    municipio = rng.integers(0, len(MUNICIPIOS), rows)
+    raw['COD_MUNICIPIO'] = [MUNICIPIOS[i][0] for i in municipio]
+    raw['MUNICIPIO'] = [MUNICIPIOS[i][1] for i in municipio]
+    raw.loc[rng.random(rows) < 0.05, 'COD_MUNICIPIO'] = ''
+    raw['DES_STATUS_FORMULARIO'] = pd.Series(rng.choice(np.array(STATUS, dtype=object), rows))
+    return normalize_dataset(raw)
+
+
+@pytest.fixture(name='make_dataset')
+def make_dataset_fixture():
+    """Fábrica de bases sintéticas (cada chamada devolve um DataFrame novo)."""
+    return make_dataset
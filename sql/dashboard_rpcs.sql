@@ -0,0 +1,232 @@
+-- =====================================================================
+-- Funções de agregação do dashboard IBAMA (Supabase / PostgreSQL)
+--
+-- Executar uma vez no SQL Editor do Supabase. O app chama estas funções
+-- via supabase.rpc(...) e, se não existirem, volta a agregar em pandas.
+--
+-- Todas recebem os mesmos filtros do dashboard:
+--   p_ufs          text[]  UFs selecionadas (NULL ou vazio = todas)
+--   p_years        int[]   anos (modo simples; NULL = sem filtro)
+--   p_year_months  int[]   períodos ano*100+mês (modo avançado; NULL = sem filtro)
+--
+-- Assim como no app, cada NUM_AUTO_INFRACAO é contado uma única vez e
+-- registros sem data válida ficam de fora.
+-- =====================================================================
+
+-- Base deduplicada e filtrada -------------------------------------------
+CREATE OR REPLACE FUNCTION dashboard_filtered_infracoes(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL
+)
+RETURNS TABLE (
+    num_auto_infracao text,
+    uf text,
+    cod_municipio text,
+    municipio text,
+    tipo_infracao text,
+    gravidade_infracao text,
+    des_status_formulario text,
+    nome_infrator text,
+    cpf_cnpj_infrator text,
+    valor numeric
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH unicos AS (
+        SELECT DISTINCT ON ("NUM_AUTO_INFRACAO") *
+        FROM ibama_infracao
+        WHERE "NUM_AUTO_INFRACAO" IS NOT NULL AND "NUM_AUTO_INFRACAO"::text <> ''
+        ORDER BY "NUM_AUTO_INFRACAO", id
+    ),
+    datados AS (
+        SELECT
+            u.*,
+            substr(u."DAT_HORA_AUTO_INFRACAO"::text, 1, 4)::int AS ano,
+            substr(u."DAT_HORA_AUTO_INFRACAO"::text, 6, 2)::int AS mes
+        FROM unicos u
+        WHERE u."DAT_HORA_AUTO_INFRACAO"::text ~ '^\d{4}-\d{2}'
+    )
+    SELECT
+        d."NUM_AUTO_INFRACAO"::text,
+        d."UF"::text,
+        d."COD_MUNICIPIO"::text,
+        d."MUNICIPIO"::text,
+        d."TIPO_INFRACAO"::text,
+        d."GRAVIDADE_INFRACAO"::text,
+        d."DES_STATUS_FORMULARIO"::text,
+        d."NOME_INFRATOR"::text,
+        d."CPF_CNPJ_INFRATOR"::text,
+        CASE
+            WHEN trim(d."VAL_AUTO_INFRACAO"::text) ~ '^-?\d+([.,]\d+)?$'
+            THEN replace(trim(d."VAL_AUTO_INFRACAO"::text), ',', '.')::numeric
+        END
+    FROM datados d
+    WHERE (p_ufs IS NULL OR cardinality(p_ufs) = 0 OR d."UF" = ANY(p_ufs))
+      AND (p_years IS NULL OR d.ano = ANY(p_years))
+      AND (p_year_months IS NULL OR d.ano * 100 + d.mes = ANY(p_year_months));
+$$;
+
+-- Métricas de visão geral -----------------------------------------------
+CREATE OR REPLACE FUNCTION dashboard_overview(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL
+)
+RETURNS TABLE (total_infracoes bigint, valor_total_multas numeric, total_municipios bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        count(*),
+        coalesce(sum(valor), 0),
+        count(DISTINCT nullif(cod_municipio, ''))
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months);
+$$;
+
+-- Infrações por UF ------------------------------------------------------
+CREATE OR REPLACE FUNCTION dashboard_counts_by_uf(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL,
+    p_limit int DEFAULT 15
+)
+RETURNS TABLE ("UF" text, total bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT uf, count(*) AS total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE uf IS NOT NULL AND uf <> ''
+    GROUP BY uf
+    ORDER BY total DESC
+    LIMIT p_limit;
+$$;
+
+-- Municípios com mais infrações (agrupados pelo código IBGE) -------------
+CREATE OR REPLACE FUNCTION dashboard_top_municipios(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL,
+    p_limit int DEFAULT 10
+)
+RETURNS TABLE ("COD_MUNICIPIO" text, "MUNICIPIO" text, "UF" text, total_infracoes bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT cod_municipio, municipio, uf, count(*) AS total_infracoes
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE municipio IS NOT NULL AND municipio <> ''
+      AND uf IS NOT NULL AND uf <> ''
+      AND cod_municipio IS NOT NULL AND cod_municipio <> ''
+    GROUP BY cod_municipio, municipio, uf
+    ORDER BY total_infracoes DESC, cod_municipio COLLATE "C", municipio COLLATE "C", uf COLLATE "C"
+    LIMIT p_limit;
+$$;
+
+-- Valor das multas por tipo de infração ---------------------------------
+CREATE OR REPLACE FUNCTION dashboard_value_by_type(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL,
+    p_limit int DEFAULT 10
+)
+RETURNS TABLE ("TIPO_INFRACAO" text, valor_total numeric)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT tipo_infracao, sum(valor) AS valor_total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE valor IS NOT NULL AND tipo_infracao IS NOT NULL AND tipo_infracao <> ''
+    GROUP BY tipo_infracao
+    ORDER BY valor_total DESC
+    LIMIT p_limit;
+$$;
+
+-- Infrações por gravidade (vazios = 'Sem avaliação feita') ---------------
+CREATE OR REPLACE FUNCTION dashboard_counts_by_gravity(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL
+)
+RETURNS TABLE ("GRAVIDADE_INFRACAO" text, total bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT coalesce(nullif(gravidade_infracao, ''), 'Sem avaliação feita') AS gravidade, count(*) AS total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    GROUP BY gravidade
+    ORDER BY total DESC;
+$$;
+
+-- Infrações por estágio (status do formulário) --------------------------
+CREATE OR REPLACE FUNCTION dashboard_counts_by_status(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL,
+    p_limit int DEFAULT 10
+)
+RETURNS TABLE ("DES_STATUS_FORMULARIO" text, total bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT des_status_formulario, count(*) AS total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE des_status_formulario IS NOT NULL AND des_status_formulario <> ''
+    GROUP BY des_status_formulario
+    ORDER BY total DESC
+    LIMIT p_limit;
+$$;
+
+-- Principais infratores por valor ---------------------------------------
+-- p_doc_type: 'CPF' (11 dígitos) ou 'CNPJ' (14 dígitos), com ou sem pontuação
+-- (mesma regra de src/utils/documents.py)
+CREATE OR REPLACE FUNCTION dashboard_top_offenders(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL,
+    p_doc_type text DEFAULT 'CPF',
+    p_limit int DEFAULT 10
+)
+RETURNS TABLE ("NOME_INFRATOR" text, "CPF_CNPJ_INFRATOR" text, "VAL_AUTO_INFRACAO_NUMERIC" numeric)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT nome_infrator, trim(cpf_cnpj_infrator) AS documento, sum(valor) AS valor_total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE valor IS NOT NULL
+      AND nome_infrator IS NOT NULL AND nome_infrator <> ''
+      AND CASE p_doc_type
+            WHEN 'CPF' THEN regexp_replace(cpf_cnpj_infrator, '[-./[:space:]]', '', 'g') ~ '^\d{11}$'
+            WHEN 'CNPJ' THEN regexp_replace(cpf_cnpj_infrator, '[-./[:space:]]', '', 'g') ~ '^\d{14}$'
+            ELSE false
+          END
+    GROUP BY nome_infrator, documento
+    ORDER BY valor_total DESC, nome_infrator COLLATE "C", trim(cpf_cnpj_infrator) COLLATE "C"
+    LIMIT p_limit;
+$$;
+
+-- Quantidade de autos por tipo de documento do infrator ------------------
+CREATE OR REPLACE FUNCTION dashboard_offender_summary(
+    p_ufs text[] DEFAULT NULL,
+    p_years int[] DEFAULT NULL,
+    p_year_months int[] DEFAULT NULL
+)
+RETURNS TABLE (doc_type text, total bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        CASE
+            WHEN regexp_replace(cpf_cnpj_infrator, '[-./[:space:]]', '', 'g') ~ '^\d{11}$' THEN 'CPF'
+            WHEN regexp_replace(cpf_cnpj_infrator, '[-./[:space:]]', '', 'g') ~ '^\d{14}$' THEN 'CNPJ'
+            ELSE 'OUTRO'
+        END AS doc_type,
+        count(*) AS total
+    FROM dashboard_filtered_infracoes(p_ufs, p_years, p_year_months)
+    WHERE valor IS NOT NULL
+      AND nome_infrator IS NOT NULL AND nome_infrator <> ''
+      AND cpf_cnpj_infrator IS NOT NULL AND cpf_cnpj_infrator <> ''
+    GROUP BY doc_type;
+$$;
@@ -5,10 +5,26 @@ import re
 from typing import Dict, Any, Optional
 from fuzzywuzzy import process
 
+from src.utils.dataset_store import get_answer_cache, get_dataset_store
+from src.utils.documents import describe_documents, mask_documents
+from src.utils.filter_index import FilterIndex
+from src.utils.name_index import NameIndex
+from src.utils.offender_index import OffenderIndex
+from src.utils.schema import DERIVED_COLUMNS, normalize_dataset
+
+# Colunas usadas pelas análises rápidas (o restante da tabela não é baixado)
+CHATBOT_COLUMNS = [
+    'NUM_AUTO_INFRACAO', 'DAT_HORA_AUTO_INFRACAO', 'UF', 'MUNICIPIO',
+    'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'VAL_AUTO_INFRACAO',
+    'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'
+]
+
+# CPF (000.000.000-00) ou CNPJ (00.000.000/0000-00), com ou sem pontuação
+DOCUMENT_PATTERN = re.compile(r'(?<!\d)(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}|\d{3}\.?\d{3}\.?\d{3}-?\d{2})(?!\d)')
+
 class ChatbotFixed:
     def __init__(self, llm_integration=None):
         self.llm_integration = llm_integration
-        self.cached_data = None
         self.llm_config = {
             "provider": "groq",
             "temperature": 0.0,
@@ -29,36 +45,138 @@ class ChatbotFixed:
             st.session_state.messages = []
     
     def _get_cached_data(self) -> pd.DataFrame:
-        """Obtém dados em cache para análises rápidas."""
-        if self.cached_data is None:
-            try:
-                if (hasattr(self.llm_integration, 'database') and 
-                    self.llm_integration.database.is_cloud and 
-                    self.llm_integration.database.supabase):
-                    
-                    try:
-                        from src.utils.supabase_utils import SupabasePaginator
-                        paginator = SupabasePaginator(self.llm_integration.database.supabase)
-                        self.cached_data = paginator.get_all_records()
-                        
-                        # CORREÇÃO: Processa os dados carregados
-                        self.cached_data = self._process_cached_data(self.cached_data)
-                        print(f"✅ Cache carregado e processado: {len(self.cached_data)} registros")
-                    except ImportError:
-                        result = self.llm_integration.database.supabase.table('ibama_infracao').select('*').limit(50000).execute()
-                        self.cached_data = pd.DataFrame(result.data)
-                        self.cached_data = self._process_cached_data(self.cached_data)
-                else:
-                    self.cached_data = pd.DataFrame()
-                    
-            except Exception as e:
-                print(f"Erro ao carregar cache: {e}")
-                self.cached_data = pd.DataFrame()
+        """
+        Obtém os dados processados para análises rápidas.
         
-        return self.cached_data
+        Vêm do dataset compartilhado do processo: todas as sessões usam a mesma
+        cópia, recarregada apenas quando a versão dos dados no banco muda.
+        """
+        try:
+            paginator = self._get_paginator()
+            if paginator is None:
+                return pd.DataFrame()
+            version = paginator.get_data_version()
+            
+            def load():
+                df = paginator.get_all_records(columns=CHATBOT_COLUMNS)
+                # A base compartilhada pode trazer colunas de outras telas; o id fica
+                # para a atualização incremental do índice de infratores
+                columns = ['id', *CHATBOT_COLUMNS, *DERIVED_COLUMNS]
+                return self._process_cached_data(df[[col for col in columns if col in df.columns]])
+            
+            return get_dataset_store().get_or_load('ibama_infracao:chatbot', version, load)
+                
+        except Exception as e:
+            print(f"Erro ao carregar cache: {e}")
+            return pd.DataFrame()
+    
+    def _get_paginator(self):
+        """Paginador do Supabase, ou None fora do modo cloud."""
+        database = getattr(self.llm_integration, 'database', None)
+        if database is None or not database.is_cloud or not database.supabase:
+            return None
+        
+        from src.utils.supabase_utils import SupabasePaginator
+        return SupabasePaginator(database.supabase)
+    
+    def _get_offender_index(self) -> Optional[OffenderIndex]:
+        """
+        Índice de infratores (src/utils/offender_index.py) da versão atual dos
+        dados, compartilhado pelas sessões. Quando a versão muda, parte do
+        índice anterior e soma só os registros novos, se possível.
+        """
+        try:
+            paginator = self._get_paginator()
+            if paginator is None:
+                return None
+            store = get_dataset_store()
+            key = 'ibama_infracao:offenders'
+            
+            def load():
+                df = self._get_cached_data()
+                previous = store.peek(key)
+                if previous is not None:
+                    index = previous.updated_from(df)
+                    if index is not None:
+                        print(f"🔁 Índice de infratores atualizado com {index.rows - previous.rows:,} registros novos")
+                        return index
+                return OffenderIndex(df)
+            
+            index = store.get_or_load(key, paginator.get_data_version(), load)
+            return None if index.empty else index
+        
+        except Exception as e:
+            print(f"⚠️ Erro ao montar o índice de infratores: {e}")
+            return None
+    
+    def _get_filter_index(self, df: pd.DataFrame) -> Optional[FilterIndex]:
+        """
+        Índice de filtros (src/utils/filter_index.py) de `df`, a base do
+        chatbot, montado uma vez por versão dos dados e compartilhado pelas sessões.
+        """
+        try:
+            paginator = self._get_paginator()
+            if paginator is None or df.empty:
+                return None
+            
+            index = get_dataset_store().get_or_load(
+                'ibama_infracao:chatbot_filters', paginator.get_data_version(),
+                lambda: FilterIndex(df), is_valid=lambda index: index.matches(df)
+            )
+            return index if index.matches(df) else None
+        
+        except Exception as e:
+            print(f"⚠️ Erro ao montar o índice de filtros: {e}")
+            return None
+    
+    def _get_name_index(self, df: pd.DataFrame) -> Optional[NameIndex]:
+        """
+        Índice de nomes e documentos (src/utils/name_index.py) de `df`, a base
+        do chatbot, montado uma vez por versão dos dados e compartilhado pelas sessões.
+        """
+        try:
+            paginator = self._get_paginator()
+            if paginator is None or df.empty or 'NOME_INFRATOR' not in df.columns:
+                return None
+            
+            index = get_dataset_store().get_or_load(
+                'ibama_infracao:names', paginator.get_data_version(),
+                lambda: NameIndex(df), is_valid=lambda index: index.matches(df)
+            )
+            return index if index.matches(df) else None
+        
+        except Exception as e:
+            print(f"⚠️ Erro ao montar o índice de nomes: {e}")
+            return None
+    
+    def _rank_offenders(self, df: pd.DataFrame, filters: Optional[dict], by: str = 'value',
+                        limit: int = 10) -> pd.Series:
+        """
+        Maiores infratores por soma das multas (`by='value'`) ou número de
+        autos (`by='count'`), indexados por (NOME_INFRATOR, CPF_CNPJ_INFRATOR).
+        
+        Com `filters` (formato de _parse_question), consulta o índice de
+        infratores; sem índice, agrupa os registros de `df`, já filtrados.
+        """
+        index = self._get_offender_index() if filters is not None else None
+        if index is not None:
+            top = index.top(by=by, limit=limit, **filters)
+            return pd.Series(top[by].to_numpy(),
+                             index=pd.MultiIndex.from_frame(top[['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']]))
+        
+        df_clean = df[df['NOME_INFRATOR'].notna() & df['CPF_CNPJ_INFRATOR'].notna()]
+        if by == 'count':
+            return df_clean.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']).size().sort_values(ascending=False).head(limit)
+        
+        df_clean = df_clean[df_clean['VAL_AUTO_INFRACAO_NUMERIC'] > 0]
+        totals = df_clean.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum()
+        return totals.sort_values(ascending=False).head(limit)
     
     def _process_cached_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Processa os dados carregados para análises corretas."""
+        """
+        Prepara os dados para as análises rápidas. Tipos, textos aparados e
+        DOC_TYPE já vêm do esquema canônico (src/utils/schema.py).
+        """
         if df.empty:
             return df
             
@@ -66,40 +184,14 @@ class ChatbotFixed:
         if 'NUM_AUTO_INFRACAO' in df.columns:
             df = df.drop_duplicates(subset=['NUM_AUTO_INFRACAO'], keep='first')
         
-        # Converte valores monetários para float
-        if 'VAL_AUTO_INFRACAO' in df.columns:
-            df['VAL_AUTO_INFRACAO_NUMERIC'] = pd.to_numeric(
-                df['VAL_AUTO_INFRACAO'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
-            )
-        
-        # Classifica CPF/CNPJ corretamente
-        if 'CPF_CNPJ_INFRATOR' in df.columns:
-            df['DOC_TYPE'] = df['CPF_CNPJ_INFRATOR'].apply(self._classify_cpf_cnpj)
+        df = normalize_dataset(df)
         
-        # Limpa campos de texto
-        text_columns = ['NOME_INFRATOR', 'TIPO_INFRACAO', 'UF', 'MUNICIPIO']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip()
+        # Nome usado pelas análises para o valor numérico da multa
+        if 'VAL_AUTO_INFRACAO' in df.columns:
+            df = df.assign(VAL_AUTO_INFRACAO_NUMERIC=df['VAL_AUTO_INFRACAO'])
         
         return df
     
-    def _classify_cpf_cnpj(self, doc: str) -> str:
-        """Classifica documento como CPF, CNPJ ou Unknown."""
-        if pd.isna(doc) or doc == '':
-            return 'Unknown'
-        
-        # Remove caracteres não numéricos
-        cleaned_doc = ''.join(filter(str.isdigit, str(doc)))
-        
-        if len(cleaned_doc) == 11:
-            return 'CPF'
-        elif len(cleaned_doc) == 14:
-            return 'CNPJ'
-        else:
-            return 'Unknown'
-    
     def _format_currency_brazilian(self, value: float) -> str:
         """Formata valor como moeda brasileira."""
         if pd.isna(value) or value == 0:
@@ -115,7 +207,11 @@ class ChatbotFixed:
             return f"R$ {value:.2f}".replace('.', ',')
     
     def _find_similar_names(self, search_name: str, df: pd.DataFrame, min_score: int = 90) -> list:
-        """Encontra nomes similares usando fuzzy matching."""
+        """Encontra nomes similares usando fuzzy matching (pelo índice de nomes, na base do chatbot)."""
+        index = self._get_name_index(df)
+        if index is not None:
+            return index.search(search_name, min_score=min_score)
+        
         try:
             # Importa fuzzywuzzy apenas quando necessário
             from fuzzywuzzy import process
@@ -210,15 +306,19 @@ class ChatbotFixed:
         }
 
     def _apply_filters(self, df: pd.DataFrame, filters: dict) -> pd.DataFrame:
-        """Aplica todos os filtros extraídos da pergunta ao DataFrame."""
-        df_f = df.copy()
+        """
+        Aplica todos os filtros extraídos da pergunta ao DataFrame. Na base do
+        chatbot usa o índice de filtros: só as linhas do resultado são lidas.
+        """
+        index = self._get_filter_index(df)
+        if index is not None:
+            return index.apply(df, filters)
+        
+        # Cada filtro gera um novo DataFrame; a base compartilhada não é alterada
+        df_f = df
 
-        if filters.get("years") and 'DAT_HORA_AUTO_INFRACAO' in df_f.columns:
-            try:
-                years_col = pd.to_datetime(df_f['DAT_HORA_AUTO_INFRACAO'], errors='coerce').dt.year
-                df_f = df_f[years_col.isin(filters["years"])]
-            except Exception:
-                pass
+        if filters.get("years") and 'YEAR' in df_f.columns:
+            df_f = df_f[df_f['YEAR'].isin(filters["years"])]
 
         if filters.get("tipos") and 'TIPO_INFRACAO' in df_f.columns:
             tipos_lower = [t.lower() for t in filters["tipos"]]
@@ -287,14 +387,55 @@ class ChatbotFixed:
         answer += f"**Valor médio por infração:** {self._format_currency_brazilian(total / count)}\n"
         return {"answer": answer, "source": "data_analysis"}
 
+    def _answer_cache_key(self, question: str, parsed: dict) -> Optional[tuple]:
+        """
+        Chave da resposta no cache compartilhado: versão dos dados, intenção e
+        filtros normalizados, de modo que perguntas escritas de formas diferentes
+        com a mesma interpretação dividam a entrada. Só a busca por nome depende
+        do texto (nomes e CPF/CNPJ citados), que então entra na chave.
+        """
+        try:
+            paginator = self._get_paginator()
+            if paginator is None:
+                return None
+            
+            normalized = tuple(
+                (name, tuple(sorted(set(value))) if isinstance(value, list) else value)
+                for name, value in sorted(parsed["filters"].items())
+            )
+            subject = " ".join(question.split()) if parsed["intent"] == "specific_name" else None
+            return (paginator.get_data_version(), parsed["intent"], normalized, subject)
+        
+        except Exception as e:
+            print(f"⚠️ Resposta sem cache: {e}")
+            return None
+    
     def _answer_with_data_analysis(self, question: str) -> Dict[str, Any]:
-        """Responde perguntas usando parser de intenção + filtros combinados."""
+        """
+        Responde perguntas usando parser de intenção + filtros combinados. As
+        respostas ficam no cache de respostas do processo (ver `_answer_cache_key`).
+        """
         df = self._get_cached_data()
         if df.empty:
             return {"answer": "❌ Não foi possível carregar os dados para análise.", "source": "error"}
 
+        parsed = self._parse_question(question)
+        key = self._answer_cache_key(question, parsed)
+        cache = get_answer_cache()
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return dict(cached)
+        
+        result = self._compute_answer(df, question, parsed)
+        # Erros (ex.: falha momentânea) não ficam em cache
+        if key is not None and result.get("source") != "error":
+            cache.put(key, dict(result))
+        return result
+    
+    def _compute_answer(self, df: pd.DataFrame, question: str, parsed: dict) -> Dict[str, Any]:
+        """Calcula a resposta para a intenção e os filtros de `parsed` (saída de `_parse_question`)."""
         try:
-            parsed = self._parse_question(question)
             filters = parsed["filters"]
             intent = parsed["intent"]
             has_filters = any([filters["years"], filters["ufs"], filters["tipos"],
@@ -319,10 +460,10 @@ class ChatbotFixed:
 
             elif intent == "top_offenders":
                 if filters["doc_type"] == "CPF":
-                    return self._analyze_top_individuals_by_value(df_filtered, question)
+                    return self._analyze_top_individuals_by_value(df_filtered, question, filters)
                 elif filters["doc_type"] == "CNPJ":
-                    return self._analyze_top_companies_by_value(df_filtered, question)
-                return self._analyze_top_offenders_by_value(df_filtered, question)
+                    return self._analyze_top_companies_by_value(df_filtered, question, filters)
+                return self._analyze_top_offenders_by_value(df_filtered, question, filters)
 
             elif intent == "top_states":
                 return self._analyze_top_states(df_filtered, question)
@@ -360,7 +501,7 @@ class ChatbotFixed:
                 return {"answer": "❌ Nenhum dado válido encontrado.", "source": "error"}
             
             # CORREÇÃO: Soma valores por tipo (não conta registros)
-            values_by_type = df_clean.groupby('TIPO_INFRACAO')['VAL_AUTO_INFRACAO_NUMERIC'].sum().sort_values(ascending=False)
+            values_by_type = df_clean.groupby('TIPO_INFRACAO', observed=True)['VAL_AUTO_INFRACAO_NUMERIC'].sum().sort_values(ascending=False)
             
             total_value = values_by_type.sum()
             
@@ -385,12 +526,10 @@ class ChatbotFixed:
                 return {"answer": "❌ Coluna de gravidade não encontrada.", "source": "error"}
             
             # Substitui valores nulos/vazios por "Sem avaliação"
-            df_processed = df.copy()
-            df_processed['GRAVIDADE_INFRACAO'] = df_processed['GRAVIDADE_INFRACAO'].fillna('Sem avaliação')
-            df_processed['GRAVIDADE_INFRACAO'] = df_processed['GRAVIDADE_INFRACAO'].replace('', 'Sem avaliação')
+            gravity = df['GRAVIDADE_INFRACAO'].astype(object).fillna('Sem avaliação').replace('', 'Sem avaliação')
             
             # Conta infrações por gravidade
-            gravity_counts = df_processed['GRAVIDADE_INFRACAO'].value_counts()
+            gravity_counts = gravity.value_counts()
             total_infractions = gravity_counts.sum()
             
             answer = "**⚖️ Distribuição de Infrações por Gravidade:**\n\n"
@@ -426,38 +565,28 @@ class ChatbotFixed:
         except Exception as e:
             return {"answer": f"❌ Erro na análise por gravidade: {e}", "source": "error"}
     
-    def _analyze_top_offenders_by_value(self, df: pd.DataFrame, question: str) -> Dict[str, Any]:
-        """CORREÇÃO: Top infratores por VALOR total (não quantidade)."""
+    def _analyze_top_offenders_by_value(self, df: pd.DataFrame, question: str, filters: dict = None) -> Dict[str, Any]:
+        """
+        CORREÇÃO: Top infratores por VALOR total (não quantidade).
+        `df` já vem filtrado; com `filters`, o ranking sai do índice de infratores.
+        """
         try:
             required_cols = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO_NUMERIC']
             if not all(col in df.columns for col in required_cols):
                 return {"answer": "❌ Colunas necessárias não encontradas.", "source": "error"}
             
-            # Remove valores inválidos
-            df_clean = df[
-                df['NOME_INFRATOR'].notna() & 
-                df['CPF_CNPJ_INFRATOR'].notna() &
-                df['VAL_AUTO_INFRACAO_NUMERIC'].notna() &
-                (df['NOME_INFRATOR'] != '') & 
-                (df['CPF_CNPJ_INFRATOR'] != '') &
-                (df['VAL_AUTO_INFRACAO_NUMERIC'] > 0)
-            ]
+            # CORREÇÃO: Agrupa por infrator e SOMA valores (não conta registros)
+            top_offenders = self._rank_offenders(df, filters, by='value')
             
-            if df_clean.empty:
+            if top_offenders.empty:
                 return {"answer": "❌ Dados válidos não disponíveis.", "source": "error"}
             
-            # CORREÇÃO: Agrupa por infrator e SOMA valores (não conta registros)
-            top_offenders = df_clean.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum().sort_values(ascending=False).head(10)
-            
             answer = "**💰 Top 10 Infratores por Valor Total de Multas:**\n\n"
             
-            for i, ((name, doc), value) in enumerate(top_offenders.items(), 1):
-                # Mascara documentos para privacidade
-                if len(str(doc).replace('.', '').replace('-', '').replace('/', '')) == 11:  # CPF
-                    doc_masked = f"{str(doc)[:3]}.***.***-{str(doc)[-2:]}"
-                else:  # CNPJ
-                    doc_masked = str(doc)
-                
+            # Mascara documentos para privacidade (CPF mascarado, CNPJ completo)
+            masked_docs = mask_documents(top_offenders.index.get_level_values('CPF_CNPJ_INFRATOR').to_series())
+            
+            for i, ((name, doc), value, doc_masked) in enumerate(zip(top_offenders.index, top_offenders.values, masked_docs), 1):
                 display_name = name[:50] + "..." if len(name) > 50 else name
                 answer += f"{i}. **{display_name.title()}**\n"
                 answer += f"   • Valor total: {self._format_currency_brazilian(value)}\n"
@@ -471,7 +600,7 @@ class ChatbotFixed:
         except Exception as e:
             return {"answer": f"❌ Erro na análise de top infratores: {e}", "source": "error"}
     
-    def _analyze_top_individuals_by_value(self, df: pd.DataFrame, question: str) -> Dict[str, Any]:
+    def _analyze_top_individuals_by_value(self, df: pd.DataFrame, question: str, filters: dict = None) -> Dict[str, Any]:
         """CORREÇÃO: Top pessoas físicas por valor."""
         try:
             if 'DOC_TYPE' not in df.columns:
@@ -483,12 +612,13 @@ class ChatbotFixed:
             if df_cpf.empty:
                 return {"answer": "❌ Nenhuma pessoa física encontrada.", "source": "error"}
             
-            return self._analyze_top_offenders_by_value(df_cpf, question.replace("pessoas", "pessoas físicas"))
+            return self._analyze_top_offenders_by_value(df_cpf, question.replace("pessoas", "pessoas físicas"),
+                                                       {**filters, 'doc_type': 'CPF'} if filters else None)
             
         except Exception as e:
             return {"answer": f"❌ Erro na análise de pessoas físicas: {e}", "source": "error"}
     
-    def _analyze_top_companies_by_value(self, df: pd.DataFrame, question: str) -> Dict[str, Any]:
+    def _analyze_top_companies_by_value(self, df: pd.DataFrame, question: str, filters: dict = None) -> Dict[str, Any]:
         """CORREÇÃO: Top empresas por valor."""
         try:
             if 'DOC_TYPE' not in df.columns:
@@ -500,22 +630,39 @@ class ChatbotFixed:
             if df_cnpj.empty:
                 return {"answer": "❌ Nenhuma empresa encontrada.", "source": "error"}
             
-            return self._analyze_top_offenders_by_value(df_cnpj, question.replace("empresas", "empresas"))
+            return self._analyze_top_offenders_by_value(df_cnpj, question.replace("empresas", "empresas"),
+                                                       {**filters, 'doc_type': 'CNPJ'} if filters else None)
             
         except Exception as e:
             return {"answer": f"❌ Erro na análise de empresas: {e}", "source": "error"}
     
     def _is_specific_name_search(self, question: str) -> bool:
-        """Detecta se a pergunta busca por um nome específico."""
+        """Detecta se a pergunta busca por um nome específico (ou por um CPF/CNPJ)."""
         indicators = [
             "shell brasil", "petrobras", "vale", "empresa", "ltda", "sa", 
             "tem infracoes", "infrações de", "qual tipo"
         ]
-        return any(indicator in question.lower() for indicator in indicators)
+        return any(indicator in question.lower() for indicator in indicators) or bool(DOCUMENT_PATTERN.search(question))
+    
+    def _find_offender_rows(self, df: pd.DataFrame, names: list = None, document: str = None) -> pd.DataFrame:
+        """Linhas de `df` com algum dos `names` (exatos) ou com o CPF/CNPJ `document` (só dígitos)."""
+        index = self._get_name_index(df)
+        if index is not None:
+            positions = index.rows_for_document(document) if document else index.rows_for_names(names)
+            return df.iloc[positions]
+        
+        if document:
+            return df[(describe_documents(df['CPF_CNPJ_INFRATOR'])['DOC_KEY'] == document).to_numpy()]
+        return df[df['NOME_INFRATOR'].isin(names)]
     
     def _analyze_specific_offender_corrected(self, df: pd.DataFrame, question: str) -> Dict[str, Any]:
         """CORREÇÃO: Busca por infrator específico com fuzzy matching."""
         try:
+            # CPF/CNPJ na pergunta: busca exata pelo documento
+            document_match = DOCUMENT_PATTERN.search(question)
+            if document_match:
+                return self._analyze_offender_document(df, re.sub(r'\D', '', document_match.group(0)))
+            
             # Extrai nome da pergunta (simples heurística)
             question_words = question.lower().split()
             
@@ -549,39 +696,55 @@ class ChatbotFixed:
                 return {"answer": f"❌ Nenhuma empresa encontrada similar a '{search_name}'.", "source": "error"}
             
             # Filtra dados para os nomes encontrados
-            df_filtered = df[df['NOME_INFRATOR'].isin(similar_names)]
+            df_filtered = self._find_offender_rows(df, names=similar_names)
             
             if df_filtered.empty:
                 return {"answer": "❌ Nenhum dado encontrado para os nomes similares.", "source": "error"}
             
-            # Analisa tipos de infrações
-            if 'TIPO_INFRACAO' not in df_filtered.columns:
-                return {"answer": "❌ Coluna de tipos de infração não encontrada.", "source": "error"}
-            
-            infraction_types = df_filtered['TIPO_INFRACAO'].value_counts()
-            
-            answer = f"**🏢 Infrações encontradas para '{search_name}':**\n\n"
-            
-            if len(similar_names) > 1:
-                answer += f"**Nomes similares encontrados:** {', '.join(similar_names)}\n\n"
-            
-            answer += "**Tipos de infrações:**\n"
-            for tipo, count in infraction_types.items():
-                answer += f"• **{tipo}**: {count} infrações\n"
-            
-            # Adiciona valor total se disponível
-            if 'VAL_AUTO_INFRACAO_NUMERIC' in df_filtered.columns:
-                total_value = df_filtered['VAL_AUTO_INFRACAO_NUMERIC'].sum()
-                if total_value > 0:
-                    answer += f"\n💰 **Valor total das multas**: {self._format_currency_brazilian(total_value)}"
-            
-            answer += f"\n📊 **Total de infrações**: {len(df_filtered)}"
-            
-            return {"answer": answer, "source": "data_analysis"}
+            return self._describe_offender_rows(df_filtered, search_name, similar_names)
             
         except Exception as e:
             return {"answer": f"❌ Erro na busca específica: {e}", "source": "error"}
     
+    def _analyze_offender_document(self, df: pd.DataFrame, document: str) -> Dict[str, Any]:
+        """Infrações de um CPF/CNPJ exato (`document` só com dígitos), com o CPF mascarado na resposta."""
+        label = mask_documents(pd.Series([document])).iloc[0]
+        df_filtered = self._find_offender_rows(df, document=document)
+        
+        if df_filtered.empty:
+            return {"answer": f"❌ Nenhuma infração encontrada para o documento {label}.", "source": "error"}
+        
+        names = df_filtered['NOME_INFRATOR'].dropna().unique().tolist()
+        return self._describe_offender_rows(df_filtered, label, names)
+    
+    def _describe_offender_rows(self, df_filtered: pd.DataFrame, search_label: str, names: list) -> Dict[str, Any]:
+        """Resposta com os tipos de infração, valor total e total de autos das linhas encontradas."""
+        # Analisa tipos de infrações
+        if 'TIPO_INFRACAO' not in df_filtered.columns:
+            return {"answer": "❌ Coluna de tipos de infração não encontrada.", "source": "error"}
+        
+        infraction_types = df_filtered['TIPO_INFRACAO'].value_counts()
+        infraction_types = infraction_types[infraction_types > 0]
+        
+        answer = f"**🏢 Infrações encontradas para '{search_label}':**\n\n"
+        
+        if len(names) > 1:
+            answer += f"**Nomes similares encontrados:** {', '.join(names)}\n\n"
+        
+        answer += "**Tipos de infrações:**\n"
+        for tipo, count in infraction_types.items():
+            answer += f"• **{tipo}**: {count} infrações\n"
+        
+        # Adiciona valor total se disponível
+        if 'VAL_AUTO_INFRACAO_NUMERIC' in df_filtered.columns:
+            total_value = df_filtered['VAL_AUTO_INFRACAO_NUMERIC'].sum()
+            if total_value > 0:
+                answer += f"\n💰 **Valor total das multas**: {self._format_currency_brazilian(total_value)}"
+        
+        answer += f"\n📊 **Total de infrações**: {len(df_filtered)}"
+        
+        return {"answer": answer, "source": "data_analysis"}
+    
     def _analyze_geographic_specific_corrected(self, df: pd.DataFrame, question: str) -> Dict[str, Any]:
         """CORREÇÃO: Análise geográfica específica com filtros corretos."""
         try:
@@ -607,7 +770,7 @@ class ChatbotFixed:
                 filters['DOC_TYPE'] = 'CPF'
             
             # Aplica filtros
-            df_filtered = df.copy()
+            df_filtered = df
             for column, value in filters.items():
                 if column in df_filtered.columns:
                     df_filtered = df_filtered[df_filtered[column] == value]
@@ -616,13 +779,20 @@ class ChatbotFixed:
                 filter_description = ', '.join([f"{k}={v}" for k, v in filters.items()])
                 return {"answer": f"❌ Nenhum dado encontrado para os filtros: {filter_description}", "source": "error"}
             
+            # Mesmos filtros no formato do índice de infratores
+            index_filters = {
+                "ufs": [filters['UF']] if 'UF' in filters else [],
+                "tipos": [filters['TIPO_INFRACAO']] if 'TIPO_INFRACAO' in filters else [],
+                "doc_type": filters.get('DOC_TYPE'),
+            }
+            
             # Analisa por valor se solicitado
             if "soma de valores" in question_lower or "valor" in question_lower:
                 if 'VAL_AUTO_INFRACAO_NUMERIC' not in df_filtered.columns:
                     return {"answer": "❌ Dados de valores não disponíveis.", "source": "error"}
                 
-                # Agrupa por infrator e soma valores
-                top_by_value = df_filtered.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum().sort_values(ascending=False).head(10)
+                # Soma valores por infrator (índice de infratores)
+                top_by_value = self._rank_offenders(df_filtered, index_filters, by='value')
                 
                 filter_description = ', '.join([f"{k}: {v}" for k, v in filters.items()])
                 answer = f"**💰 Top 10 por Valor Total - {filter_description}:**\n\n"
@@ -638,7 +808,7 @@ class ChatbotFixed:
                 
             else:
                 # Análise por quantidade de infrações
-                top_by_count = df_filtered.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']).size().sort_values(ascending=False).head(10)
+                top_by_count = self._rank_offenders(df_filtered, index_filters, by='count')
                 
                 filter_description = ', '.join([f"{k}: {v}" for k, v in filters.items()])
                 answer = f"**📊 Top 10 por Quantidade - {filter_description}:**\n\n"
@@ -661,7 +831,8 @@ class ChatbotFixed:
             if 'UF' not in df.columns:
                 return {"answer": "❌ Coluna UF não encontrada.", "source": "error"}
             
-            state_counts = df['UF'].value_counts().head(10)
+            state_counts = df['UF'].value_counts()
+            state_counts = state_counts[state_counts > 0].head(10)
             
             answer = "**🏆 Top Estados com Mais Infrações:**\n\n"
             for i, (uf, count) in enumerate(state_counts.items(), 1):
@@ -680,7 +851,7 @@ class ChatbotFixed:
                 return {"answer": "❌ Colunas necessárias não encontradas.", "source": "error"}
             
             df_clean = df[df['MUNICIPIO'].notna() & df['UF'].notna()]
-            muni_counts = df_clean.groupby(['MUNICIPIO', 'UF']).size().sort_values(ascending=False).head(10)
+            muni_counts = df_clean.groupby(['MUNICIPIO', 'UF'], observed=True).size().sort_values(ascending=False).head(10)
             
             answer = "**🏙️ Top Municípios com Mais Infrações:**\n\n"
             for i, ((municipio, uf), count) in enumerate(muni_counts.items(), 1):
@@ -804,8 +975,14 @@ class ChatbotFixed:
         # Default: análise local
         return self._answer_with_data_analysis(question)
     
+    @st.fragment
     def display_chat_interface(self):
-        """Exibe a interface do chatbot CORRIGIDA."""
+        """
+        Exibe a interface do chatbot CORRIGIDA.
+        
+        É um fragmento: enviar uma pergunta reexecuta só o chat, sem refazer
+        os gráficos do dashboard.
+        """
         
         # Header com informações do modelo atual
         col1, col2, col3 = st.columns([2, 1, 1])
@@ -820,7 +997,8 @@ class ChatbotFixed:
         
         with col3:
             if st.button("🔄 Recarregar", help="Limpa cache e recarrega dados"):
-                self.cached_data = None
+                get_dataset_store().invalidate('ibama_infracao')
+                get_answer_cache().clear()
                 st.success("Cache limpo!")
         
         # Aviso sobre correções
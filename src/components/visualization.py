@@ -1,10 +1,30 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import pydeck as pdk
 import numpy as np
+import os
+from typing import Optional
+
+import config
 
 # Importa as funções de formatação
-from src.utils.formatters import format_currency_brazilian, format_number_brazilian
+from src.utils.formatters import format_currency_brazilian, format_datetime_brazilian, format_number_brazilian
+from src.utils.aggregate_cube import AggregateCube
+from src.utils.dataset_store import get_aggregate_cache, get_answer_cache, get_dataset_store, get_filter_cache
+from src.utils.documents import classify_documents, mask_documents
+from src.utils.instrumentation import annotate, get_perf_recorder, process_memory_mb, timed
+from src.utils.prefetch import get_prefetch
+from src.utils.schema import memory_report, normalize_dataset, parse_decimal
+from src.utils.spatial import bin_coordinates, map_zoom
+
+# Colunas usadas pelos gráficos e mapas do dashboard. Apenas elas são baixadas
+# do Supabase - campos grandes como DS_WKT e DES_AUTO_INFRACAO ficam de fora.
+DASHBOARD_COLUMNS = [
+    'NUM_AUTO_INFRACAO', 'DAT_HORA_AUTO_INFRACAO', 'UF', 'COD_MUNICIPIO', 'MUNICIPIO',
+    'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'DES_STATUS_FORMULARIO', 'VAL_AUTO_INFRACAO',
+    'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO'
+]
 
 # Importa o paginador CORRIGIDO
 try:
@@ -45,6 +65,9 @@ class DataVisualization:
             self.paginator = SupabasePaginator(database.supabase)
         else:
             self.paginator = None
+        
+        # Funções RPC que não existem no banco (ver sql/dashboard_rpcs.sql)
+        self._unavailable_rpcs = set()
 
     def _ensure_unique_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -78,21 +101,54 @@ class DataVisualization:
             print("⚠️ Coluna NUM_AUTO_INFRACAO não encontrada - contagem pode estar incorreta")
             return df
 
+    def _data_version(self) -> str:
+        """Versão da base usada como parte da chave dos recortes filtrados."""
+        if self.paginator:
+            return self.paginator.get_data_version('ibama_infracao')
+        try:
+            return f"duckdb-{os.path.getmtime(config.DB_PATH)}"
+        except OSError:
+            return "duckdb"
+
+    @staticmethod
+    def _filter_key(selected_ufs: list, date_filters: dict) -> tuple:
+        """Forma canônica (independente de ordem) dos filtros do dashboard."""
+        ufs = tuple(sorted(selected_ufs or []))
+        if date_filters["mode"] == "simple":
+            period = tuple(sorted(int(year) for year in date_filters["years"]))
+        else:
+            period = tuple(sorted(
+                (int(year), tuple(sorted(int(month) for month in months)))
+                for year, months in date_filters["periods"].items()
+            ))
+        return (ufs, date_filters["mode"], period)
+
     def _get_filtered_data_advanced(self, selected_ufs: list, date_filters: dict) -> pd.DataFrame:
         """
         Obtém dados filtrados usando os novos filtros avançados de data.
-        CORRIGIDA: Usa cache por sessão individual.
+        
+        O recorte (no esquema tipado de src/utils/schema.py) é calculado uma
+        vez por (versão dos dados, UFs, período) e guardado em um cache LRU do
+        processo: todos os gráficos de uma renderização leem o mesmo resultado.
+        Não altere o DataFrame retornado no lugar.
         """
+        key = (self._data_version(),) + self._filter_key(selected_ufs, date_filters)
+        cache = get_filter_cache()
         
+        df = cache.get(key)
+        if df is not None:
+            return df
+        
+        df, base_loaded = self._build_filtered_frame(selected_ufs, date_filters)
+        if base_loaded:
+            cache.put(key, df)
+        return df
+
+    def _load_base_frame(self) -> pd.DataFrame:
+        """Base deduplicada no esquema tipado, antes dos filtros (vazia se não houver dados)."""
         if self.paginator:
-            # Usa paginação para buscar todos os dados ÚNICOS POR SESSÃO
-            print("🔄 Usando paginação para buscar todos os dados únicos desta sessão...")
-            
-            # Gera cache key específico para estes filtros desta sessão
-            filter_str = f"ufs_{selected_ufs}_periods_{date_filters.get('periods', date_filters.get('years', []))}"
-            cache_key = self.paginator._get_session_key('ibama_infracao', filter_str)
-            
-            df = self.paginator.get_all_records('ibama_infracao', cache_key)
+            # Dataset compartilhado entre as sessões (baixado uma vez por versão dos dados)
+            df = self.paginator.get_all_records('ibama_infracao', columns=DASHBOARD_COLUMNS)
         else:
             # Fallback para método tradicional (DuckDB ou erro no Supabase)
             print("⚠️ Usando método tradicional (sem paginação)")
@@ -102,8 +158,10 @@ class DataVisualization:
                     result = self.database.supabase.table('ibama_infracao').select('*').limit(50000).execute()
                     df = pd.DataFrame(result.data)
                 else:
-                    # DuckDB - usa query direta
-                    df = self.database.execute_query("SELECT * FROM ibama_infracao")
+                    # DuckDB - só as colunas do dashboard (textos longos ficam no banco)
+                    available = self.database.execute_query("SELECT * FROM ibama_infracao LIMIT 0").columns
+                    selected = ", ".join(f'"{col}"' for col in DASHBOARD_COLUMNS if col in available) or "*"
+                    df = self.database.execute_query(f"SELECT {selected} FROM ibama_infracao")
                 
             except Exception as e:
                 st.error(f"Erro ao obter dados: {e}")
@@ -112,11 +170,24 @@ class DataVisualization:
         # CRÍTICO: O paginador JÁ retorna dados únicos, mas valida por segurança
         df = self._ensure_unique_data(df)
         
+        # O paginador já entrega o esquema tipado; o DuckDB ainda não
+        df = normalize_dataset(df)
+        
         if df.empty:
             print("❌ Nenhum dado único disponível após validação")
             return df
         
         print(f"✅ Base de dados carregada: {len(df):,} infrações únicas")
+        return df
+
+    def _build_filtered_frame(self, selected_ufs: list, date_filters: dict) -> tuple:
+        """
+        Aplica filtro de UF e de período sobre a base compartilhada.
+        Retorna (recorte, base_carregada) - recortes de uma base vazia não vão para o cache.
+        """
+        df = self._load_base_frame()
+        if df.empty:
+            return df, False
         
         # Aplica filtro de UF
         if selected_ufs and 'UF' in df.columns:
@@ -127,96 +198,338 @@ class DataVisualization:
         df = self._apply_date_filter_to_dataframe(df, date_filters)
         print(f"📅 Após filtros de data: {len(df):,} registros únicos")
         
-        return df
+        return df, True
 
     def _apply_date_filter_to_dataframe(self, df: pd.DataFrame, date_filters: dict) -> pd.DataFrame:
-        """Aplica filtros de data ao DataFrame."""
+        """Aplica filtros de data ao DataFrame (usa as colunas YEAR/MONTH do esquema tipado)."""
         if df.empty or 'DAT_HORA_AUTO_INFRACAO' not in df.columns:
             return df
         
         try:
-            # Converte coluna de data
-            df['DATE_PARSED'] = pd.to_datetime(df['DAT_HORA_AUTO_INFRACAO'], errors='coerce')
-            df_with_date = df[df['DATE_PARSED'].notna()].copy()
-            
-            if df_with_date.empty:
-                return df_with_date
+            df = normalize_dataset(df)
             
             if date_filters["mode"] == "simple":
-                # Filtro simples por anos
-                mask = df_with_date['DATE_PARSED'].dt.year.isin(date_filters["years"])
-                return df_with_date[mask]
-            
+                # Filtro simples por anos (YEAR = 0 indica data inválida)
+                mask = df['YEAR'].isin([int(year) for year in date_filters["years"]])
             else:
-                # Filtro avançado por períodos
-                masks = []
-                for year, months in date_filters["periods"].items():
-                    year_mask = df_with_date['DATE_PARSED'].dt.year == year
-                    month_mask = df_with_date['DATE_PARSED'].dt.month.isin(months)
-                    masks.append(year_mask & month_mask)
-                
-                if masks:
-                    final_mask = masks[0]
-                    for mask in masks[1:]:
-                        final_mask = final_mask | mask
-                    return df_with_date[final_mask]
-                else:
+                # Filtro avançado por períodos, comparando ano*100+mês de uma vez
+                periods = [
+                    int(year) * 100 + int(month)
+                    for year, months in date_filters["periods"].items()
+                    for month in months
+                ]
+                if not periods:
                     return pd.DataFrame()
+                year_month = df['YEAR'].astype('int32') * 100 + df['MONTH']
+                mask = year_month.isin(periods)
+            
+            return df[mask]
         
         except Exception as e:
             st.error(f"Erro ao aplicar filtro de data: {e}")
             return df
 
+    # ======================== AGREGAÇÕES (RPC NO SUPABASE OU PANDAS) ========================
+
+    def _rpc_filter_params(self, selected_ufs: list, date_filters: dict) -> dict:
+        """Converte os filtros do dashboard nos parâmetros das funções de sql/dashboard_rpcs.sql."""
+        params = {
+            "p_ufs": list(selected_ufs) if selected_ufs else None,
+            "p_years": None,
+            "p_year_months": None,
+        }
+        
+        if date_filters["mode"] == "simple":
+            params["p_years"] = [int(year) for year in date_filters["years"]]
+        else:
+            params["p_year_months"] = [
+                int(year) * 100 + int(month)
+                for year, months in date_filters["periods"].items()
+                for month in months
+            ]
+        
+        return params
+
+    def start_prefetch(self):
+        """
+        Inicia em segundo plano a carga da base do dashboard (e do cubo de
+        agregados), para que ela corra enquanto a barra lateral é desenhada.
+        A carga usa um paginador próprio, que informa o progresso ao
+        prefetch; os gráficos esperam por ela no DatasetStore.
+        """
+        if not self.paginator:
+            return None
+        
+        loader = DataVisualization(self.database)
+        loader.paginator.on_progress = get_prefetch().report
+        return get_prefetch().start(loader._warm_up)
+
+    def _warm_up(self):
+        """Carga de fundo: base do dashboard e, no modo 'cube', o cubo montado a partir dela."""
+        if config.DASHBOARD_AGGREGATES == 'cube':
+            self._get_cube()
+        else:
+            self._load_base_frame()
+
+    def wait_for_prefetch(self):
+        """Enquanto a carga de fundo não termina, mostra o progresso dela (os gráficos a esperariam)."""
+        prefetch = get_prefetch()
+        if not prefetch.running:
+            return
+        
+        bar = st.progress(0.0, text="⏳ Carregando a base de infrações...")
+        while not prefetch.wait(timeout=0.5):
+            status = prefetch.status()
+            if status['total']:
+                bar.progress(min(status['rows'] / status['total'], 1.0),
+                             text=f"⏳ Carregando a base de infrações: {status['rows']:,} de "
+                                  f"~{status['total']:,} registros ({status['seconds']:.0f}s)")
+            else:
+                bar.progress(0.0, text=f"⏳ Carregando a base de infrações ({status['seconds']:.0f}s)...")
+        bar.empty()
+
+    def _get_cube(self) -> Optional[AggregateCube]:
+        """
+        Cubo de agregados da versão atual dos dados, montado uma vez por versão
+        e compartilhado pelas sessões (None se não houver dados).
+        """
+        def load():
+            return AggregateCube(self._load_base_frame(), top_k=config.AGGREGATE_CUBE_TOP_K)
+        
+        try:
+            cube = get_dataset_store().get_or_load('ibama_infracao:cube', self._data_version(), load)
+        except Exception as e:
+            print(f"⚠️ Erro ao montar o cubo de agregados: {e}")
+            return None
+        return None if cube.empty else cube
+
+    def _get_aggregate(self, rpc_name: str, selected_ufs: list, date_filters: dict,
+                       compute, extra_params: dict = None) -> pd.DataFrame:
+        """
+        Obtém uma agregação já pronta para o gráfico.
+        
+        Com DASHBOARD_AGGREGATES = 'cube' (padrão), soma as células do cubo
+        de agregados (src/utils/aggregate_cube.py). Sem cubo, chama a função
+        `rpc_name` no Supabase (apenas o resultado trafega); se ela não estiver
+        instalada, ou no DuckDB, busca os dados filtrados e aplica `compute(df)`
+        em pandas. Todos devolvem as mesmas colunas.
+        
+        O resultado fica no cache de agregações do processo por (versão dos
+        dados, filtros, agregação): um rerun com os mesmos filtros - uma
+        pergunta no chatbot, um controle de outra seção - não recalcula o
+        gráfico. Não altere o DataFrame retornado no lugar.
+        """
+        key = (('agg', rpc_name, self._data_version()) + self._filter_key(selected_ufs, date_filters)
+               + tuple(sorted((extra_params or {}).items())))
+        cache = get_aggregate_cache()
+        
+        result = cache.get(key)
+        if result is not None:
+            annotate(source='memo', rows_out=len(result))
+            return result
+        
+        params = self._rpc_filter_params(selected_ufs, date_filters)
+        params.update(extra_params or {})
+        result, complete = self._compute_aggregate(rpc_name, params, selected_ufs, date_filters, compute)
+        if complete:
+            cache.put(key, result)
+        return result
+
+    def _compute_aggregate(self, rpc_name: str, params: dict, selected_ufs: list, date_filters: dict,
+                           compute) -> tuple:
+        """
+        Calcula a agregação pelo cubo, pela RPC ou em pandas (ver _get_aggregate).
+        Retorna (resultado, completo) - resultados de uma base vazia não vão para o cache.
+        """
+        if config.DASHBOARD_AGGREGATES == 'cube':
+            cube = self._get_cube()
+            if cube is not None:
+                result = cube.answer(rpc_name, params)
+                if result is not None:
+                    annotate(source='cube', rows_in=len(cube.select_cells(params)), rows_out=len(result))
+                    return result, True
+                print(f"⚠️ Agregação {rpc_name} não está no cubo - consultando os registros")
+        
+        use_rpc = (
+            self.database is not None and self.database.is_cloud
+            and rpc_name not in self._unavailable_rpcs
+        )
+        
+        if use_rpc:
+            try:
+                result = self.database.call_rpc(rpc_name, params)
+                annotate(source='rpc', rows_out=len(result))
+                return result, True
+            except Exception as e:
+                error_msg = str(e)
+                # Função não instalada: não tenta de novo nesta sessão
+                if 'PGRST202' in error_msg or '42883' in error_msg or 'could not find the function' in error_msg.lower():
+                    self._unavailable_rpcs.add(rpc_name)
+                print(f"⚠️ RPC {rpc_name} indisponível ({error_msg[:100]}) - agregando em pandas")
+        
+        df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+        result = compute(df)
+        annotate(source='pandas', rows_in=len(df), rows_out=len(result))
+        return result, not df.empty
+
+    @staticmethod
+    def _parse_fine_values(df: pd.DataFrame) -> pd.Series:
+        """Valores das multas como número (no esquema tipado já são float64)."""
+        return parse_decimal(df['VAL_AUTO_INFRACAO'])
+
+    @staticmethod
+    def _plain_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Converte colunas categóricas em texto, como nos resultados das RPCs."""
+        categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+        return df.astype({col: object for col in categorical}) if categorical else df
+
+    def _compute_overview(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df.empty:
+            return pd.DataFrame(columns=['total_infracoes', 'valor_total_multas', 'total_municipios'])
+        
+        valor_total_multas = self._parse_fine_values(df).sum() if 'VAL_AUTO_INFRACAO' in df.columns else 0
+        
+        # Total de municípios - USA COD_MUNICIPIO para maior precisão
+        if 'COD_MUNICIPIO' in df.columns:
+            codes = df['COD_MUNICIPIO']
+            total_municipios = codes[codes.notna() & (codes != '')].nunique()
+        elif 'MUNICIPIO' in df.columns:
+            # Fallback para nome se código não estiver disponível
+            total_municipios = df['MUNICIPIO'].nunique()
+        else:
+            total_municipios = 0
+        
+        return pd.DataFrame({
+            'total_infracoes': [len(df)],
+            'valor_total_multas': [valor_total_multas],
+            'total_municipios': [total_municipios]
+        })
+
+    def _compute_counts_by_uf(self, df: pd.DataFrame, limit: int = 15) -> pd.DataFrame:
+        if df.empty or 'UF' not in df.columns:
+            return pd.DataFrame(columns=['UF', 'total'])
+        
+        uf_counts = df.loc[df['UF'].notna() & (df['UF'] != ''), 'UF'].value_counts()
+        # UF é categórica: descarta estados sem registros no recorte
+        uf_counts = uf_counts[uf_counts > 0].head(limit)
+        return pd.DataFrame({'UF': uf_counts.index.astype(object), 'total': uf_counts.values})
+
+    def _compute_top_municipios(self, df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+        columns = ['COD_MUNICIPIO', 'MUNICIPIO', 'UF', 'total_infracoes']
+        if df.empty or not all(field in df.columns for field in ['MUNICIPIO', 'UF']):
+            return pd.DataFrame(columns=columns)
+        
+        # Remove valores vazios nos campos necessários
+        df_clean = df[
+            df['MUNICIPIO'].notna() & 
+            df['UF'].notna() &
+            (df['MUNICIPIO'] != '') & 
+            (df['UF'] != '')
+        ]
+        
+        # Método preferido: usar código do município se disponível
+        if 'COD_MUNICIPIO' in df_clean.columns:
+            df_clean = df_clean[df_clean['COD_MUNICIPIO'].notna() & (df_clean['COD_MUNICIPIO'] != '')]
+            group_cols = ['COD_MUNICIPIO', 'MUNICIPIO', 'UF']
+        else:
+            group_cols = ['MUNICIPIO', 'UF']
+        
+        if df_clean.empty:
+            return pd.DataFrame(columns=columns)
+        
+        muni_counts = self._plain_columns(
+            df_clean.groupby(group_cols, observed=True).size().reset_index(name='total_infracoes')
+        )
+        # Ordenação estável com empates pelas chaves, igual ao cubo e à RPC
+        # (nlargest não garante a ordem dos empates quando limit >= grupos)
+        return muni_counts.sort_values(['total_infracoes'] + group_cols, ascending=[False] + [True] * len(group_cols),
+                                       kind='stable').head(limit)
+
+    def _compute_value_by_type(self, df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+        if df.empty or 'TIPO_INFRACAO' not in df.columns or 'VAL_AUTO_INFRACAO' not in df.columns:
+            return pd.DataFrame(columns=['TIPO_INFRACAO', 'valor_total'])
+        
+        values = self._parse_fine_values(df)
+        valid = values.notna() & df['TIPO_INFRACAO'].notna() & (df['TIPO_INFRACAO'] != '')
+        
+        type_values = values[valid].groupby(df.loc[valid, 'TIPO_INFRACAO'], observed=True).sum().nlargest(limit)
+        return pd.DataFrame({'TIPO_INFRACAO': type_values.index.astype(object), 'valor_total': type_values.values})
+
+    def _compute_counts_by_gravity(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df.empty or 'GRAVIDADE_INFRACAO' not in df.columns:
+            return pd.DataFrame(columns=['GRAVIDADE_INFRACAO', 'total'])
+        
+        # Valores vazios/nulos contam como "Sem avaliação feita"
+        gravity = df['GRAVIDADE_INFRACAO'].astype(object).fillna('Sem avaliação feita').replace('', 'Sem avaliação feita')
+        gravity_counts = gravity.value_counts()
+        return pd.DataFrame({'GRAVIDADE_INFRACAO': gravity_counts.index, 'total': gravity_counts.values})
+
+    def _compute_counts_by_status(self, df: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+        if df.empty or 'DES_STATUS_FORMULARIO' not in df.columns:
+            return pd.DataFrame(columns=['DES_STATUS_FORMULARIO', 'total'])
+        
+        status = df['DES_STATUS_FORMULARIO']
+        status_counts = status[status.notna() & (status != '')].value_counts()
+        status_counts = status_counts[status_counts > 0].head(limit)
+        return pd.DataFrame({'DES_STATUS_FORMULARIO': status_counts.index.astype(object), 'total': status_counts.values})
+
+    def _prepare_offenders(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Autos com nome, documento e valor válidos, com o tipo de documento (CPF/CNPJ/OUTRO)."""
+        required_cols = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO']
+        if df.empty or not all(col in df.columns for col in required_cols):
+            return pd.DataFrame(columns=required_cols + ['VAL_AUTO_INFRACAO_NUMERIC', 'doc_type'])
+        
+        df_clean = df[
+            df['NOME_INFRATOR'].notna() & 
+            df['CPF_CNPJ_INFRATOR'].notna() &
+            (df['NOME_INFRATOR'] != '') & 
+            (df['CPF_CNPJ_INFRATOR'] != '')
+        ]
+        df_clean = df_clean.assign(VAL_AUTO_INFRACAO_NUMERIC=self._parse_fine_values(df_clean))
+        df_clean = df_clean[df_clean['VAL_AUTO_INFRACAO_NUMERIC'].notna()]
+        
+        # DOC_TYPE vem do esquema tipado (CPF: 11 dígitos | CNPJ: 14 dígitos)
+        doc_type = df_clean['DOC_TYPE'] if 'DOC_TYPE' in df_clean.columns else classify_documents(df_clean['CPF_CNPJ_INFRATOR'])
+        return df_clean.assign(doc_type=np.asarray(doc_type, dtype=object))
+
+    def _compute_top_offenders(self, df: pd.DataFrame, doc_type: str, limit: int = 10) -> pd.DataFrame:
+        df_clean = self._prepare_offenders(df)
+        df_doc = df_clean[df_clean['doc_type'] == doc_type]
+        if df_doc.empty:
+            return pd.DataFrame(columns=['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO_NUMERIC'])
+        
+        grouped = df_doc.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum().reset_index()
+        # Empates pelo nome e documento, igual ao cubo e à RPC
+        return grouped.sort_values(['VAL_AUTO_INFRACAO_NUMERIC', 'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'],
+                                   ascending=[False, True, True], kind='stable').head(limit)
+
+    def _compute_offender_summary(self, df: pd.DataFrame) -> pd.DataFrame:
+        counts = self._prepare_offenders(df)['doc_type'].value_counts()
+        return pd.DataFrame({'doc_type': counts.index, 'total': counts.values})
+
     # ======================== MÉTODOS AVANÇADOS CORRIGIDOS ========================
 
+    @timed('chart')
     def create_overview_metrics_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria as métricas de visão geral usando dados únicos garantidos POR SESSÃO."""
+        """Cria as métricas de visão geral usando dados únicos (um registro por auto de infração)."""
         if not self.database:
             st.warning("Banco de dados não disponível.")
             return
 
         try:
-            with st.spinner("Carregando dados únicos desta sessão..."):
-                df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            with st.spinner("Carregando métricas..."):
+                overview = self._get_aggregate(
+                    'dashboard_overview', selected_ufs, date_filters, self._compute_overview
+                )
             
-            if df.empty:
+            if overview.empty or int(overview['total_infracoes'].iloc[0]) == 0:
                 st.warning("Nenhum dado encontrado para os filtros selecionados.")
                 return
 
-            # Dados já são únicos POR SESSÃO (garantido pelo _ensure_unique_data)
-            total_infracoes = len(df)
-            metric_note = "infrações únicas desta sessão"
-            
-            # Debug: Verifica se realmente não há duplicatas
-            if 'NUM_AUTO_INFRACAO' in df.columns:
-                unique_count = df['NUM_AUTO_INFRACAO'].nunique()
-                if unique_count != total_infracoes:
-                    print(f"🚨 ERRO CRÍTICO: Ainda há duplicatas! {total_infracoes} registros vs {unique_count} únicos")
-                    # Força correção emergencial
-                    df = df.drop_duplicates(subset=['NUM_AUTO_INFRACAO'], keep='first')
-                    total_infracoes = len(df)
-                    st.warning(f"⚠️ Duplicatas corrigidas automaticamente: {total_infracoes} infrações únicas")
-            
-            # Valor total das multas
-            try:
-                df['VAL_AUTO_INFRACAO_NUMERIC'] = pd.to_numeric(
-                    df['VAL_AUTO_INFRACAO'].astype(str).str.replace(',', '.'), 
-                    errors='coerce'
-                )
-                valor_total_multas = df['VAL_AUTO_INFRACAO_NUMERIC'].sum()
-                if np.isnan(valor_total_multas):
-                    valor_total_multas = 0
-            except:
-                valor_total_multas = 0
-            
-            # Total de municípios - USA COD_MUNICIPIO para maior precisão
-            if 'COD_MUNICIPIO' in df.columns:
-                total_municipios = df['COD_MUNICIPIO'].nunique()
-            elif 'MUNICIPIO' in df.columns:
-                # Fallback para nome se código não estiver disponível
-                total_municipios = df['MUNICIPIO'].nunique()
-            else:
-                total_municipios = 0
+            total_infracoes = int(overview['total_infracoes'].iloc[0])
+            valor_total_multas = pd.to_numeric(overview['valor_total_multas'], errors='coerce').fillna(0).iloc[0]
+            total_municipios = int(overview['total_municipios'].iloc[0])
+            metric_note = "infrações únicas"
 
             # Exibe métricas
             col1, col2, col3 = st.columns(3)
@@ -224,366 +537,276 @@ class DataVisualization:
             col2.metric("Valor Total das Multas", format_currency_brazilian(valor_total_multas))
             col3.metric("Municípios Afetados", format_number_brazilian(total_municipios))
             
-            # Info com garantia de unicidade POR SESSÃO
+            # Info com garantia de unicidade
             st.caption(f"📊 Dados únicos: {total_infracoes:,} {metric_note} | {date_filters['description']}")
 
         except Exception as e:
             st.error(f"Erro ao calcular métricas: {e}")
+            annotate(error=str(e)[:200])
 
+    @timed('chart')
     def create_state_distribution_chart_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria gráfico de distribuição por estado com dados únicos garantidos POR SESSÃO."""
+        """Cria gráfico de distribuição por estado com dados únicos garantidos."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            chart_df = self._get_aggregate(
+                'dashboard_counts_by_uf', selected_ufs, date_filters, self._compute_counts_by_uf
+            )
             
-            if df.empty or 'UF' not in df.columns:
+            if chart_df.empty:
                 st.warning("Dados de UF não disponíveis.")
                 return
             
-            # Dados já são únicos POR SESSÃO, apenas conta por UF
-            uf_counts = df['UF'].value_counts().head(15)
-            method_note = "infrações únicas desta sessão"
+            method_note = "infrações únicas"
             
-            if not uf_counts.empty:
-                chart_df = pd.DataFrame({
-                    'UF': uf_counts.index,
-                    'total': uf_counts.values
-                })
-                
-                fig = px.bar(
-                    chart_df, 
-                    x='UF', 
-                    y='total', 
-                    title="<b>Distribuição de Infrações por Estado</b>", 
-                    color='total',
-                    labels={'UF': 'Estado', 'total': f'Nº de Infrações ({method_note})'}
-                )
-                
-                # Adiciona nota sobre método
-                fig.add_annotation(
-                    text=f"* Contagem: {method_note}",
-                    xref="paper", yref="paper",
-                    x=1, y=1.02, xanchor='right', yanchor='bottom',
-                    showarrow=False,
-                    font=dict(size=10, color="gray")
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+            fig = px.bar(
+                chart_df, 
+                x='UF', 
+                y='total', 
+                title="<b>Distribuição de Infrações por Estado</b>", 
+                color='total',
+                labels={'UF': 'Estado', 'total': f'Nº de Infrações ({method_note})'}
+            )
+            
+            # Adiciona nota sobre método
+            fig.add_annotation(
+                text=f"* Contagem: {method_note}",
+                xref="paper", yref="paper",
+                x=1, y=1.02, xanchor='right', yanchor='bottom',
+                showarrow=False,
+                font=dict(size=10, color="gray")
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
                 
         except Exception as e:
             st.error(f"Erro no gráfico de estados: {e}")
+            annotate(error=str(e)[:200])
 
+    @timed('chart')
     def create_municipality_hotspots_chart_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria gráfico dos municípios com mais infrações usando dados únicos garantidos POR SESSÃO."""
+        """Cria gráfico dos municípios com mais infrações usando dados únicos garantidos."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            muni_counts = self._get_aggregate(
+                'dashboard_top_municipios', selected_ufs, date_filters, self._compute_top_municipios
+            )
             
-            if df.empty:
-                st.warning("Dados não disponíveis.")
+            if muni_counts.empty:
+                st.warning("Dados de municípios não disponíveis.")
                 return
             
-            # Verifica se temos os campos necessários
-            required_fields = ['MUNICIPIO', 'UF']
-            if not all(field in df.columns for field in required_fields):
-                st.warning("Campos necessários para análise de municípios não encontrados.")
-                return
+            if 'COD_MUNICIPIO' in muni_counts.columns:
+                method_note = "* Contagem por código IBGE (infrações únicas)"
+            else:
+                st.caption("⚠️ Usando nomes de municípios (podem haver inconsistências)")
+                method_note = "* Contagem por nome (infrações únicas)"
             
-            # Remove valores vazios nos campos necessários
-            df_clean = df[
-                df['MUNICIPIO'].notna() & 
-                df['UF'].notna() &
-                (df['MUNICIPIO'] != '') & 
-                (df['UF'] != '')
-            ].copy()
+            # Cria label combinado para exibição
+            muni_counts = muni_counts.assign(
+                local=muni_counts['MUNICIPIO'].str.title() + ' (' + muni_counts['UF'] + ')'
+            )
             
-            if df_clean.empty:
-                st.warning("Dados válidos não disponíveis após limpeza.")
-                return
+            fig = px.bar(
+                muni_counts.sort_values('total_infracoes'), 
+                y='local', 
+                x='total_infracoes', 
+                orientation='h',
+                title="<b>Top 10 Municípios com Mais Infrações</b>",
+                labels={'local': 'Município', 'total_infracoes': 'Nº de Infrações Únicas'},
+                text='total_infracoes'
+            )
             
-            # Método preferido: usar código do município se disponível
-            if 'COD_MUNICIPIO' in df.columns:
-                # Remove códigos vazios
-                df_clean = df_clean[
-                    df_clean['COD_MUNICIPIO'].notna() & 
-                    (df_clean['COD_MUNICIPIO'] != '')
-                ]
-                
-                if df_clean.empty:
-                    st.warning("Códigos de município não disponíveis.")
-                    return
-                
-                # Conta infrações por código do município (dados já são únicos POR SESSÃO)
-                muni_counts = df_clean.groupby(['COD_MUNICIPIO', 'MUNICIPIO', 'UF']).size().reset_index(name='total_infracoes')
-                muni_counts = muni_counts.nlargest(10, 'total_infracoes')
-                
-                method_note = "* Contagem por código IBGE (infrações únicas desta sessão)"
-                
-            else:
-                # Fallback: usar nome do município
-                st.caption("⚠️ Usando nomes de municípios (podem haver inconsistências)")
-                
-                # Conta infrações por nome do município (dados já são únicos POR SESSÃO)
-                muni_counts = df_clean.groupby(['MUNICIPIO', 'UF']).size().reset_index(name='total_infracoes')
-                muni_counts = muni_counts.nlargest(10, 'total_infracoes')
-                
-                method_note = "* Contagem por nome (infrações únicas desta sessão)"
+            # Adiciona informação sobre o método usado
+            fig.add_annotation(
+                text=method_note,
+                xref="paper", yref="paper",
+                x=1, y=-0.1, xanchor='right', yanchor='top',
+                showarrow=False,
+                font=dict(size=10, color="gray")
+            )
             
-            if not muni_counts.empty:
-                # Cria label combinado para exibição
-                muni_counts['local'] = muni_counts['MUNICIPIO'].str.title() + ' (' + muni_counts['UF'] + ')'
-                
-                fig = px.bar(
-                    muni_counts.sort_values('total_infracoes'), 
-                    y='local', 
-                    x='total_infracoes', 
-                    orientation='h',
-                    title="<b>Top 10 Municípios com Mais Infrações</b>",
-                    labels={'local': 'Município', 'total_infracoes': 'Nº de Infrações Únicas'},
-                    text='total_infracoes'
-                )
-                
-                # Adiciona informação sobre o método usado
-                fig.add_annotation(
-                    text=method_note,
-                    xref="paper", yref="paper",
-                    x=1, y=-0.1, xanchor='right', yanchor='top',
-                    showarrow=False,
-                    font=dict(size=10, color="gray")
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True)
                 
         except Exception as e:
             st.error(f"Erro no gráfico de municípios: {e}")
+            annotate(error=str(e)[:200])
 
+    @timed('chart')
     def create_fine_value_by_type_chart_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria gráfico de valores de multa por tipo com dados únicos garantidos POR SESSÃO."""
+        """Cria gráfico de valores de multa por tipo com dados únicos garantidos."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
-            
-            if df.empty or 'TIPO_INFRACAO' not in df.columns:
-                return
-            
-            # Converte valores
-            df['VAL_AUTO_INFRACAO_NUMERIC'] = pd.to_numeric(
-                df['VAL_AUTO_INFRACAO'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
+            chart_df = self._get_aggregate(
+                'dashboard_value_by_type', selected_ufs, date_filters, self._compute_value_by_type
             )
             
-            # Remove valores inválidos
-            df_clean = df[
-                df['VAL_AUTO_INFRACAO_NUMERIC'].notna() & 
-                df['TIPO_INFRACAO'].notna() & 
-                (df['TIPO_INFRACAO'] != '')
-            ]
-            
-            if df_clean.empty:
+            if chart_df.empty:
                 return
             
-            # Agrupa por tipo (dados já são únicos POR SESSÃO)
-            type_values = df_clean.groupby('TIPO_INFRACAO')['VAL_AUTO_INFRACAO_NUMERIC'].sum().nlargest(10)
+            chart_df = chart_df.assign(
+                TIPO_INFRACAO=chart_df['TIPO_INFRACAO'].str.title(),
+                valor_total=pd.to_numeric(chart_df['valor_total'], errors='coerce')
+            )
             
-            if not type_values.empty:
-                chart_df = pd.DataFrame({
-                    'TIPO_INFRACAO': type_values.index,
-                    'valor_total': type_values.values
-                })
-                
-                chart_df['TIPO_INFRACAO'] = chart_df['TIPO_INFRACAO'].str.title()
-                
-                fig = px.bar(
-                    chart_df.sort_values('valor_total'), 
-                    y='TIPO_INFRACAO', 
-                    x='valor_total', 
-                    orientation='h',
-                    title="<b>Tipos de Infração por Valor de Multa (Top 10)</b>"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            fig = px.bar(
+                chart_df.sort_values('valor_total'), 
+                y='TIPO_INFRACAO', 
+                x='valor_total', 
+                orientation='h',
+                title="<b>Tipos de Infração por Valor de Multa (Top 10)</b>"
+            )
+            st.plotly_chart(fig, use_container_width=True)
                 
         except Exception as e:
             st.error(f"Erro no gráfico de tipos: {e}")
+            annotate(error=str(e)[:200])
 
+    @timed('chart')
     def create_gravity_distribution_chart_advanced(self, selected_ufs: list, date_filters: dict):
         """Cria gráfico de distribuição por gravidade incluindo infrações sem avaliação."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            gravity_df = self._get_aggregate(
+                'dashboard_counts_by_gravity', selected_ufs, date_filters, self._compute_counts_by_gravity
+            )
             
-            if df.empty or 'GRAVIDADE_INFRACAO' not in df.columns:
+            if gravity_df.empty:
                 return
             
-            # Prepara DataFrame tratando valores vazios/nulos como "Sem avaliação feita"
-            df_processed = df.copy()
-            df_processed['GRAVIDADE_INFRACAO'] = df_processed['GRAVIDADE_INFRACAO'].fillna('Sem avaliação feita')
-            df_processed['GRAVIDADE_INFRACAO'] = df_processed['GRAVIDADE_INFRACAO'].replace('', 'Sem avaliação feita')
-            
-            # Conta infrações por gravidade (dados já são únicos POR SESSÃO)
-            gravity_counts = df_processed['GRAVIDADE_INFRACAO'].value_counts()
-            method_note = "infrações únicas desta sessão"
-            
-            if not gravity_counts.empty:
-                # Define cores específicas para as categorias
-                color_map = {
-                    'Baixa': '#28a745',          # Verde
-                    'Média': '#ffc107',          # Amarelo  
-                    'Sem avaliação feita': '#6c757d'  # Cinza
-                }
-                
-                # Cria lista de cores baseada nos dados (ordem: Baixa, Média, Sem avaliação feita)
-                gravity_order = ['Baixa', 'Média', 'Sem avaliação feita']
-                ordered_counts = []
-                ordered_names = []
-                ordered_colors = []
-                
-                for gravity in gravity_order:
-                    if gravity in gravity_counts.index:
-                        ordered_counts.append(gravity_counts[gravity])
-                        ordered_names.append(gravity)
-                        ordered_colors.append(color_map.get(gravity, '#17a2b8'))
-                
-                # Adiciona outras categorias que não estão na ordem padrão
-                for gravity, count in gravity_counts.items():
-                    if gravity not in gravity_order:
-                        ordered_counts.append(count)
-                        ordered_names.append(gravity)
-                        ordered_colors.append('#17a2b8')  # Cor padrão
+            gravity_counts = gravity_df.set_index('GRAVIDADE_INFRACAO')['total'].astype(int)
+            method_note = "infrações únicas"
+            
+            # Define cores específicas para as categorias
+            color_map = {
+                'Baixa': '#28a745',          # Verde
+                'Média': '#ffc107',          # Amarelo  
+                'Sem avaliação feita': '#6c757d'  # Cinza
+            }
+            
+            # Cria lista de cores baseada nos dados (ordem: Baixa, Média, Sem avaliação feita)
+            gravity_order = ['Baixa', 'Média', 'Sem avaliação feita']
+            ordered_counts = []
+            ordered_names = []
+            ordered_colors = []
+            
+            for gravity in gravity_order:
+                if gravity in gravity_counts.index:
+                    ordered_counts.append(gravity_counts[gravity])
+                    ordered_names.append(gravity)
+                    ordered_colors.append(color_map.get(gravity, '#17a2b8'))
+            
+            # Adiciona outras categorias que não estão na ordem padrão
+            for gravity, count in gravity_counts.items():
+                if gravity not in gravity_order:
+                    ordered_counts.append(count)
+                    ordered_names.append(gravity)
+                    ordered_colors.append('#17a2b8')  # Cor padrão
+            
+            fig = px.pie(
+                values=ordered_counts,
+                names=ordered_names,
+                title=f"<b>Distribuição por Gravidade da Infração ({method_note})</b>", 
+                hole=0.4,
+                color_discrete_sequence=ordered_colors
+            )
+            
+            # Adiciona informação sobre dados sem avaliação se existirem
+            sem_avaliacao = gravity_counts.get('Sem avaliação feita', 0)
+            if sem_avaliacao > 0:
+                total_infracoes = gravity_counts.sum()
+                percentual_sem_avaliacao = (sem_avaliacao / total_infracoes) * 100
                 
-                fig = px.pie(
-                    values=ordered_counts,
-                    names=ordered_names,
-                    title=f"<b>Distribuição por Gravidade da Infração ({method_note})</b>", 
-                    hole=0.4,
-                    color_discrete_sequence=ordered_colors
+                fig.add_annotation(
+                    text=f"* {sem_avaliacao:,} infrações ({percentual_sem_avaliacao:.1f}%) sem avaliação de gravidade",
+                    xref="paper", yref="paper",
+                    x=0.5, y=-0.1, xanchor='center', yanchor='top',
+                    showarrow=False,
+                    font=dict(size=10, color="gray")
                 )
-                
-                # Adiciona informação sobre dados sem avaliação se existirem
-                sem_avaliacao = gravity_counts.get('Sem avaliação feita', 0)
-                if sem_avaliacao > 0:
-                    total_infracoes = gravity_counts.sum()
-                    percentual_sem_avaliacao = (sem_avaliacao / total_infracoes) * 100
-                    
-                    fig.add_annotation(
-                        text=f"* {sem_avaliacao:,} infrações ({percentual_sem_avaliacao:.1f}%) sem avaliação de gravidade",
-                        xref="paper", yref="paper",
-                        x=0.5, y=-0.1, xanchor='center', yanchor='top',
-                        showarrow=False,
-                        font=dict(size=10, color="gray")
-                    )
-                
-                st.plotly_chart(fig, use_container_width=True)
+            
+            st.plotly_chart(fig, use_container_width=True)
                 
         except Exception as e:
             st.error(f"Erro no gráfico de gravidade: {e}")
+            annotate(error=str(e)[:200])
+
+    def _render_offenders_chart(self, grouped: pd.DataFrame, doc_type: str):
+        """Desenha o Top 10 de pessoas físicas (CPF mascarado) ou empresas (CNPJ completo)."""
+        grouped = grouped.assign(
+            VAL_AUTO_INFRACAO_NUMERIC=pd.to_numeric(grouped['VAL_AUTO_INFRACAO_NUMERIC'], errors='coerce')
+        )
+        
+        # Rótulo combinado: nome (até 40 caracteres) + documento (CPF mascarado, CNPJ completo)
+        names = grouped['NOME_INFRATOR'].astype(str)
+        short_names = names.str[:40] + np.where(names.str.len() > 40, '...', '')
+        labels = short_names + f'\n({doc_type}: ' + mask_documents(grouped['CPF_CNPJ_INFRATOR']).astype(str) + ')'
+        
+        if doc_type == 'CPF':
+            title = "<b>Top 10 Pessoas Físicas por Valor de Multa</b>"
+            axis_label = 'Pessoa Física'
+            colors = None
+        else:
+            title = "<b>Top 10 Empresas por Valor de Multa</b>"
+            axis_label = 'Empresa'
+            colors = ['#ff6b6b']  # Cor diferente para empresas
+        
+        grouped = grouped.assign(label=labels)
+        
+        fig = px.bar(
+            grouped.sort_values('VAL_AUTO_INFRACAO_NUMERIC'), 
+            y='label', 
+            x='VAL_AUTO_INFRACAO_NUMERIC', 
+            orientation='h',
+            title=title,
+            labels={'label': axis_label, 'VAL_AUTO_INFRACAO_NUMERIC': 'Valor Total (R$)'},
+            text='VAL_AUTO_INFRACAO_NUMERIC',
+            color_discrete_sequence=colors
+        )
+        
+        # Formata os valores no eixo X como moeda
+        fig.update_layout(
+            xaxis_tickformat=',.0f',
+            height=600,
+            margin=dict(l=250)  # Mais espaço à esquerda para os nomes
+        )
+        
+        # Formata os textos dos valores
+        fig.update_traces(
+            texttemplate='R$ %{x:,.0f}',
+            textposition='outside'
+        )
+        
+        st.plotly_chart(fig, use_container_width=True)
 
+    @timed('chart')
     def create_main_offenders_chart_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria gráficos dos principais infratores separados por pessoas físicas (CPF) e empresas (CNPJ) com dados únicos garantidos POR SESSÃO."""
+        """Cria gráficos dos principais infratores separados por pessoas físicas (CPF) e empresas (CNPJ) com dados únicos garantidos."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
-            
-            if df.empty:
-                return
-            
-            # Verifica se temos as colunas necessárias
-            required_cols = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO']
-            if not all(col in df.columns for col in required_cols):
-                st.warning("Colunas necessárias para análise de infratores não encontradas.")
-                return
-            
-            # Remove valores inválidos
-            df_clean = df[
-                df['NOME_INFRATOR'].notna() & 
-                df['CPF_CNPJ_INFRATOR'].notna() &
-                df['VAL_AUTO_INFRACAO'].notna() &
-                (df['NOME_INFRATOR'] != '') & 
-                (df['CPF_CNPJ_INFRATOR'] != '') &
-                (df['VAL_AUTO_INFRACAO'] != '')
-            ].copy()
-            
-            if df_clean.empty:
-                st.warning("Dados válidos não disponíveis para análise de infratores.")
-                return
-            
-            # Converte valores para numérico
-            df_clean['VAL_AUTO_INFRACAO_NUMERIC'] = pd.to_numeric(
-                df_clean['VAL_AUTO_INFRACAO'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
+            top_pf = self._get_aggregate(
+                'dashboard_top_offenders', selected_ufs, date_filters,
+                lambda df: self._compute_top_offenders(df, 'CPF'),
+                extra_params={'p_doc_type': 'CPF'}
+            )
+            top_pj = self._get_aggregate(
+                'dashboard_top_offenders', selected_ufs, date_filters,
+                lambda df: self._compute_top_offenders(df, 'CNPJ'),
+                extra_params={'p_doc_type': 'CNPJ'}
+            )
+            summary = self._get_aggregate(
+                'dashboard_offender_summary', selected_ufs, date_filters, self._compute_offender_summary
             )
             
-            # Remove valores que não conseguiram ser convertidos
-            df_clean = df_clean[df_clean['VAL_AUTO_INFRACAO_NUMERIC'].notna()]
+            doc_counts = summary.set_index('doc_type')['total'].astype(int) if not summary.empty else pd.Series(dtype=int)
+            total_pf = int(doc_counts.get('CPF', 0))
+            total_pj = int(doc_counts.get('CNPJ', 0))
+            total_nao_identificados = int(doc_counts.get('OUTRO', 0))
             
-            if df_clean.empty:
-                st.warning("Nenhum valor de multa válido encontrado.")
+            if summary.empty:
+                st.warning("Dados válidos não disponíveis para análise de infratores.")
                 return
             
-            # Função para identificar CPF (formato: XXX.XXX.XXX-XX)
-            def is_cpf(cpf_cnpj):
-                if pd.isna(cpf_cnpj):
-                    return False
-                cpf_cnpj_str = str(cpf_cnpj).strip()
-                # CPF tem 14 caracteres com pontos e hífen: XXX.XXX.XXX-XX
-                if len(cpf_cnpj_str) == 14 and cpf_cnpj_str.count('.') == 2 and cpf_cnpj_str.count('-') == 1:
-                    return True
-                return False
-            
-            # Função para identificar CNPJ (formato: XX.XXX.XXX/XXXX-XX)
-            def is_cnpj(cpf_cnpj):
-                if pd.isna(cpf_cnpj):
-                    return False
-                cpf_cnpj_str = str(cpf_cnpj).strip()
-                # CNPJ tem 18 caracteres com pontos, barra e hífen: XX.XXX.XXX/XXXX-XX
-                if len(cpf_cnpj_str) == 18 and cpf_cnpj_str.count('.') == 2 and cpf_cnpj_str.count('/') == 1 and cpf_cnpj_str.count('-') == 1:
-                    return True
-                return False
-            
-            # Separa pessoas físicas (CPF) e empresas (CNPJ)
-            df_clean['is_cpf'] = df_clean['CPF_CNPJ_INFRATOR'].apply(is_cpf)
-            df_clean['is_cnpj'] = df_clean['CPF_CNPJ_INFRATOR'].apply(is_cnpj)
-            
-            df_pessoas_fisicas = df_clean[df_clean['is_cpf']]
-            df_empresas = df_clean[df_clean['is_cnpj']]
-            
             # Gráfico 1: Top 10 Pessoas Físicas (CPF) - PRIMEIRO
-            if not df_pessoas_fisicas.empty:
-                # Agrupa por NOME_INFRATOR e CPF_CNPJ_INFRATOR, soma os valores (dados já únicos POR SESSÃO)
-                pf_grouped = df_pessoas_fisicas.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum().reset_index()
-                pf_grouped = pf_grouped.nlargest(10, 'VAL_AUTO_INFRACAO_NUMERIC')
-                
-                if not pf_grouped.empty:
-                    # Cria rótulo combinado (nome + CPF mascarado)
-                    pf_grouped['label'] = pf_grouped.apply(
-                        lambda x: f"{x['NOME_INFRATOR'][:40]}{'...' if len(x['NOME_INFRATOR']) > 40 else ''}\n(CPF: {x['CPF_CNPJ_INFRATOR'][:3]}.***.***-{x['CPF_CNPJ_INFRATOR'][-2:]})", 
-                        axis=1
-                    )
-                    
-                    fig_pf = px.bar(
-                        pf_grouped.sort_values('VAL_AUTO_INFRACAO_NUMERIC'), 
-                        y='label', 
-                        x='VAL_AUTO_INFRACAO_NUMERIC', 
-                        orientation='h',
-                        title="<b>Top 10 Pessoas Físicas por Valor de Multa</b>",
-                        labels={'label': 'Pessoa Física', 'VAL_AUTO_INFRACAO_NUMERIC': 'Valor Total (R$)'},
-                        text='VAL_AUTO_INFRACAO_NUMERIC'
-                    )
-                    
-                    # Formata os valores no eixo X como moeda
-                    fig_pf.update_layout(
-                        xaxis_tickformat=',.0f',
-                        height=600,
-                        margin=dict(l=250)  # Mais espaço à esquerda para os nomes
-                    )
-                    
-                    # Formata os textos dos valores
-                    fig_pf.update_traces(
-                        texttemplate='R$ %{x:,.0f}',
-                        textposition='outside'
-                    )
-                    
-                    st.plotly_chart(fig_pf, use_container_width=True)
-                    
-                    # Mostra estatísticas
-                    total_pf = pf_grouped['VAL_AUTO_INFRACAO_NUMERIC'].sum()
-                    st.caption(f"💰 Total: R$ {total_pf:,.2f} | 👥 {len(pf_grouped)} pessoas físicas (dados únicos desta sessão)")
-                else:
-                    st.info("Nenhuma pessoa física encontrada nos dados filtrados.")
+            if not top_pf.empty:
+                self._render_offenders_chart(top_pf, 'CPF')
+                valor_pf = pd.to_numeric(top_pf['VAL_AUTO_INFRACAO_NUMERIC'], errors='coerce').sum()
+                st.caption(f"💰 Total: R$ {valor_pf:,.2f} | 👥 {len(top_pf)} pessoas físicas (dados únicos)")
             else:
                 st.info("Nenhuma pessoa física encontrada nos dados filtrados.")
             
@@ -591,152 +814,121 @@ class DataVisualization:
             st.divider()
             
             # Gráfico 2: Top 10 Empresas (CNPJ) - SEGUNDO (abaixo)
-            if not df_empresas.empty:
-                # Agrupa por NOME_INFRATOR e CPF_CNPJ_INFRATOR, soma os valores (dados já únicos POR SESSÃO)
-                empresa_grouped = df_empresas.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])['VAL_AUTO_INFRACAO_NUMERIC'].sum().reset_index()
-                empresa_grouped = empresa_grouped.nlargest(10, 'VAL_AUTO_INFRACAO_NUMERIC')
-                
-                if not empresa_grouped.empty:
-                    # Cria rótulo combinado (nome + CNPJ COMPLETO)
-                    empresa_grouped['label'] = empresa_grouped.apply(
-                        lambda x: f"{x['NOME_INFRATOR'][:40]}{'...' if len(x['NOME_INFRATOR']) > 40 else ''}\n(CNPJ: {x['CPF_CNPJ_INFRATOR']})", 
-                        axis=1
-                    )
-                    
-                    fig_empresa = px.bar(
-                        empresa_grouped.sort_values('VAL_AUTO_INFRACAO_NUMERIC'), 
-                        y='label', 
-                        x='VAL_AUTO_INFRACAO_NUMERIC', 
-                        orientation='h',
-                        title="<b>Top 10 Empresas por Valor de Multa</b>",
-                        labels={'label': 'Empresa', 'VAL_AUTO_INFRACAO_NUMERIC': 'Valor Total (R$)'},
-                        text='VAL_AUTO_INFRACAO_NUMERIC',
-                        color_discrete_sequence=['#ff6b6b']  # Cor diferente para empresas
-                    )
-                    
-                    # Formata os valores no eixo X como moeda
-                    fig_empresa.update_layout(
-                        xaxis_tickformat=',.0f',
-                        height=600,
-                        margin=dict(l=250)  # Mais espaço à esquerda para os nomes
-                    )
-                    
-                    # Formata os textos dos valores
-                    fig_empresa.update_traces(
-                        texttemplate='R$ %{x:,.0f}',
-                        textposition='outside'
-                    )
-                    
-                    st.plotly_chart(fig_empresa, use_container_width=True)
-                    
-                    # Mostra estatísticas
-                    total_empresa = empresa_grouped['VAL_AUTO_INFRACAO_NUMERIC'].sum()
-                    st.caption(f"💰 Total: R$ {total_empresa:,.2f} | 🏢 {len(empresa_grouped)} empresas (dados únicos desta sessão)")
-                else:
-                    st.info("Nenhuma empresa encontrada nos dados filtrados.")
+            if not top_pj.empty:
+                self._render_offenders_chart(top_pj, 'CNPJ')
+                valor_pj = pd.to_numeric(top_pj['VAL_AUTO_INFRACAO_NUMERIC'], errors='coerce').sum()
+                st.caption(f"💰 Total: R$ {valor_pj:,.2f} | 🏢 {len(top_pj)} empresas (dados únicos)")
             else:
                 st.info("Nenhuma empresa encontrada nos dados filtrados.")
             
             # Estatísticas gerais no final
-            total_identificados = len(df_pessoas_fisicas) + len(df_empresas)
-            total_nao_identificados = len(df_clean) - total_identificados
-            
             if total_nao_identificados > 0:
-                st.info(f"📊 **Resumo Geral:** {len(df_pessoas_fisicas)} pessoas físicas, {len(df_empresas)} empresas, {total_nao_identificados} registros com formato de CPF/CNPJ não identificado (todos dados únicos desta sessão)")
+                st.info(f"📊 **Resumo Geral:** {total_pf} pessoas físicas, {total_pj} empresas, {total_nao_identificados} registros com formato de CPF/CNPJ não identificado (todos dados únicos)")
             else:
-                st.info(f"📊 **Resumo Geral:** {len(df_pessoas_fisicas)} pessoas físicas, {len(df_empresas)} empresas identificadas (todos dados únicos desta sessão)")
+                st.info(f"📊 **Resumo Geral:** {total_pf} pessoas físicas, {total_pj} empresas identificadas (todos dados únicos)")
                 
         except Exception as e:
             st.error(f"Erro no gráfico de infratores: {e}")
+            annotate(error=str(e)[:200])
 
+    def _get_map_bins(self, selected_ufs: list, date_filters: dict) -> pd.DataFrame:
+        """
+        Células da grade do mapa (src/utils/spatial.py) para o filtro, calculadas
+        uma vez por (versão dos dados, UFs, período) e guardadas no cache de recortes.
+        """
+        key = ('map', self._data_version()) + self._filter_key(selected_ufs, date_filters)
+        cache = get_filter_cache()
+        
+        bins = cache.get(key)
+        if bins is None:
+            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            bins = bin_coordinates(df)
+            if not df.empty:
+                cache.put(key, bins)
+        
+        annotate(source='grid', rows_in=bins.attrs.get('points', 0), rows_out=len(bins))
+        return bins
+
+    @timed('chart')
     def create_infraction_map_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria mapa de calor das infrações com dados únicos garantidos POR SESSÃO."""
+        """Cria mapa de calor com todas as infrações do filtro, agregadas em uma grade."""
         st.subheader("Mapa de Calor de Infrações")
         
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
+            with st.spinner("Carregando dados do mapa..."):
+                bins = self._get_map_bins(selected_ufs, date_filters)
             
-            if df.empty:
-                st.warning("Nenhum dado encontrado.")
+            if bins.empty:
+                st.warning("Nenhuma coordenada válida encontrada.")
                 return
             
-            # Filtra dados com coordenadas
-            required_cols = ['NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO']
-            if not all(col in df.columns for col in required_cols):
-                st.warning("Dados de geolocalização não disponíveis.")
-                return
+            grid_size = bins.attrs['grid_size']
+            
+            # Intensidade em escala log: poucas células concentram muitas infrações
+            intensity = np.log1p(bins['total']) / np.log1p(bins['total'].max())
+            layer_data = pd.DataFrame({
+                # GridCellLayer posiciona a célula pelo canto sudoeste
+                'lat': (bins['lat'] - grid_size / 2).round(4),
+                'lon': (bins['lon'] - grid_size / 2).round(4),
+                'w': intensity.round(2),
+                'total': bins['total'].map(format_number_brazilian),
+                'valor': bins['valor'].map(format_currency_brazilian),
+            })
+            
+            layer = pdk.Layer(
+                'GridCellLayer',
+                data=layer_data,
+                get_position='[lon, lat]',
+                cell_size=grid_size * 111_000,  # metros
+                get_fill_color='[255, 200 * (1 - w), 0, 60 + 195 * w]',
+                extruded=False,
+                pickable=True,
+            )
+            view_state = pdk.ViewState(
+                latitude=float(np.average(bins['lat'], weights=bins['total'])),
+                longitude=float(np.average(bins['lon'], weights=bins['total'])),
+                zoom=map_zoom(grid_size),
+            )
             
-            with st.spinner("Carregando dados do mapa..."):
-                # Remove valores vazios e converte coordenadas
-                df_map = df[
-                    df['NUM_LATITUDE_AUTO'].notna() & 
-                    df['NUM_LONGITUDE_AUTO'].notna() &
-                    (df['NUM_LATITUDE_AUTO'] != '') &
-                    (df['NUM_LONGITUDE_AUTO'] != '')
-                ].copy()
-                
-                if df_map.empty:
-                    st.warning("Nenhuma coordenada válida encontrada.")
-                    return
-                
-                # Limita para performance (dados já são únicos POR SESSÃO)
-                if len(df_map) > 5000:
-                    df_map = df_map.sample(n=5000, random_state=42)  # random_state para reprodutibilidade
-                
-                # Converte coordenadas
-                df_map['lat'] = pd.to_numeric(df_map['NUM_LATITUDE_AUTO'].astype(str).str.replace(',', '.'), errors='coerce')
-                df_map['lon'] = pd.to_numeric(df_map['NUM_LONGITUDE_AUTO'].astype(str).str.replace(',', '.'), errors='coerce')
-                
-                # Remove coordenadas inválidas
-                df_map = df_map.dropna(subset=['lat', 'lon'])
-                
-                if not df_map.empty:
-                    st.map(df_map[['lat', 'lon']], zoom=3)
-                    st.caption(f"📍 Exibindo {len(df_map):,} pontos de {len(df):,} infrações únicas desta sessão | {date_filters['description']}")
-                else:
-                    st.warning("Nenhuma coordenada válida após conversão.")
+            st.pydeck_chart(pdk.Deck(
+                layers=[layer],
+                initial_view_state=view_state,
+                tooltip={'text': '{total} infrações\n{valor}'},
+            ))
+            st.caption(f"📍 {bins.attrs['points']:,} infrações com coordenadas em {len(bins):,} células "
+                       f"de {grid_size}° | {date_filters['description']}")
                     
         except Exception as e:
             st.error(f"Erro no mapa: {e}")
+            annotate(error=str(e)[:200])
 
+    @timed('chart')
     def create_infraction_status_chart_advanced(self, selected_ufs: list, date_filters: dict):
-        """Cria gráfico do status das infrações com dados únicos garantidos POR SESSÃO."""
+        """Cria gráfico do status das infrações com dados únicos garantidos."""
         try:
-            df = self._get_filtered_data_advanced(selected_ufs, date_filters)
-            
-            if df.empty or 'DES_STATUS_FORMULARIO' not in df.columns:
-                return
-            
-            # Remove valores vazios
-            df_clean = df[df['DES_STATUS_FORMULARIO'].notna() & (df['DES_STATUS_FORMULARIO'] != '')]
+            chart_df = self._get_aggregate(
+                'dashboard_counts_by_status', selected_ufs, date_filters, self._compute_counts_by_status
+            )
             
-            if df_clean.empty:
+            if chart_df.empty:
                 return
             
-            # Conta infrações por status (dados já são únicos POR SESSÃO)
-            status_counts = df_clean['DES_STATUS_FORMULARIO'].value_counts().head(10)
-            method_note = "infrações únicas desta sessão"
+            method_note = "infrações únicas"
+            chart_df = chart_df.assign(DES_STATUS_FORMULARIO=chart_df['DES_STATUS_FORMULARIO'].str.title())
             
-            if not status_counts.empty:
-                chart_df = pd.DataFrame({
-                    'DES_STATUS_FORMULARIO': status_counts.index,
-                    'total': status_counts.values
-                })
-                
-                chart_df['DES_STATUS_FORMULARIO'] = chart_df['DES_STATUS_FORMULARIO'].str.title()
-                
-                fig = px.bar(
-                    chart_df.sort_values('total'), 
-                    y='DES_STATUS_FORMULARIO', 
-                    x='total', 
-                    orientation='h',
-                    title=f"<b>Estágio Atual das Infrações (Top 10 - {method_note})</b>", 
-                    text='total'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            fig = px.bar(
+                chart_df.sort_values('total'), 
+                y='DES_STATUS_FORMULARIO', 
+                x='total', 
+                orientation='h',
+                title=f"<b>Estágio Atual das Infrações (Top 10 - {method_note})</b>", 
+                text='total'
+            )
+            st.plotly_chart(fig, use_container_width=True)
                 
         except Exception as e:
             st.error(f"Erro no gráfico de status: {e}")
+            annotate(error=str(e)[:200])
 
     # ======================== MÉTODOS LEGACY (para compatibilidade) ========================
 
@@ -821,30 +1013,33 @@ class DataVisualization:
         return self.create_main_offenders_chart_advanced(selected_ufs, date_filters)
 
     def force_refresh(self):
-        """Força atualização dos dados limpando cache da sessão."""
+        """Força atualização dos dados descartando o dataset compartilhado."""
         if self.paginator:
             self.paginator.clear_cache()
-            st.success("🔄 Cache da sessão limpo! Os dados serão recarregados.")
+            st.success("🔄 Cache limpo! Os dados serão recarregados.")
 
     # ======================== MÉTODOS DE DIAGNÓSTICO CORRIGIDOS ========================
 
     def get_data_quality_info(self, selected_ufs: list = None, date_filters: dict = None) -> dict:
-        """Retorna informações sobre a qualidade dos dados carregados DESTA SESSÃO."""
+        """
+        Retorna informações sobre a qualidade do recorte filtrado desta sessão e
+        a versão/hora de carga do dataset compartilhado de onde ele vem.
+        """
         try:
             if date_filters is None:
                 date_filters = {
                     "mode": "simple",
                     "years": [2024, 2025, 2026],
-                    "description": "Todos os dados desta sessão"
+                    "description": "Todos os dados"
                 }
             
-            # Obtém dados DESTA SESSÃO
+            # Recorte dos filtros desta sessão sobre o dataset compartilhado
             df = self._get_filtered_data_advanced(selected_ufs or [], date_filters)
             
             if df.empty:
-                return {"error": "Nenhum dado disponível nesta sessão"}
+                return {"error": "Nenhum dado disponível para os filtros selecionados"}
             
-            # Análise de qualidade DESTA SESSÃO
+            # Análise de qualidade do recorte
             quality_info = {
                 "total_records": len(df),
                 "has_num_auto_infracao": 'NUM_AUTO_INFRACAO' in df.columns,
@@ -858,10 +1053,11 @@ class DataVisualization:
                 },
                 "states_count": df['UF'].nunique() if 'UF' in df.columns else 0,
                 "municipalities_count": df['MUNICIPIO'].nunique() if 'MUNICIPIO' in df.columns else 0,
-                "session_isolated": True  # Marca que os dados são isolados por sessão
+                "shared_dataset": next((entry for entry in get_dataset_store().stats()['entries']
+                                        if entry['key'] == 'ibama_infracao:records'), None),
             }
             
-            # Verifica consistência DESTA SESSÃO
+            # Verifica consistência do recorte
             if quality_info["has_num_auto_infracao"]:
                 quality_info["data_consistency"] = quality_info["total_records"] == quality_info["unique_infractions"]
                 quality_info["duplicate_records"] = quality_info["total_records"] - quality_info["unique_infractions"]
@@ -872,11 +1068,11 @@ class DataVisualization:
             return quality_info
             
         except Exception as e:
-            return {"error": f"Erro na análise de qualidade desta sessão: {str(e)}"}
+            return {"error": f"Erro na análise de qualidade dos dados: {str(e)}"}
 
     def display_data_quality_info(self, selected_ufs: list = None, date_filters: dict = None):
-        """Exibe informações sobre a qualidade dos dados DESTA SESSÃO."""
-        with st.expander("🔍 Informações de Qualidade dos Dados (Esta Sessão)"):
+        """Exibe informações sobre a qualidade do recorte filtrado e a origem dos dados."""
+        with st.expander("🔍 Informações de Qualidade dos Dados (Filtros Atuais)"):
             quality_info = self.get_data_quality_info(selected_ufs, date_filters)
             
             if "error" in quality_info:
@@ -900,16 +1096,19 @@ class DataVisualization:
                 st.metric("Colunas", quality_info['columns_count'])
                 st.metric("Uso de Memória", f"{quality_info['memory_usage_mb']:.1f} MB")
             
-            # Consistência dos dados DESTA SESSÃO
+            # Consistência do recorte
             if quality_info['data_consistency'] is not None:
                 if quality_info['data_consistency']:
-                    st.success("✅ Dados consistentes nesta sessão - sem duplicatas")
+                    st.success("✅ Dados consistentes - sem duplicatas")
                 else:
-                    st.warning(f"⚠️ {quality_info['duplicate_records']} registros duplicados removidos nesta sessão")
+                    st.warning(f"⚠️ {quality_info['duplicate_records']} registros duplicados no recorte")
             
-            # Isolamento de sessão
-            if quality_info.get('session_isolated'):
-                st.info("🔒 **Dados isolados por sessão** - cada usuário vê seus próprios dados únicos")
+            # Origem: um dataset por processo, compartilhado por todas as sessões
+            shared = quality_info.get('shared_dataset')
+            if shared:
+                loaded_at = pd.Timestamp(shared['loaded_at'], unit='s', tz='UTC').tz_convert(config.UPDATE_TIMEZONE)
+                st.info(f"🌐 **Dataset compartilhado entre as sessões** - versão {shared['version']}, "
+                        f"carregado em {format_datetime_brazilian(loaded_at)}; só os filtros são desta sessão")
             
             # Range de datas
             if quality_info['date_range']['min'] and quality_info['date_range']['max']:
@@ -918,29 +1117,21 @@ class DataVisualization:
     # ======================== MÉTODOS DE DIAGNÓSTICO AVANÇADO ========================
     
     def get_session_diagnostic_info(self) -> dict:
-        """Retorna informações de diagnóstico específicas da sessão."""
+        """Retorna informações de diagnóstico da sessão e do dataset compartilhado."""
         try:
+            store_stats = get_dataset_store().stats()
+            filter_stats = get_filter_cache().stats()
             diagnostic_info = {
-                "session_uuid": st.session_state.get('session_uuid', 'Não definido'),
                 "paginator_available": self.paginator is not None,
-                "cached_keys": [],
-                "total_cached_data": 0
+                "cached_keys": [f"{entry['key']} (versão {entry['version']})" for entry in store_stats['entries']],
+                "total_cached_data": sum(entry['rows'] or 0 for entry in store_stats['entries']),
+                "cached_memory_mb": sum(entry['memory_mb'] or 0 for entry in store_stats['entries']),
+                "store_hits": store_stats['hits'],
+                "store_misses": store_stats['misses'],
+                "filter_cache": filter_stats,
+                "answer_cache": get_answer_cache().stats(),
             }
             
-            # Verifica dados em cache desta sessão
-            if 'session_uuid' in st.session_state:
-                session_uuid = st.session_state.session_uuid
-                for key in st.session_state.keys():
-                    if key.startswith(f'paginated_data_data_{session_uuid}'):
-                        diagnostic_info["cached_keys"].append(key)
-                        # Tenta obter tamanho dos dados
-                        try:
-                            data = st.session_state[key]
-                            if hasattr(data, '__len__'):
-                                diagnostic_info["total_cached_data"] += len(data)
-                        except:
-                            pass
-            
             return diagnostic_info
             
         except Exception as e:
@@ -955,10 +1146,18 @@ class DataVisualization:
                 st.error(diagnostic_info["error"])
                 return
             
-            st.write("**ID da Sessão:**", diagnostic_info["session_uuid"])
             st.write("**Paginador Disponível:**", "✅ Sim" if diagnostic_info["paginator_available"] else "❌ Não")
-            st.write("**Chaves de Cache:**", len(diagnostic_info["cached_keys"]))
-            st.write("**Total de Dados em Cache:**", f"{diagnostic_info['total_cached_data']:,} registros")
+            st.write("**Chaves de Cache (compartilhadas entre sessões):**", len(diagnostic_info["cached_keys"]))
+            st.write("**Total de Dados em Cache:**", f"{diagnostic_info['total_cached_data']:,} registros "
+                     f"({diagnostic_info['cached_memory_mb']:.1f} MB)")
+            st.write("**Acertos/Cargas do Cache:**", f"{diagnostic_info['store_hits']:,} / {diagnostic_info['store_misses']:,}")
+            filter_cache = diagnostic_info["filter_cache"]
+            st.write("**Recortes Filtrados em Cache:**", f"{filter_cache['size']} de {filter_cache['maxsize']} "
+                     f"(acertos/cálculos: {filter_cache['hits']:,} / {filter_cache['misses']:,})")
+            answer_cache = diagnostic_info["answer_cache"]
+            hit_rate = f"{answer_cache['hit_rate']:.0%}" if answer_cache['hit_rate'] is not None else "-"
+            st.write("**Respostas do Chatbot em Cache:**", f"{answer_cache['size']} de {answer_cache['maxsize']} "
+                     f"(acertos/cálculos: {answer_cache['hits']:,} / {answer_cache['misses']:,}, taxa de acerto {hit_rate})")
             
             if diagnostic_info["cached_keys"]:
                 st.write("**Chaves de Cache Ativas:**")
@@ -966,6 +1165,76 @@ class DataVisualization:
                     st.code(key, language=None)
             
             # Botão para forçar limpeza
-            if st.button("🧹 Limpar Cache desta Sessão"):
+            if st.button("🧹 Recarregar Dados Compartilhados"):
                 self.force_refresh()
                 st.rerun()
+
+    def display_performance_diagnostic(self):
+        """Exibe tempo, volume de dados e cache por gráfico e por busca (src/utils/instrumentation.py)."""
+        recorder = get_perf_recorder()
+        summary = recorder.summary()
+
+        if summary.empty:
+            st.info("Nenhuma medição ainda - abra o Dashboard Interativo para registrar os gráficos.")
+            return
+
+        columns = {
+            'name': 'Nome', 'calls': 'Chamadas', 'mean_s': 'Média (s)', 'p50_s': 'p50 (s)',
+            'p95_s': 'p95 (s)', 'max_s': 'Máx. (s)', 'total_s': 'Total (s)', 'share': '% do tempo',
+            'rows_in': 'Linhas lidas', 'rows_out': 'Linhas entregues', 'mb': 'MB buscados',
+            'cache_hit_rate': 'Acerto de cache', 'errors': 'Erros',
+        }
+        for kind, title in (('chart', "**Gráficos (por chamada de create_*_advanced):**"),
+                            ('fetch', "**Buscas de dados:**")):
+            table = summary[summary['kind'] == kind]
+            if table.empty:
+                continue
+            st.write(title)
+            table = table[list(columns)].assign(share=table['share'] * 100, cache_hit_rate=table['cache_hit_rate'] * 100)
+            st.dataframe(
+                table.rename(columns=columns).round(3),
+                hide_index=True, use_container_width=True,
+            )
+
+        slowest = summary[summary['kind'] == 'chart'].head(1)
+        if not slowest.empty:
+            st.caption(f"🐢 Gráfico mais pesado: {slowest['name'].iloc[0]} "
+                       f"({slowest['share'].iloc[0]:.0%} do tempo dos gráficos)")
+
+        with st.expander("🧾 Últimos eventos (JSON)"):
+            st.json(recorder.events()[-20:])
+
+        if config.PERF_LOG:
+            st.caption(f"📝 Eventos gravados como JSON em: {config.PERF_LOG}")
+
+        if st.button("🧹 Limpar Medições"):
+            recorder.clear()
+            st.rerun()
+
+    def display_memory_diagnostic(self):
+        """Exibe a memória do processo, das entradas do dataset compartilhado e de cada coluna da base."""
+        store = get_dataset_store()
+        entries = store.stats()['entries']
+        rss = process_memory_mb()
+
+        col1, col2 = st.columns(2)
+        col1.metric("Memória do processo (RSS)", f"{rss:,.0f} MB" if rss is not None else "Indisponível")
+        col2.metric("Dataset compartilhado", f"{sum(entry['memory_mb'] or 0 for entry in entries):,.1f} MB")
+
+        if entries:
+            st.dataframe(
+                pd.DataFrame(entries)[['key', 'rows', 'memory_mb']]
+                .rename(columns={'key': 'Entrada', 'rows': 'Linhas', 'memory_mb': 'MB'}).round(2),
+                hide_index=True, use_container_width=True,
+            )
+
+        base = store.peek('ibama_infracao:records')
+        if base is None or not hasattr(base, 'memory_usage'):
+            st.info("Base ainda não carregada - abra o Dashboard Interativo ou o Chatbot.")
+            return
+
+        with st.expander(f"📋 Memória por coluna da base ({len(base.columns)} colunas)"):
+            st.dataframe(
+                memory_report(base).rename(columns={'column': 'Coluna', 'dtype': 'Tipo', 'mb': 'MB'}).round(3),
+                hide_index=True, use_container_width=True,
+            )
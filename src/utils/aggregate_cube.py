@@ -0,0 +1,321 @@
+"""
+Cubo de agregados do dashboard, indexado por célula (ano, mês, UF).
+
+Montado uma vez por versão dos dados a partir do dataset no esquema canônico
+(src/utils/schema.py). Qualquer filtro do dashboard (UFs + anos ou períodos
+ano/mês) seleciona um conjunto de células, e cada gráfico soma as medidas
+dessas células em vez de percorrer os registros: o custo depende do número
+de células (no máximo 12 meses × 27 UFs por ano), não do número de infrações.
+
+Medidas por célula:
+- total de autos e soma dos valores
+- autos por município (para o top de municípios e os municípios distintos)
+- valor por tipo de infração, autos por gravidade e por status
+- autos com infrator válido por tipo de documento
+- valor por infrator (id inteiro) e os candidatos a maiores infratores: os
+  `top_k` maiores de cada célula e tipo de documento, com os valores em todas
+  as células
+
+`answer(rpc_name, params)` recebe os mesmos nomes e parâmetros das funções de
+sql/dashboard_rpcs.sql e devolve as mesmas colunas (None para nomes que o
+cubo não conhece).
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.documents import DOC_TYPES
+
+UNRATED_GRAVITY = 'Sem avaliação feita'
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Texto em object (sem categorias), com vazios como nulo."""
+    return series.astype(object).replace('', np.nan)
+
+
+class AggregateCube:
+    """Medidas pré-agregadas por (YEAR, MONTH, UF) - ver docstring do módulo."""
+
+    def __init__(self, df: pd.DataFrame, top_k: int = 25):
+        """
+        Args:
+            df: Dataset deduplicado no esquema canônico (YEAR/MONTH/DOC_TYPE)
+            top_k: Infratores guardados por célula e tipo de documento
+        """
+        self.top_k = top_k
+        self.rows = 0
+
+        # Registros sem data válida nunca entram nos filtros do dashboard
+        if df.empty or 'YEAR' not in df.columns:
+            df = pd.DataFrame(columns=['YEAR', 'MONTH', 'UF'])
+        df = df[df['YEAR'] > 0]
+        self.rows = len(df)
+
+        uf = _text(df['UF']) if 'UF' in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+        cell_keys = pd.DataFrame({'YEAR': df['YEAR'].astype(int), 'MONTH': df['MONTH'].astype(int), 'UF': uf})
+        cell = cell_keys.groupby(['YEAR', 'MONTH', 'UF'], dropna=False, sort=True).ngroup()
+
+        values = df['VAL_AUTO_INFRACAO'] if 'VAL_AUTO_INFRACAO' in df.columns else pd.Series(np.nan, index=df.index)
+
+        self.cells = (
+            pd.DataFrame({'cell': cell, 'YEAR': cell_keys['YEAR'], 'MONTH': cell_keys['MONTH'],
+                          'UF': uf, 'value': values})
+            .groupby('cell', sort=True)
+            .agg(YEAR=('YEAR', 'first'), MONTH=('MONTH', 'first'), UF=('UF', 'first'),
+                 total=('YEAR', 'size'), value=('value', 'sum'))
+        )
+        # UF como id inteiro (-1 sem UF)
+        self.cells['uf'], self.uf_labels = pd.factorize(self.cells['UF'])
+
+        self._build_municipios(df, cell)
+        self.types = self._sum_by(df, cell, values, 'TIPO_INFRACAO')
+        self.status = self._count_by(df, cell, ['DES_STATUS_FORMULARIO'])
+
+        gravity = (_text(df['GRAVIDADE_INFRACAO']).fillna(UNRATED_GRAVITY)
+                   if 'GRAVIDADE_INFRACAO' in df.columns else pd.Series(dtype=object))
+        self.gravity = (pd.DataFrame({'cell': cell, 'GRAVIDADE_INFRACAO': gravity})
+                        .groupby(['cell', 'GRAVIDADE_INFRACAO']).size().rename('total').reset_index())
+
+        self._build_offenders(df, cell, values)
+
+    # --- construção ---
+
+    @staticmethod
+    def _count_by(df: pd.DataFrame, cell: pd.Series, columns: list) -> pd.DataFrame:
+        present = [col for col in columns if col in df.columns]
+        frame = pd.DataFrame({'cell': cell, **{col: _text(df[col]) for col in present}})
+        return frame.groupby(['cell'] + present, dropna=False).size().rename('total').reset_index()
+
+    @staticmethod
+    def _sum_by(df: pd.DataFrame, cell: pd.Series, values: pd.Series, column: str) -> pd.DataFrame:
+        if column not in df.columns:
+            return pd.DataFrame(columns=['cell', column, 'value'])
+        frame = pd.DataFrame({'cell': cell, column: _text(df[column]), 'value': values})
+        frame = frame[frame['value'].notna()]
+        return frame.groupby(['cell', column], dropna=False)['value'].sum().reset_index()
+
+    def _build_municipios(self, df: pd.DataFrame, cell: pd.Series):
+        """
+        Autos por célula e município. Município, código e UF viram ids inteiros
+        (nomes em `municipio_names`), para somar sem comparar textos.
+        """
+        self.municipios = pd.DataFrame(columns=['cell', 'municipio', 'cod', 'uf', 'valid', 'total'])
+        self.municipio_names = pd.DataFrame(columns=['COD_MUNICIPIO', 'MUNICIPIO'])
+        if not {'COD_MUNICIPIO', 'MUNICIPIO'}.issubset(df.columns):
+            return
+
+        keys = pd.DataFrame({'COD_MUNICIPIO': _text(df['COD_MUNICIPIO']), 'MUNICIPIO': _text(df['MUNICIPIO'])})
+        municipio = keys.groupby(['COD_MUNICIPIO', 'MUNICIPIO'], dropna=False, sort=False).ngroup()
+        self.municipio_names = keys.groupby(municipio.to_numpy()).first()
+
+        counts = (pd.DataFrame({'cell': cell, 'municipio': municipio})
+                  .groupby(['cell', 'municipio']).size().rename('total').reset_index())
+        names = self.municipio_names.reindex(counts['municipio'])
+        cod = pd.factorize(names['COD_MUNICIPIO'])[0]
+        uf = self.cells['uf'].reindex(counts['cell']).to_numpy()
+        self.municipios = counts.assign(
+            cod=cod, uf=uf,
+            valid=(cod >= 0) & names['MUNICIPIO'].notna().to_numpy() & (uf >= 0),
+        )
+
+    def _build_offenders(self, df: pd.DataFrame, cell: pd.Series, values: pd.Series):
+        """Autos por tipo de documento e candidatos a maiores infratores por célula."""
+        self.offender_counts = pd.DataFrame(columns=['cell', 'doc_type', 'total'])
+        self.offenders = pd.DataFrame(columns=['cell', 'offender', 'value', 'doc_type'])
+        self.offender_cells = pd.DataFrame(columns=['cell', 'offender', 'value', 'doc_type'])
+        self.offender_names = pd.DataFrame(columns=['doc_type', 'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'])
+        self.offender_floors = pd.DataFrame(columns=['cell', 'doc_type', 'floor'])
+
+        required = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'DOC_TYPE']
+        if not all(col in df.columns for col in required):
+            return
+
+        # Mesmos critérios de DataVisualization._prepare_offenders
+        names = _text(df['NOME_INFRATOR'])
+        documents = _text(df['CPF_CNPJ_INFRATOR'])
+        valid = names.notna() & documents.notna() & values.notna()
+        prepared = pd.DataFrame({
+            'cell': cell[valid], 'doc_type': df.loc[valid, 'DOC_TYPE'].astype(object),
+            'NOME_INFRATOR': names[valid], 'CPF_CNPJ_INFRATOR': documents[valid], 'value': values[valid],
+        })
+        if prepared.empty:
+            return
+
+        self.offender_counts = prepared.groupby(['cell', 'doc_type']).size().rename('total').reset_index()
+
+        identity = ['doc_type', 'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']
+        offender = prepared.groupby(identity, sort=False).ngroup()
+        self.offender_names = prepared[identity].groupby(offender.to_numpy()).first()
+
+        # Valor de cada infrator em cada célula (ids inteiros: compacto e rápido de somar)
+        offender_cells = (pd.DataFrame({'cell': prepared['cell'], 'offender': offender, 'value': prepared['value']})
+                          .groupby(['cell', 'offender'])['value'].sum().reset_index())
+        self.offender_cells = offender_cells.assign(doc_type=pd.Categorical(
+            self.offender_names['doc_type'].reindex(offender_cells['offender']).to_numpy(), categories=DOC_TYPES
+        ))
+
+        rank = self.offender_cells.groupby(['cell', 'doc_type'], observed=True)['value'].rank(
+            method='first', ascending=False
+        )
+        is_top = (rank <= self.top_k).to_numpy()
+
+        # Maior valor fora do top de cada célula: limite do que um não candidato soma nela
+        self.offender_floors = (self.offender_cells[~is_top]
+                                .groupby(['cell', 'doc_type'], observed=True)['value']
+                                .max().rename('floor').reset_index())
+
+        candidates = self.offender_cells.loc[is_top, 'offender'].unique()
+        self.offenders = self.offender_cells[self.offender_cells['offender'].isin(candidates)]
+
+    # --- consultas ---
+
+    @property
+    def empty(self) -> bool:
+        return self.cells.empty
+
+    def memory_usage(self, deep: bool = True) -> pd.Series:
+        """Memória das tabelas do cubo (para o diagnóstico do DatasetStore)."""
+        tables = {
+            'cells': self.cells, 'municipios': self.municipios, 'municipio_names': self.municipio_names,
+            'types': self.types, 'gravity': self.gravity, 'status': self.status,
+            'offenders': self.offenders, 'offender_cells': self.offender_cells,
+            'offender_names': self.offender_names,
+        }
+        return pd.Series({name: table.memory_usage(deep=deep).sum() for name, table in tables.items()})
+
+    def select_cells(self, params: Dict[str, Any]) -> np.ndarray:
+        """Células dos filtros no formato das RPCs: p_ufs, p_years, p_year_months."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if params.get('p_ufs'):
+            mask &= self.cells['UF'].isin(params['p_ufs']).to_numpy()
+        if params.get('p_years') is not None:
+            mask &= self.cells['YEAR'].isin(params['p_years']).to_numpy()
+        if params.get('p_year_months') is not None:
+            year_month = self.cells['YEAR'] * 100 + self.cells['MONTH']
+            mask &= year_month.isin(params['p_year_months']).to_numpy()
+        return self.cells.index.to_numpy()[mask]
+
+    def answer(self, rpc_name: str, params: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """Responde à agregação `rpc_name` (nome da função em sql/dashboard_rpcs.sql)."""
+        cells = self.select_cells(params)
+        limit = params.get('p_limit')
+
+        if rpc_name == 'dashboard_overview':
+            return self.overview(cells)
+        if rpc_name == 'dashboard_counts_by_uf':
+            return self.counts_by_uf(cells, limit or 15)
+        if rpc_name == 'dashboard_top_municipios':
+            return self.top_municipios(cells, limit or 10)
+        if rpc_name == 'dashboard_value_by_type':
+            return self.value_by_type(cells, limit or 10)
+        if rpc_name == 'dashboard_counts_by_gravity':
+            return self.counts_by_gravity(cells)
+        if rpc_name == 'dashboard_counts_by_status':
+            return self.counts_by_status(cells, limit or 10)
+        if rpc_name == 'dashboard_top_offenders':
+            return self.top_offenders(cells, params.get('p_doc_type', 'CPF'), limit or 10)
+        if rpc_name == 'dashboard_offender_summary':
+            return self.offender_summary(cells)
+        return None
+
+    def overview(self, cells: np.ndarray) -> pd.DataFrame:
+        selected = self.cells.loc[cells]
+        if selected['total'].sum() == 0:
+            return pd.DataFrame(columns=['total_infracoes', 'valor_total_multas', 'total_municipios'])
+
+        cod = self.municipios.loc[self.municipios['cell'].isin(cells), 'cod'].to_numpy()
+        total_municipios = len(np.unique(cod[cod >= 0]))
+        return pd.DataFrame({
+            'total_infracoes': [int(selected['total'].sum())],
+            'valor_total_multas': [selected['value'].sum()],
+            'total_municipios': [total_municipios],
+        })
+
+    def counts_by_uf(self, cells: np.ndarray, limit: int = 15) -> pd.DataFrame:
+        selected = self.cells.loc[cells]
+        counts = (selected[selected['UF'].notna()].groupby('UF')['total'].sum()
+                  .sort_values(ascending=False, kind='stable').head(limit))
+        return pd.DataFrame({'UF': counts.index.astype(object), 'total': counts.values})
+
+    def top_municipios(self, cells: np.ndarray, limit: int = 10) -> pd.DataFrame:
+        columns = ['COD_MUNICIPIO', 'MUNICIPIO', 'UF', 'total_infracoes']
+        municipios = self.municipios[self.municipios['cell'].isin(cells) & self.municipios['valid']]
+        if municipios.empty:
+            return pd.DataFrame(columns=columns)
+
+        totals = municipios.groupby(['municipio', 'uf'])['total'].sum()
+        names = self.municipio_names.loc[totals.index.get_level_values('municipio')]
+        result = pd.DataFrame({
+            'COD_MUNICIPIO': names['COD_MUNICIPIO'].to_numpy(),
+            'MUNICIPIO': names['MUNICIPIO'].to_numpy(),
+            'UF': self.uf_labels[totals.index.get_level_values('uf')],
+            'total_infracoes': totals.to_numpy(),
+        })
+        # Empates pelo código, nome e UF, como em DataVisualization._compute_top_municipios
+        return (result.sort_values(['total_infracoes', 'COD_MUNICIPIO', 'MUNICIPIO', 'UF'],
+                                   ascending=[False, True, True, True], kind='stable')
+                .head(limit).reset_index(drop=True))
+
+    def value_by_type(self, cells: np.ndarray, limit: int = 10) -> pd.DataFrame:
+        types = self.types[self.types['cell'].isin(cells)].dropna(subset=['TIPO_INFRACAO'])
+        values = types.groupby('TIPO_INFRACAO')['value'].sum().nlargest(limit)
+        return pd.DataFrame({'TIPO_INFRACAO': values.index.astype(object), 'valor_total': values.values})
+
+    def counts_by_gravity(self, cells: np.ndarray) -> pd.DataFrame:
+        gravity = self.gravity[self.gravity['cell'].isin(cells)]
+        counts = gravity.groupby('GRAVIDADE_INFRACAO')['total'].sum().sort_values(ascending=False, kind='stable')
+        return pd.DataFrame({'GRAVIDADE_INFRACAO': counts.index.astype(object), 'total': counts.values})
+
+    def counts_by_status(self, cells: np.ndarray, limit: int = 10) -> pd.DataFrame:
+        if 'DES_STATUS_FORMULARIO' not in self.status.columns:
+            return pd.DataFrame(columns=['DES_STATUS_FORMULARIO', 'total'])
+        status = self.status[self.status['cell'].isin(cells)].dropna(subset=['DES_STATUS_FORMULARIO'])
+        counts = (status.groupby('DES_STATUS_FORMULARIO')['total'].sum()
+                  .sort_values(ascending=False, kind='stable').head(limit))
+        return pd.DataFrame({'DES_STATUS_FORMULARIO': counts.index.astype(object), 'total': counts.values})
+
+    def offender_summary(self, cells: np.ndarray) -> pd.DataFrame:
+        counts = self.offender_counts[self.offender_counts['cell'].isin(cells)]
+        totals = counts.groupby('doc_type')['total'].sum().sort_values(ascending=False, kind='stable')
+        totals = totals[totals > 0]
+        return pd.DataFrame({'doc_type': totals.index.astype(object), 'total': totals.values})
+
+    def top_offenders(self, cells: np.ndarray, doc_type: str, limit: int = 10) -> pd.DataFrame:
+        """
+        Maiores infratores do tipo `doc_type` nas células. Soma primeiro só os
+        candidatos: quem não é candidato soma no máximo os limites (`floor`) das
+        células, então o top é exato se o último colocado passar dessa soma
+        (num empate, um não candidato poderia vir antes pelo nome). Senão, soma
+        a tabela completa de infrator por célula.
+        """
+        top = self._top_offender_totals(self.offenders, cells, doc_type, limit)
+
+        floors = self.offender_floors
+        hidden_max = floors.loc[floors['cell'].isin(cells) & (floors['doc_type'] == doc_type), 'floor'].sum()
+        if hidden_max > 0 and (len(top) < limit or top.iloc[-1] <= hidden_max):
+            top = self._top_offender_totals(self.offender_cells, cells, doc_type, limit)
+
+        names = self.offender_names.loc[top.index]
+        return pd.DataFrame({
+            'NOME_INFRATOR': names['NOME_INFRATOR'].to_numpy(),
+            'CPF_CNPJ_INFRATOR': names['CPF_CNPJ_INFRATOR'].to_numpy(),
+            'VAL_AUTO_INFRACAO_NUMERIC': top.to_numpy(dtype=float),
+        })
+
+    def _top_offender_totals(self, table: pd.DataFrame, cells: np.ndarray, doc_type: str, limit: int) -> pd.Series:
+        """
+        Soma por infrator das linhas de `table` nas células, só do tipo `doc_type`.
+        Empates pelo nome e documento, como em DataVisualization._compute_top_offenders.
+        """
+        rows = table[table['cell'].isin(cells) & (table['doc_type'] == doc_type)]
+        totals = rows.groupby('offender')['value'].sum()
+        names = self.offender_names.loc[totals.index]
+        order = (pd.DataFrame({'value': totals.to_numpy(),
+                               'NOME_INFRATOR': names['NOME_INFRATOR'].to_numpy(),
+                               'CPF_CNPJ_INFRATOR': names['CPF_CNPJ_INFRATOR'].to_numpy()})
+                 .sort_values(['value', 'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'],
+                              ascending=[False, True, True], kind='stable')
+                 .index[:limit])
+        return totals.iloc[order]
@@ -0,0 +1,277 @@
+"""
+Carga em massa paralela para o Supabase.
+
+Substitui os laços sequenciais com lote fixo e `time.sleep` dos scripts de
+upload por um pool limitado de workers com:
+- tamanho de lote adaptativo (cresce após sucessos, divide e tenta de novo
+  quando o PostgREST recusa o payload ou cancela a instrução por tempo);
+- backoff exponencial com jitter para 429, 503 e falhas de conexão;
+- relatório de vazão ao final da execução.
+
+O insert não é idempotente (a tabela não tem chave única), então só se repete
+um lote quando o servidor com certeza não o gravou. Timeout de leitura,
+conexão caída no meio da resposta e 500/502/504 deixam o resultado incerto:
+o lote conta como falha e suas chaves vão para stats['failed_keys'], em vez
+de ser reenviado e talvez gravado duas vezes. A sincronização incremental
+mantém as cópias antigas dessas chaves e reescreve as duplicadas na execução
+seguinte.
+
+Assim como `incremental_sync`, não depende do Streamlit para poder rodar no
+GitHub Actions; o httpx (usado pelo cliente do Supabase) é opcional e só
+serve para reconhecer os erros de transporte.
+"""
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:  # cliente sem httpx: só os tipos da biblioteca padrão
+    httpx = None
+
+# Os erros são classificados pelo status HTTP e pelo código do PostgREST,
+# nunca pelo texto da mensagem (que traz os próprios dados inseridos).
+# Todos estes garantem que o lote não foi gravado; o resto é falha definitiva.
+PAYLOAD_STATUS_CODES = {413}
+PAYLOAD_ERROR_CODES = {'57014'}  # statement_timeout do Postgres (a transação é desfeita)
+RETRYABLE_STATUS_CODES = {429, 503}
+RETRYABLE_ERROR_CODES = {
+    '40001', '40P01',  # falha de serialização, deadlock
+    '53300', '57P01',  # conexões esgotadas, servidor reiniciando
+    'PGRST000', 'PGRST001', 'PGRST002',  # PostgREST sem conexão com o banco
+}
+
+# Falhas antes de a requisição sair (sem conexão): seguras para repetir.
+# Timeout de leitura e erros no meio da resposta ficam de fora de propósito.
+UNSENT_ERRORS = (ConnectionRefusedError,) + (
+    (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) if httpx else ()
+)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Status HTTP do erro: da resposta anexada ou do `code` numérico que o
+    postgrest usa quando a resposta não é JSON."""
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status_code is None:
+        status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        code = getattr(error, 'code', None)
+        if isinstance(code, int) or (isinstance(code, str) and len(code) == 3 and code.isdigit()):
+            status_code = code
+    return int(status_code) if status_code is not None else None
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    """Código do PostgREST/SQLSTATE do erro, se houver."""
+    code = getattr(error, 'code', None)
+    return str(code) if code is not None else None
+
+
+def is_payload_error(error: Exception) -> bool:
+    """Lote recusado por ser grande demais (413 ou timeout de instrução)."""
+    return _status_code(error) in PAYLOAD_STATUS_CODES or _error_code(error) in PAYLOAD_ERROR_CODES
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Erro transitório em que o lote não foi gravado (429, 503, sem conexão)."""
+    if isinstance(error, UNSENT_ERRORS):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES or _error_code(error) in RETRYABLE_ERROR_CODES
+
+
+class SupabaseBulkLoader:
+    """Insere listas de registros em uma tabela do Supabase em paralelo."""
+
+    def __init__(self, supabase, table_name: str, max_workers: int = 4,
+                 initial_batch_size: int = 500, min_batch_size: int = 25,
+                 max_batch_size: int = 2000, max_retries: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 30.0,
+                 max_failed_batches: Optional[int] = None, key_column: Optional[str] = None):
+        """
+        Args:
+            supabase: Cliente do Supabase (compartilhado entre as threads)
+            table_name: Tabela de destino
+            max_workers: Número máximo de requisições simultâneas
+            initial_batch_size: Tamanho do primeiro lote
+            min_batch_size: Menor lote usado após divisões
+            max_batch_size: Maior lote alcançado pelo crescimento adaptativo
+            max_retries: Tentativas por lote em erros transitórios
+            base_delay: Pausa inicial do backoff (segundos)
+            max_delay: Pausa máxima do backoff (segundos)
+            max_failed_batches: Interrompe o envio após esse número de lotes
+                com falha definitiva (None = nunca interrompe)
+            key_column: Coluna cujos valores dos registros não inseridos
+                são listados em stats['failed_keys']
+        """
+        self.supabase = supabase
+        self.table_name = table_name
+        self.max_workers = max(1, max_workers)
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.batch_size = min(max(initial_batch_size, self.min_batch_size), self.max_batch_size)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_failed_batches = max_failed_batches
+        self.key_column = key_column
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {
+            'total': 0,
+            'successful': 0,
+            'failed': 0,
+            'requests': 0,
+            'retries': 0,
+            'splits': 0,
+            'failed_batches': 0,
+            'errors': [],
+            'failed_keys': [],
+        }
+
+    # --- ajuste adaptativo do lote ---
+
+    def _grow_batch_size(self):
+        with self._lock:
+            self.batch_size = min(self.max_batch_size, int(self.batch_size * 1.5) + 1)
+
+    def _shrink_batch_size(self, failed_size: int):
+        # O tamanho recusado vira o novo teto, para o crescimento não repetir o erro
+        with self._lock:
+            self.max_batch_size = max(self.min_batch_size, min(self.max_batch_size, failed_size - 1))
+            self.batch_size = max(self.min_batch_size, min(self.batch_size, failed_size // 2))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    # --- envio ---
+
+    def _insert(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            self.stats['requests'] += 1
+        response = self.supabase.table(self.table_name).insert(records).execute()
+        if hasattr(response, 'error') and response.error:
+            raise Exception(f"Erro da API: {response.error}")
+
+    def _send_batch(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Envia um lote, repetindo em erros transitórios e dividindo-o ao meio
+        quando o payload é recusado. Retorna o número de registros inseridos.
+        """
+        attempt = 0
+        while True:
+            if self._stop.is_set():
+                self._record_failure(records, "Envio interrompido após falhas anteriores")
+                return 0
+
+            try:
+                self._insert(records)
+                with self._lock:
+                    self.stats['successful'] += len(records)
+                self._grow_batch_size()
+                return len(records)
+
+            except Exception as e:
+                if is_payload_error(e) and len(records) > 1:
+                    self._shrink_batch_size(len(records))
+                    with self._lock:
+                        self.stats['splits'] += 1
+                    middle = len(records) // 2
+                    return self._send_batch(records[:middle]) + self._send_batch(records[middle:])
+
+                if (is_retryable_error(e) or is_payload_error(e)) and attempt < self.max_retries:
+                    with self._lock:
+                        self.stats['retries'] += 1
+                    time.sleep(self._backoff_delay(attempt))
+                    attempt += 1
+                    continue
+
+                self._record_failure(records, str(e))
+                return 0
+
+    def _note_failed_keys(self, records: List[Dict[str, Any]]):
+        if self.key_column is not None:
+            self.stats['failed_keys'].extend(record.get(self.key_column) for record in records)
+
+    def _record_failure(self, records: List[Dict[str, Any]], message: str):
+        with self._lock:
+            self.stats['failed'] += len(records)
+            self._note_failed_keys(records)
+            self.stats['failed_batches'] += 1
+            self.stats['errors'].append(message)
+            if self.max_failed_batches is not None and self.stats['failed_batches'] >= self.max_failed_batches:
+                self._stop.set()
+
+    def load(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Insere todos os registros e retorna o relatório da execução.
+
+        Os lotes são cortados sob demanda com o tamanho adaptativo vigente,
+        mantendo no máximo `max_workers` requisições em voo.
+        """
+        self._reset_stats()
+        self._stop.clear()
+        self.stats['total'] = len(records)
+
+        print(f"🚀 Carga paralela: {len(records):,} registros em '{self.table_name}' "
+              f"({self.max_workers} workers, lote inicial {self.batch_size})")
+
+        start_time = time.time()
+        position = 0
+        next_progress = 0.1
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while position < len(records) or pending:
+                while position < len(records) and len(pending) < self.max_workers and not self._stop.is_set():
+                    with self._lock:
+                        size = self.batch_size
+                    batch = records[position:position + size]
+                    position += len(batch)
+                    pending.add(executor.submit(self._send_batch, batch))
+
+                if self._stop.is_set() and position < len(records):
+                    skipped = len(records) - position
+                    with self._lock:
+                        self.stats['failed'] += skipped
+                        self._note_failed_keys(records[position:])
+                    position = len(records)
+                    print(f"  🛑 Envio interrompido após {self.stats['failed_batches']} lotes com falha")
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+
+                processed = self.stats['successful'] + self.stats['failed']
+                if records and processed / len(records) >= next_progress:
+                    print(f"  📤 {processed:,}/{len(records):,} ({processed / len(records):.0%}) - lote atual {self.batch_size}")
+                    while next_progress <= processed / len(records):
+                        next_progress += 0.1
+
+        elapsed = time.time() - start_time
+        self.stats['elapsed_seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['successful'] / elapsed if elapsed > 0 else 0.0
+        self.stats['final_batch_size'] = self.batch_size
+
+        self.print_report()
+        return self.stats
+
+    def print_report(self):
+        """Imprime o relatório de vazão da última carga."""
+        stats = self.stats
+        print("📈 Vazão da carga:")
+        print(f"  ✅ Inseridos: {stats['successful']:,} de {stats['total']:,}")
+        print(f"  ❌ Falhas: {stats['failed']:,} ({stats['failed_batches']} lotes)")
+        print(f"  ⏱️ Tempo: {stats.get('elapsed_seconds', 0):.1f}s "
+              f"({stats.get('rows_per_second', 0):,.0f} registros/s)")
+        print(f"  🌐 Requisições: {stats['requests']:,} | Repetições: {stats['retries']:,} | Divisões: {stats['splits']:,}")
+        print(f"  📦 Lote final: {stats.get('final_batch_size', self.batch_size)}")
@@ -1,13 +1,21 @@
 import json
 import hashlib
+import os
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
 class CacheManager:
-    def __init__(self, cache_dir: str = "data/cache"):
+    def __init__(self, cache_dir: str = "data/cache", max_size_mb: Optional[float] = None):
+        """
+        Args:
+            cache_dir: Directory holding one JSON file per cached key
+            max_size_mb: Total size cap; least recently used files are removed
+                beyond it (None: unbounded)
+        """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb
         
     def _get_cache_key(self, key: str) -> str:
         """Generate cache filename from key"""
@@ -30,6 +38,8 @@ class CacheManager:
                 cache_file.unlink()  # Delete expired cache
                 return None
                 
+            # Mark as recently used for the size-based eviction
+            os.utime(cache_file)
             return data['value']
             
         except Exception:
@@ -47,6 +57,33 @@ class CacheManager:
         
         with open(cache_file, 'w') as f:
             json.dump(data, f)
+        
+        if self.max_size_mb is not None:
+            self._evict(keep=cache_file)
+    
+    def _evict(self, keep: Path):
+        """Remove least recently used files until the cache fits in max_size_mb"""
+        files = []
+        for cache_file in self.cache_dir.glob("*.json"):
+            try:
+                stat = cache_file.stat()
+            except FileNotFoundError:
+                continue  # Removed by another process
+            files.append((stat.st_mtime, stat.st_size, cache_file))
+        
+        total = sum(size for _, size, _ in files)
+        limit = self.max_size_mb * 1024 * 1024
+        for _, size, cache_file in sorted(files, key=lambda item: item[0]):
+            if total <= limit:
+                break
+            if cache_file == keep:
+                continue
+            cache_file.unlink(missing_ok=True)
+            total -= size
+    
+    def size_bytes(self) -> int:
+        """Total size of the cached files"""
+        return sum(cache_file.stat().st_size for cache_file in self.cache_dir.glob("*.json"))
     
     def clear(self):
         """Clear all cache"""
@@ -1,14 +1,34 @@
 import requests
 import zipfile
+import duckdb
 import pandas as pd
 import io
+import os
+import shutil
+import tempfile
 from pathlib import Path
 import urllib3
 
+import config
+
 class DataLoader:
-    def __init__(self, database=None):
+    # Arquivos anuais processados (apenas 2024, 2025 e 2026)
+    TARGET_FILES = [
+        "auto_infracao_ano_2024.csv",
+        "auto_infracao_ano_2025.csv",
+        "auto_infracao_ano_2026.csv"
+    ]
+
+    # Estimativa conservadora de memória por linha de CSV já carregada no pandas
+    # (~80 colunas de texto como objetos Python)
+    EST_BYTES_PER_ROW = 8_000
+
+    def __init__(self, database=None, streaming: bool = False, max_memory_mb: int = None):
         self.zip_url = None 
         self.database = database
+        self.streaming = streaming
+        self.max_memory_mb = max_memory_mb or config.INGEST_MAX_MEMORY_MB
+        self.download_chunk_bytes = 1024 * 1024
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
         
@@ -20,6 +40,9 @@ class DataLoader:
             print("Erro: A URL do ZIP não foi definida.")
             return False
 
+        if self.streaming:
+            return self.download_and_process_streaming()
+
         try:
             print("Baixando dados do IBAMA...")
             
@@ -32,11 +55,7 @@ class DataLoader:
             z = zipfile.ZipFile(io.BytesIO(response.content))
             
             # --- ALTERAÇÃO AQUI: Definindo os arquivos alvo ---
-            target_files = [
-                "auto_infracao_ano_2024.csv",
-                "auto_infracao_ano_2025.csv",
-                "auto_infracao_ano_2026.csv"
-            ]
+            target_files = self.TARGET_FILES
             print(f"Filtro aplicado: Processando apenas os arquivos {target_files}")
 
             all_data = []
@@ -76,3 +95,194 @@ class DataLoader:
         except Exception as e:
             print(f"Erro no processamento: {e}")
             return False
+
+    def download_and_process_streaming(self, table_name: str = "ibama_infracao") -> bool:
+        """
+        Streaming variant of download_and_process.
+
+        The ZIP is spooled to disk in blocks, each target CSV member is opened
+        lazily and read in chunks that are inserted straight into a temporary
+        DuckDB database of its own, opened with memory_limit = `max_memory_mb`.
+        Only after every member was loaded is the table copied into the shared
+        database, in a single transaction, so readers never see an empty or
+        partial table. Peak memory is bounded by `max_memory_mb` (DuckDB
+        memory_limit + pandas chunk size).
+        """
+        if not self.zip_url:
+            print("Erro: A URL do ZIP não foi definida.")
+            return False
+
+        connection = getattr(self.database, 'connection', None)
+        if connection is None:
+            print("Erro: Ingestão em streaming requer uma conexão DuckDB.")
+            return False
+
+        zip_path = None
+        staging_dir = None
+        rows_per_chunk = self._rows_per_chunk()
+
+        try:
+            print(f"Baixando dados do IBAMA em streaming (limite de memória: {self.max_memory_mb} MB)...")
+            zip_path = self._spool_download()
+
+            # A conexão do app é compartilhada com o dashboard e o LLM, e o
+            # memory_limit é global por banco: a ingestão usa um banco temporário
+            # com o seu próprio teto em vez de alterar o do app. O diretório
+            # guarda também o .wal e o .tmp (spill) desse banco.
+            staging_dir = tempfile.mkdtemp(dir=self.data_dir, prefix="ingest_")
+            staging_path = os.path.join(staging_dir, "staging.duckdb")
+            staging = duckdb.connect(staging_path, config={'memory_limit': f'{int(self.max_memory_mb)}MB'})
+            try:
+                total_rows, failed_members = self._stream_zip_to_duckdb(staging, zip_path, table_name, rows_per_chunk)
+            finally:
+                staging.close()
+
+            if failed_members:
+                # Uma carga parcial não substitui a tabela completa
+                print(f"Carga abortada: falha em {failed_members}; a tabela {table_name} não foi alterada.")
+                return False
+
+            if total_rows == 0:
+                print("Nenhum dado dos anos 2024, 2025 ou 2026 foi encontrado ou pôde ser extraído.")
+                return False
+
+            self._replace_table(connection, staging_path, table_name)
+            print(f"Total de registros carregados em streaming (2024-2026): {total_rows:,}")
+            return True
+
+        except requests.exceptions.RequestException as e:
+            print(f"Erro de rede ao baixar os dados: {e}")
+            return False
+        except Exception as e:
+            print(f"Erro no processamento em streaming: {e}")
+            return False
+        finally:
+            if staging_dir:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            if zip_path and os.path.exists(zip_path):
+                os.remove(zip_path)
+
+    def _stream_zip_to_duckdb(self, connection, zip_path: str, table_name: str, rows_per_chunk: int):
+        """Carrega os CSVs alvo do ZIP em `table_name`. Retorna (total de linhas, arquivos com falha)."""
+        total_rows = 0
+        failed_members = []
+        with zipfile.ZipFile(zip_path) as z:
+            members = [
+                name for name in z.namelist()
+                if any(target_file in name for target_file in self.TARGET_FILES)
+            ]
+            print(f"Filtro aplicado: Processando apenas os arquivos {members}")
+
+            for member in members:
+                print(f"Processando arquivo alvo: {member} (lotes de {rows_per_chunk:,} linhas)...")
+                try:
+                    member_rows = self._stream_member_to_duckdb(connection, z, member, table_name, rows_per_chunk)
+                    print(f"  {member_rows:,} registros carregados")
+                    total_rows += member_rows
+                except Exception as e:
+                    print(f"  Erro ao processar o arquivo {member}: {e}")
+                    failed_members.append(member)
+        return total_rows, failed_members
+
+    @staticmethod
+    def _replace_table(connection, staging_path: str, table_name: str):
+        """Troca atômica: copia a tabela do banco temporário para o do app numa única transação."""
+        connection.execute(f"ATTACH '{staging_path}' AS _ingest (READ_ONLY)")
+        try:
+            connection.execute("BEGIN TRANSACTION")
+            try:
+                connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                connection.execute(f'CREATE TABLE "{table_name}" AS SELECT * FROM _ingest."{table_name}"')
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.execute("DETACH _ingest")
+
+    def _rows_per_chunk(self) -> int:
+        """Tamanho do lote de leitura do CSV derivado do teto de memória."""
+        # Reserva ~1/4 do orçamento para o lote do pandas; o restante fica para o DuckDB
+        budget_bytes = int(self.max_memory_mb) * 1024 * 1024 // 4
+        return max(1_000, budget_bytes // self.EST_BYTES_PER_ROW)
+
+    def _spool_download(self) -> str:
+        """Grava o ZIP em disco em blocos, sem manter o arquivo inteiro em memória."""
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        print("Aviso: A verificação do certificado SSL será desabilitada para este download.")
+
+        with requests.get(self.zip_url, timeout=60, verify=False, stream=True) as response:
+            response.raise_for_status()
+            with tempfile.NamedTemporaryFile(dir=self.data_dir, suffix=".zip", delete=False) as tmp:
+                for block in response.iter_content(chunk_size=self.download_chunk_bytes):
+                    if block:
+                        tmp.write(block)
+                zip_path = tmp.name
+
+        print(f"Download concluído: {os.path.getsize(zip_path):,} bytes em {zip_path}")
+        return zip_path
+
+    def _stream_member_to_duckdb(self, connection, z: zipfile.ZipFile, member: str, table_name: str,
+                                 rows_per_chunk: int) -> int:
+        """
+        Lê um CSV do ZIP em lotes e insere no DuckDB dentro de uma transação.
+        Se o UTF-8 falhar no meio do arquivo, desfaz o que foi inserido e tenta latin-1.
+        """
+        for encoding in ['utf-8', 'latin1']:
+            rows = 0
+            connection.execute("BEGIN TRANSACTION")
+            try:
+                with z.open(member) as f:
+                    reader = pd.read_csv(
+                        f, encoding=encoding, sep=';', on_bad_lines='skip',
+                        dtype=str, chunksize=rows_per_chunk
+                    )
+                    for chunk in reader:
+                        self._insert_chunk(connection, chunk, table_name)
+                        rows += len(chunk)
+                connection.execute("COMMIT")
+                return rows
+            except UnicodeDecodeError:
+                connection.execute("ROLLBACK")
+                print(f"  Falha com {encoding.upper()}, tentando com latin-1...")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        return 0
+
+    def _insert_chunk(self, connection, chunk: pd.DataFrame, table_name: str):
+        """Insere um lote no DuckDB por nome de coluna, criando colunas novas se necessário."""
+        existing_columns = self._table_columns(connection, table_name)
+
+        # Todas as colunas como VARCHAR, como na carga original: sem isso o DuckDB
+        # infere o tipo pelo primeiro lote (ex.: coluna vazia vira INTEGER) e um
+        # texto em lote posterior derruba o arquivo inteiro
+        select_list = ", ".join(
+            f'CAST("{name}" AS VARCHAR) AS "{name}"'
+            for name in (str(column).replace('"', '""') for column in chunk.columns)
+        )
+
+        connection.register('_ingest_chunk', chunk)
+        try:
+            if not existing_columns:
+                connection.execute(f'CREATE TABLE "{table_name}" AS SELECT {select_list} FROM _ingest_chunk')
+                return
+
+            # Anos diferentes podem trazer colunas diferentes
+            for column in chunk.columns:
+                if column not in existing_columns:
+                    connection.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}" VARCHAR')
+
+            connection.execute(f'INSERT INTO "{table_name}" BY NAME SELECT {select_list} FROM _ingest_chunk')
+        finally:
+            connection.unregister('_ingest_chunk')
+
+    @staticmethod
+    def _table_columns(connection, table_name: str) -> set:
+        """Retorna as colunas existentes da tabela (vazio se ela ainda não existe)."""
+        result = connection.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = ?",
+            [table_name]
+        ).fetchall()
+        return {row[0] for row in result}
@@ -4,6 +4,8 @@ import streamlit as st
 from supabase import create_client, Client
 import os
 import config
+from src.utils.instrumentation import estimate_bytes, get_perf_recorder
+from src.utils.schema import parse_decimal
 
 class Database:
     def __init__(self):
@@ -154,11 +156,7 @@ class Database:
                 
                 # Calcula valor total das multas
                 try:
-                    df_full['VAL_AUTO_INFRACAO_NUMERIC'] = pd.to_numeric(
-                        df_full['VAL_AUTO_INFRACAO'].astype(str).str.replace(',', '.'), 
-                        errors='coerce'
-                    )
-                    valor_total_multas = df_full['VAL_AUTO_INFRACAO_NUMERIC'].sum()
+                    valor_total_multas = parse_decimal(df_full['VAL_AUTO_INFRACAO']).sum()
                 except:
                     valor_total_multas = 0
                 
@@ -195,12 +193,33 @@ class Database:
                 'total_municipios': [0]
             })
 
+    def call_rpc(self, function_name: str, params: dict = None) -> pd.DataFrame:
+        """
+        Executa uma função do Postgres via supabase.rpc e retorna o resultado.
+
+        Ao contrário de execute_query, os erros são propagados: quem chama
+        decide o fallback (ver sql/dashboard_rpcs.sql).
+        """
+        if not self.is_cloud or not self.supabase:
+            raise Exception("Funções RPC disponíveis apenas no Supabase")
+
+        with get_perf_recorder().measure(f"rpc:{function_name}", 'fetch', source='rpc') as event:
+            result = self.supabase.rpc(function_name, params or {}).execute()
+            data = result.data or []
+            event['rows_out'] = len(data)
+            event['bytes'] = estimate_bytes(data)
+        return pd.DataFrame(data)
+
     def _execute_duckdb_query(self, query: str) -> pd.DataFrame:
         """Executa consulta no DuckDB."""
         if not self.connection:
             raise Exception("DuckDB não inicializado")
         
-        return self.connection.execute(query).fetchdf()
+        with get_perf_recorder().measure('duckdb:query', 'fetch', source='duckdb') as event:
+            df = self.connection.execute(query).fetchdf()
+            event['rows_out'] = len(df)
+            event['bytes'] = estimate_bytes(df)
+        return df
 
     def _is_connected(self) -> bool:
         """Verifica se há conexão ativa."""
@@ -0,0 +1,265 @@
+"""
+Cache de processo para o dataset do IBAMA, compartilhado por todas as sessões.
+
+O Streamlit executa todas as sessões no mesmo processo; guardar o DataFrame
+em `st.session_state` faz cada visitante baixar e manter a sua própria cópia.
+Aqui os dados ficam em um único lugar, indexados pela versão dos dados (e não
+pela sessão), e são recarregados uma única vez quando a versão muda.
+
+Os DataFrames entregues são compartilhados: quem os recebe não deve alterá-los
+no lugar (use `.assign()` / `.copy()` para derivar novas colunas).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import config
+from src.utils.instrumentation import note_cache
+
+
+class DatasetStore:
+    """Armazena DataFrames por chave e versão, com carga única (single-flight)."""
+
+    def __init__(self, version_ttl: float = 300):
+        """
+        Args:
+            version_ttl: Segundos durante os quais a versão consultada no banco
+                é reutilizada antes de uma nova verificação
+        """
+        self.version_ttl = version_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._versions: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # --- versão dos dados ---
+
+    def get_version(self, name: str, probe: Callable[[], str], force: bool = False) -> str:
+        """
+        Retorna a versão atual de `name`, consultando `probe()` no máximo uma
+        vez a cada `version_ttl` segundos.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._versions.get(name)
+            if cached and not force and now - cached['checked_at'] < self.version_ttl:
+                return cached['version']
+
+        version = probe()
+
+        with self._lock:
+            self._versions[name] = {'version': version, 'checked_at': now}
+        return version
+
+    # --- dados ---
+
+    def get_or_load(self, key: str, version: str, loader: Callable[[], Any],
+                    is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Retorna o valor de `key` na `version` pedida, carregando-o com `loader()`
+        se necessário. Chamadas simultâneas para a mesma chave esperam a
+        primeira carga em vez de repetir o download.
+        
+        `is_valid(valor)` permite recusar uma entrada da mesma versão que não
+        atende ao pedido (ex.: projeção sem as colunas necessárias); o `loader`
+        pode então complementá-la a partir de `peek(key, version)`.
+
+        Resultados vazios não são armazenados, para que uma falha de rede não
+        fique em cache até a próxima versão.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if (entry is not None and entry['version'] == version
+                        and (is_valid is None or is_valid(entry['data']))):
+                    self.hits += 1
+                    note_cache(key, hit=True)
+                    return entry['data']
+
+                pending = self._loading.get(key)
+                is_loader = pending is None
+                if is_loader:
+                    pending = threading.Event()
+                    self._loading[key] = pending
+
+            if not is_loader:
+                # Outra sessão já está carregando esta chave
+                pending.wait()
+                continue
+
+            try:
+                start_time = time.time()
+                data = loader()
+                elapsed = time.time() - start_time
+
+                note_cache(key, hit=False)
+                with self._lock:
+                    self.misses += 1
+                    if not getattr(data, 'empty', False):
+                        # Substitui a versão anterior: só uma cópia por chave
+                        self._entries[key] = {
+                            'version': version,
+                            'data': data,
+                            'loaded_at': time.time(),
+                            'load_seconds': elapsed,
+                        }
+                print(f"💾 Dataset compartilhado '{key}' carregado (versão {version}) em {elapsed:.1f}s")
+                return data
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+                pending.set()
+
+    def peek(self, key: str, version: Optional[str] = None) -> Optional[Any]:
+        """
+        Retorna o valor armazenado para `key` sem carregar. Com `version`, só
+        devolve a entrada se ela for dessa versão.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (version is not None and entry['version'] != version):
+                return None
+            return entry['data']
+
+    def invalidate(self, prefix: str = ''):
+        """Descarta entradas (e versões consultadas) cujas chaves começam com `prefix`."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            for name in [n for n in self._versions if n.startswith(prefix)]:
+                del self._versions[name]
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumo para a página de diagnóstico."""
+        with self._lock:
+            entries = []
+            for key, entry in self._entries.items():
+                data = entry['data']
+                memory_mb = None
+                if hasattr(data, 'memory_usage'):
+                    memory_mb = data.memory_usage(deep=True).sum() / 1024 / 1024
+                entries.append({
+                    'key': key,
+                    'version': entry['version'],
+                    'rows': len(data) if hasattr(data, '__len__') else None,
+                    'memory_mb': memory_mb,
+                    'loaded_at': entry['loaded_at'],
+                    'load_seconds': entry['load_seconds'],
+                })
+
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'versions': {name: info['version'] for name, info in self._versions.items()},
+            }
+
+
+class LRUCache:
+    """Cache limitado para resultados derivados do dataset (ex.: recortes filtrados)."""
+
+    def __init__(self, maxsize: int = 16, name: str = 'lru', ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Itens mantidos; os menos usados são descartados além disso
+            name: Nome do cache no registro de desempenho
+            ttl: Segundos de validade de cada item (None: sem expiração)
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._stored_at: Dict[Any, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Retorna o valor de `key` (marcando-o como recente) ou None, também se expirado."""
+        with self._lock:
+            if key in self._items and self.ttl is not None and time.time() - self._stored_at[key] > self.ttl:
+                del self._items[key]
+                del self._stored_at[key]
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                value = self._items[key]
+            else:
+                self.misses += 1
+                value = None
+        note_cache(self.name, hit=value is not None)
+        return value
+
+    def put(self, key: Any, value: Any):
+        """Armazena `value`, descartando os itens menos usados além de `maxsize`."""
+        with self._lock:
+            self._items[key] = value
+            self._stored_at[key] = time.time()
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                oldest, _ = self._items.popitem(last=False)
+                del self._stored_at[oldest]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._stored_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+_store: Optional[DatasetStore] = None
+_filter_cache: Optional[LRUCache] = None
+_aggregate_cache: Optional[LRUCache] = None
+_answer_cache: Optional[LRUCache] = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    """Retorna a instância única do processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore(version_ttl=config.DATASET_VERSION_TTL_SECONDS)
+        return _store
+
+
+def get_filter_cache() -> LRUCache:
+    """Cache de recortes filtrados do dashboard, compartilhado pelo processo."""
+    global _filter_cache
+    with _store_lock:
+        if _filter_cache is None:
+            _filter_cache = LRUCache(maxsize=config.FILTER_CACHE_SIZE, name='filtros')
+        return _filter_cache
+
+
+def get_aggregate_cache() -> LRUCache:
+    """Cache das agregações prontas dos gráficos do dashboard, compartilhado pelo processo."""
+    global _aggregate_cache
+    with _store_lock:
+        if _aggregate_cache is None:
+            _aggregate_cache = LRUCache(maxsize=config.AGGREGATE_CACHE_SIZE, name='agregados')
+        return _aggregate_cache
+
+
+def get_answer_cache() -> LRUCache:
+    """Cache das respostas do chatbot (por versão, intenção e filtros), compartilhado pelo processo."""
+    global _answer_cache
+    with _store_lock:
+        if _answer_cache is None:
+            _answer_cache = LRUCache(maxsize=config.ANSWER_CACHE_SIZE, name='respostas',
+                                     ttl=config.ANSWER_CACHE_TTL_SECONDS)
+        return _answer_cache
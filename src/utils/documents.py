@@ -0,0 +1,72 @@
+"""
+CPF/CNPJ dos infratores, tratados por coluna (sem apply linha a linha).
+
+`describe_documents` faz uma única passada de operações de texto do pandas e
+devolve, para cada documento:
+
+- DOC_TYPE    CPF (11 dígitos), CNPJ (14 dígitos) ou OUTRO
+- DOC_KEY     só os dígitos, para agrupar o mesmo documento escrito com ou
+              sem pontuação
+- DOC_MASKED  rótulo para exibição: CPF mascarado (XXX.***.***-XX), CNPJ
+              completo formatado e o texto original nos demais casos
+
+As mesmas regras estão em sql/dashboard_rpcs.sql.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    # Operações de texto vetorizadas em C++ (Arrow)
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
+DOC_TYPES = ['CPF', 'CNPJ', 'OUTRO']
+
+# Pontuação aceita entre os dígitos (no SQL: '[-./[:space:]]')
+SEPARATORS = ['.', '-', '/', ' ']
+
+
+def _to_object(series: pd.Series, valid: np.ndarray) -> pd.Series:
+    """Volta ao texto em object (como o restante do dataset), com NaN fora de `valid`."""
+    return series.astype(object).where(valid, np.nan)
+
+
+def describe_documents(documents: pd.Series) -> pd.DataFrame:
+    """Tipo, chave numérica e rótulo mascarado de cada documento (mesmo índice da entrada)."""
+    text = documents.astype(STRING_DTYPE).str.strip()
+
+    key = text
+    for separator in SEPARATORS:
+        key = key.str.replace(separator, '', regex=False)
+
+    digits = key.str.fullmatch(r'\d+').fillna(False).to_numpy(dtype=bool)
+    length = key.str.len().fillna(0).to_numpy()
+    is_cpf = digits & (length == 11)
+    is_cnpj = digits & (length == 14)
+
+    # Monta os rótulos só nas linhas de cada tipo (por posição: o índice pode ter repetições)
+    masked = text.copy()
+    cpf = key[is_cpf]
+    masked[is_cpf] = (cpf.str[:3] + '.***.***-' + cpf.str[-2:]).to_numpy()
+    cnpj = key[is_cnpj]
+    masked[is_cnpj] = (cnpj.str[:2] + '.' + cnpj.str[2:5] + '.' + cnpj.str[5:8]
+                       + '/' + cnpj.str[8:12] + '-' + cnpj.str[12:]).to_numpy()
+
+    return pd.DataFrame({
+        'DOC_TYPE': pd.Categorical(np.select([is_cpf, is_cnpj], ['CPF', 'CNPJ'], 'OUTRO'),
+                                   categories=DOC_TYPES),
+        'DOC_KEY': _to_object(key, digits),
+        'DOC_MASKED': _to_object(masked, masked.notna().to_numpy()),
+    }, index=documents.index)
+
+
+def classify_documents(documents: pd.Series) -> pd.Categorical:
+    """Apenas o tipo de documento: CPF, CNPJ ou OUTRO."""
+    return describe_documents(documents)['DOC_TYPE'].array
+
+
+def mask_documents(documents: pd.Series) -> pd.Series:
+    """Apenas o rótulo de exibição, com o CPF mascarado."""
+    return describe_documents(documents)['DOC_MASKED']
@@ -0,0 +1,136 @@
+"""
+Índice de filtros para as perguntas do chatbot.
+
+Cada pergunta filtra a base por ano, UF, tipo de infração, gravidade e tipo
+de documento (`ChatbotFixed._parse_question`). Sem índice, cada filtro
+percorre todas as linhas - e o de tipo ainda passa todos os textos para
+minúsculas. O índice guarda, uma vez por versão dos dados, para cada coluna:
+
+- o código inteiro de cada linha (np.int32, -1 para nulo);
+- as posições das linhas de cada valor, em ordem crescente (uma fatia de um
+  único array ordenado por código, com `offsets` marcando o início de cada valor).
+
+Uma pergunta parte das posições do filtro mais seletivo e confere os demais
+filtros só nessas linhas pelo código, então o custo acompanha o tamanho do
+resultado, não o da base. Sem filtros, a própria base é devolvida, sem cópia.
+
+Espera o dataset no esquema canônico (src/utils/schema.py): YEAR e DOC_TYPE
+calculados, textos aparados com vazio como nulo.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Filtro de _parse_question -> coluna indexada
+FILTER_COLUMNS = {
+    'years': 'YEAR',
+    'ufs': 'UF',
+    'tipos': 'TIPO_INFRACAO',
+    'gravidades': 'GRAVIDADE_INFRACAO',
+    'doc_type': 'DOC_TYPE',
+}
+# Colunas comparadas sem diferenciar maiúsculas (como no filtro original)
+CASE_INSENSITIVE_COLUMNS = {'TIPO_INFRACAO'}
+
+
+class _ColumnIndex:
+    """Códigos por linha e posições por valor de uma coluna."""
+
+    def __init__(self, values: pd.Series):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        self.codes = codes.astype(np.int32)
+        self.lookup: Dict[Any, int] = {value: code for code, value in enumerate(uniques.tolist())}
+        # Ordenação estável: as posições de cada valor ficam em ordem crescente
+        self.order = np.argsort(self.codes, kind='stable').astype(np.int32)
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(uniques))
+        missing = int((self.codes < 0).sum())
+        self.offsets = missing + np.concatenate([[0], np.cumsum(counts)])
+
+    def codes_for(self, values: Iterable[Any]) -> np.ndarray:
+        return np.array(sorted({self.lookup[value] for value in values if value in self.lookup}), dtype=np.int32)
+
+    def positions(self, codes: np.ndarray) -> np.ndarray:
+        """Posições (crescentes) das linhas com algum dos `codes`."""
+        parts = [self.order[self.offsets[code]:self.offsets[code + 1]] for code in codes]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+    def size(self, codes: np.ndarray) -> int:
+        return int(sum(self.offsets[code + 1] - self.offsets[code] for code in codes))
+
+
+class FilterIndex:
+    """Posições das linhas por valor de cada filtro do chatbot - ver docstring do módulo."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Args:
+            df: Dataset do chatbot no esquema canônico. O índice vale só para
+                este DataFrame (posições de linha), ver `matches`.
+        """
+        self.rows = len(df)
+        self._frame_index = df.index
+        self.columns: Dict[str, _ColumnIndex] = {}
+        for column in FILTER_COLUMNS.values():
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if column in CASE_INSENSITIVE_COLUMNS:
+                values = values.astype(object).where(values.notna(), None)
+                values = values.map(lambda value: value.lower() if isinstance(value, str) else value)
+            self.columns[column] = _ColumnIndex(values)
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """Se o índice foi montado a partir de `df` (o mesmo objeto de linhas)."""
+        return df.index is self._frame_index and len(df) == self.rows
+
+    def memory_usage(self, deep: bool = True) -> pd.Series:
+        """Memória dos arrays do índice (para o diagnóstico do DatasetStore)."""
+        return pd.Series({
+            column: index.codes.nbytes + index.order.nbytes + index.offsets.nbytes
+            for column, index in self.columns.items()
+        }, dtype='int64')
+
+    def _wanted_codes(self, filters: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Códigos pedidos por coluna; colunas sem filtro (ou fora do índice) não entram."""
+        wanted = {}
+        for name, column in FILTER_COLUMNS.items():
+            values = filters.get(name)
+            if not values or column not in self.columns:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            if column == 'YEAR':
+                values = [int(value) for value in values]
+            elif column in CASE_INSENSITIVE_COLUMNS:
+                values = [value.lower() for value in values]
+            wanted[column] = self.columns[column].codes_for(values)
+        return wanted
+
+    def positions(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Posições (crescentes) das linhas que atendem a todos os filtros, no
+        formato de _parse_question. None quando não há filtro a aplicar.
+        """
+        wanted = self._wanted_codes(filters)
+        if not wanted:
+            return None
+
+        # Começa pelo filtro com menos linhas e confere os outros só nelas
+        ordered = sorted(wanted, key=lambda column: self.columns[column].size(wanted[column]))
+        first = ordered[0]
+        positions = self.columns[first].positions(wanted[first])
+        for column in ordered[1:]:
+            if len(positions) == 0:
+                break
+            positions = positions[np.isin(self.columns[column].codes[positions], wanted[column])]
+        return positions
+
+    def apply(self, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
+        """Linhas de `df` (o DataFrame indexado) que atendem aos filtros."""
+        positions = self.positions(filters)
+        if positions is None:
+            return df
+        return df.iloc[positions]
@@ -0,0 +1,247 @@
+"""
+Sincronização incremental (delta) da tabela ibama_infracao no Supabase.
+
+Em vez de apagar a tabela e reinserir tudo, compara o CSV novo com o que já
+está gravado usando NUM_AUTO_INFRACAO como chave e DT_ULT_ALTERACAO (e, se a
+tabela tiver a coluna ROW_HASH, um hash da linha) para detectar alterações.
+Apenas linhas novas ou alteradas são reenviadas e as que sumiram do CSV são
+removidas.
+
+A tabela não tem restrição única em NUM_AUTO_INFRACAO, então não há upsert:
+as versões novas das linhas alteradas são inseridas primeiro e só depois as
+cópias antigas são apagadas pelo id (`apply_sync_deletes`), pulando as chaves
+cuja reinserção falhou. Um upload interrompido deixa no máximo duplicatas,
+que a próxima execução reescreve, e nunca perde linhas.
+
+Este módulo depende apenas de pandas para poder ser usado pelos scripts de
+upload no GitHub Actions, que não instalam o Streamlit.
+"""
+from typing import Any, Dict, List
+
+import pandas as pd
+
+KEY_COLUMN = 'NUM_AUTO_INFRACAO'
+CHANGE_COLUMN = 'DT_ULT_ALTERACAO'
+HASH_COLUMN = 'ROW_HASH'
+
+# Colunas geradas pelo banco que nunca entram no hash
+SYSTEM_COLUMNS = {'id', 'created_at', 'updated_at', HASH_COLUMN}
+
+# Coluna inexistente: SQLSTATE undefined_column e o código do PostgREST
+UNDEFINED_COLUMN_CODES = {'42703', 'PGRST204'}
+
+
+def _normalize_text(series: pd.Series) -> pd.Series:
+    """Normaliza valores para comparação: nulos viram '' e espaços são removidos."""
+    return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+
+
+def _normalize_keys(series: pd.Series) -> pd.Series:
+    """Chaves em forma canônica: '123.0' (lida como número) e '123' são a mesma chave."""
+    return _normalize_text(series).str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+
+
+def _normalize_change(series: pd.Series) -> pd.Series:
+    """
+    DT_ULT_ALTERACAO comparável entre o CSV ('2024-05-01 10:00:00') e o
+    PostgREST ('2024-05-01T10:00:00+00:00'): datas viram ISO em UTC (horários
+    sem fuso são tomados como UTC); o que não é data fica como texto.
+    """
+    text = _normalize_text(series)
+    parsed = pd.to_datetime(text.where(text != ''), errors='coerce', utc=True, format='mixed')
+    return parsed.dt.strftime('%Y-%m-%dT%H:%M:%S.%f').where(parsed.notna(), text)
+
+
+def compute_row_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Calcula um hash estável por linha, independente da ordem das colunas.
+
+    Returns:
+        pd.Series: hash hexadecimal de 16 caracteres para cada linha
+    """
+    columns = sorted(col for col in df.columns if col not in SYSTEM_COLUMNS)
+    normalized = pd.DataFrame({col: _normalize_text(df[col]) for col in columns}, index=df.index)
+    hashes = pd.util.hash_pandas_object(normalized, index=False)
+    return hashes.map(lambda value: f"{value:016x}")
+
+
+def _table_has_column(supabase, table_name: str, column: str) -> bool:
+    """
+    Verifica se a coluna existe tentando selecioná-la. Só o erro de coluna
+    inexistente conta como ausência: falhas de rede, 5xx e de autenticação
+    são propagadas, para não tratar linhas alteradas como inalteradas nem
+    gravar ROW_HASH nulo por causa de um erro transitório.
+    """
+    try:
+        supabase.table(table_name).select(column).limit(1).execute()
+        return True
+    except Exception as error:
+        if str(getattr(error, 'code', None)) in UNDEFINED_COLUMN_CODES:
+            return False
+        raise
+
+
+def add_row_hashes(supabase, table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Se a tabela tiver a coluna ROW_HASH, devolve uma cópia de `df` com o hash
+    de cada linha; senão, devolve `df` como está. Usado tanto na carga
+    incremental quanto na recarga completa, para que a próxima execução
+    incremental compare hashes gravados em vez de NULLs.
+    """
+    if not _table_has_column(supabase, table_name, HASH_COLUMN):
+        return df
+    df = df.copy()
+    df[HASH_COLUMN] = compute_row_hashes(df)
+    return df
+
+
+def fetch_stored_keys(supabase, table_name: str, include_hash: bool = False, page_size: int = 1000) -> pd.DataFrame:
+    """
+    Busca apenas as colunas de controle (id, chave, data de alteração e hash)
+    de todos os registros gravados, página por página.
+    """
+    columns = ['id', KEY_COLUMN, CHANGE_COLUMN]
+    if include_hash:
+        columns.append(HASH_COLUMN)
+
+    # Sem DT_ULT_ALTERACAO na tabela, a detecção fica só com o hash (se houver)
+    if not _table_has_column(supabase, table_name, CHANGE_COLUMN):
+        columns.remove(CHANGE_COLUMN)
+
+    select_clause = ','.join(columns)
+
+    records: List[Dict[str, Any]] = []
+    page = 0
+    while True:
+        start = page * page_size
+        end = start + page_size - 1
+        result = supabase.table(table_name).select(select_clause).order('id').range(start, end).execute()
+
+        if not result.data:
+            break
+
+        records.extend(result.data)
+        if len(result.data) < page_size:
+            break
+        page += 1
+
+    stored = pd.DataFrame(records, columns=columns)
+    print(f"🔑 Chaves armazenadas carregadas: {len(stored):,} registros")
+    return stored
+
+
+def diff_against_stored(df_new: pd.DataFrame, stored: pd.DataFrame, use_hash: bool = False) -> Dict[str, Any]:
+    """
+    Compara o DataFrame novo com as chaves armazenadas.
+
+    Returns:
+        Dict com 'to_upsert' (linhas novas + alteradas), 'replace_ids'
+        (chave alterada -> ids das cópias antigas, apagadas depois da
+        reinserção), 'vanished_ids' (ids das chaves que sumiram do CSV) e
+        contadores para o relatório.
+    """
+    df_new = df_new[df_new[KEY_COLUMN].notna() & (_normalize_text(df_new[KEY_COLUMN]) != '')].reset_index(drop=True)
+    new_keys = _normalize_keys(df_new[KEY_COLUMN])
+    first = ~new_keys.duplicated(keep='first')
+    df_new = df_new[first].reset_index(drop=True)
+    new_keys = new_keys[first].reset_index(drop=True)
+
+    stored = stored[stored[KEY_COLUMN].notna()].copy()
+    stored[KEY_COLUMN] = _normalize_keys(stored[KEY_COLUMN])
+
+    # Chaves duplicadas no banco são sempre reescritas para eliminar as cópias
+    key_counts = stored[KEY_COLUMN].value_counts()
+    duplicated_keys = set(key_counts[key_counts > 1].index)
+    stored_first = stored.drop_duplicates(subset=[KEY_COLUMN], keep='first').set_index(KEY_COLUMN)
+
+    is_stored = new_keys.isin(stored_first.index)
+    changed = pd.Series(False, index=df_new.index)
+
+    if CHANGE_COLUMN in df_new.columns and CHANGE_COLUMN in stored_first.columns:
+        stored_change = new_keys.map(_normalize_change(stored_first[CHANGE_COLUMN]))
+        changed |= is_stored & (_normalize_change(df_new[CHANGE_COLUMN]) != stored_change)
+
+    if use_hash and HASH_COLUMN in df_new.columns and HASH_COLUMN in stored_first.columns:
+        stored_hash = new_keys.map(_normalize_text(stored_first[HASH_COLUMN]))
+        changed |= is_stored & (df_new[HASH_COLUMN] != stored_hash)
+
+    changed |= is_stored & new_keys.isin(duplicated_keys)
+
+    inserted_mask = ~is_stored
+    vanished_keys = sorted(set(stored_first.index) - set(new_keys))
+    changed_keys = new_keys[changed].tolist()
+
+    ids_by_key = stored.groupby(KEY_COLUMN, sort=False)['id'].agg(list) if 'id' in stored.columns else pd.Series(dtype=object)
+    return {
+        'to_upsert': df_new[inserted_mask | changed],
+        'replace_ids': {key: ids_by_key.get(key, []) for key in changed_keys},
+        'vanished_ids': [row_id for key in vanished_keys for row_id in ids_by_key.get(key, [])],
+        'inserted': int(inserted_mask.sum()),
+        'changed': int(changed.sum()),
+        'vanished': len(vanished_keys),
+        'unchanged': int((is_stored & ~changed).sum()),
+        'stored_duplicates': len(duplicated_keys),
+        'stored_total': len(stored),
+    }
+
+
+def build_sync_plan(supabase, table_name: str, df: pd.DataFrame, max_delete_ratio: float = 0.5) -> Dict[str, Any]:
+    """
+    Monta o plano de sincronização incremental para `df`.
+
+    Se a tabela tiver a coluna ROW_HASH, o hash é calculado e enviado junto
+    com as linhas (ver add_row_hashes). Como proteção contra CSVs truncados, remoções de chaves
+    ausentes acima de `max_delete_ratio` do total armazenado são ignoradas.
+    """
+    print("🔄 Planejando sincronização incremental...")
+
+    df = add_row_hashes(supabase, table_name, df)
+    use_hash = HASH_COLUMN in df.columns
+    if not use_hash and CHANGE_COLUMN not in df.columns:
+        print(f"  ⚠️ Sem {CHANGE_COLUMN} nem {HASH_COLUMN}: apenas inclusões e remoções serão detectadas")
+
+    stored = fetch_stored_keys(supabase, table_name, include_hash=use_hash)
+    plan = diff_against_stored(df, stored, use_hash=use_hash)
+
+    if plan['stored_total'] and plan['vanished'] > plan['stored_total'] * max_delete_ratio:
+        print(f"  ⚠️ {plan['vanished']:,} chaves ausentes no CSV (> {max_delete_ratio:.0%} da tabela) - remoções ignoradas")
+        plan['vanished_ids'] = []
+        plan['vanished'] = 0
+
+    print(f"  ➕ Novos: {plan['inserted']:,}")
+    print(f"  ✏️ Alterados: {plan['changed']:,}")
+    print(f"  🗑️ Removidos: {plan['vanished']:,}")
+    print(f"  ✅ Inalterados: {plan['unchanged']:,}")
+    if plan['stored_duplicates']:
+        print(f"  🔁 Chaves duplicadas no banco que serão reescritas: {plan['stored_duplicates']:,}")
+
+    return plan
+
+
+def delete_ids(supabase, table_name: str, ids: List[Any], batch_size: int = 200) -> int:
+    """Remove registros pelos ids informados, em lotes. Retorna o total de ids processados."""
+    deleted = 0
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i:i + batch_size]
+        supabase.table(table_name).delete().in_('id', batch).execute()
+        deleted += len(batch)
+    return deleted
+
+
+def apply_sync_deletes(supabase, table_name: str, plan: Dict[str, Any], failed_keys: List[Any] = ()) -> int:
+    """
+    Depois da carga de `plan['to_upsert']`: apaga as cópias antigas das linhas
+    alteradas cuja reinserção deu certo (as de `failed_keys` ficam) e, por
+    último, as linhas que sumiram do CSV. Retorna o total de ids removidos.
+    """
+    failed = set(_normalize_keys(pd.Series(list(failed_keys), dtype=object))) if failed_keys else set()
+    replaced_ids = [row_id for key, ids in plan['replace_ids'].items() if key not in failed for row_id in ids]
+    kept = sum(1 for key in plan['replace_ids'] if key in failed)
+
+    deleted = delete_ids(supabase, table_name, replaced_ids)
+    deleted += delete_ids(supabase, table_name, plan['vanished_ids'])
+    if deleted:
+        print(f"  🗑️ {deleted:,} registros antigos removidos após a reinserção")
+    if kept:
+        print(f"  ⚠️ {kept:,} linhas alteradas mantidas na versão antiga (reinserção falhou)")
+    return deleted
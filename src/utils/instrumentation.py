@@ -0,0 +1,231 @@
+"""
+Medições de desempenho do dashboard: tempo, volume de dados e uso de cache.
+
+Cada gráfico (`create_*_advanced`) e cada busca de dados (páginas do Supabase,
+snapshot, RPC, DuckDB) vira um evento com:
+
+- seconds             tempo de relógio da chamada
+- rows_in / rows_out  linhas consumidas e linhas entregues
+- bytes               volume trazido da fonte (estimado pelo JSON de uma amostra
+                      das linhas; o tamanho do arquivo para o snapshot)
+- cache_hits/misses   consultas ao dataset compartilhado e aos caches LRU
+
+As medições aninham: uma busca feita durante um gráfico é registrada como
+evento próprio e soma os seus bytes ao gráfico, e os acertos de cache contam
+para o evento em andamento. Assim a página de diagnóstico mostra qual gráfico
+domina a latência da página, inclusive quando é ele quem paga a carga da base.
+
+Os eventos ficam em memória (últimos PERF_MAX_EVENTS) e, com PERF_LOG, também
+são gravados como JSON, uma linha por evento ('stdout' ou caminho de arquivo).
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+import config
+
+# Campos somados quando o mesmo evento é anotado mais de uma vez
+ADDITIVE_FIELDS = ('rows_in', 'rows_out', 'bytes')
+
+# Linhas serializadas para estimar o tamanho em JSON de um resultado
+BYTES_SAMPLE_ROWS = 50
+
+# Evento em andamento na thread/contexto atual (cada sessão roda na sua thread)
+_current_event: contextvars.ContextVar = contextvars.ContextVar('perf_event', default=None)
+
+
+def estimate_bytes(data: Any) -> int:
+    """
+    Tamanho aproximado, em JSON, de uma lista de registros ou de um DataFrame:
+    serializa só as primeiras BYTES_SAMPLE_ROWS linhas e extrapola.
+    """
+    rows = len(data) if data is not None else 0
+    if rows == 0:
+        return 0
+    try:
+        if isinstance(data, pd.DataFrame):
+            sample = data.head(BYTES_SAMPLE_ROWS).to_json(orient='records', date_format='iso')
+        else:
+            sample = json.dumps(list(data[:BYTES_SAMPLE_ROWS]), default=str)
+    except Exception:
+        return 0
+    sample_rows = min(rows, BYTES_SAMPLE_ROWS)
+    return int(len(sample.encode('utf-8')) / sample_rows * rows)
+
+
+def annotate(**fields):
+    """
+    Anota o evento em andamento (sem efeito fora de uma medição). rows_in,
+    rows_out e bytes são somados; os demais campos são substituídos.
+    """
+    event = _current_event.get()
+    if event is None:
+        return
+    for field, value in fields.items():
+        if field in ADDITIVE_FIELDS:
+            event[field] = (event[field] or 0) + int(value or 0)
+        else:
+            event[field] = value
+
+
+def note_cache(name: str, hit: bool):
+    """Registra um acerto (ou falta) do cache `name` no evento em andamento."""
+    event = _current_event.get()
+    if event is None:
+        return
+    event['cache_hits' if hit else 'cache_misses'] += 1
+    event['caches'][name] = 'hit' if hit else 'miss'
+
+
+def process_memory_mb() -> Optional[float]:
+    """Memória residente (RSS) do processo em MB, lida de /proc; None fora do Linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PerfRecorder:
+    """Guarda os últimos eventos medidos e resume-os por nome."""
+
+    def __init__(self, max_events: int = 2000, log_target: str = ''):
+        """
+        Args:
+            max_events: Eventos mantidos em memória (os mais antigos saem primeiro)
+            log_target: '' (sem log), 'stdout' ou caminho de um arquivo JSON lines
+        """
+        self.log_target = (log_target or '').strip()
+        self._lock = threading.Lock()
+        self._events: deque = deque(maxlen=max_events)
+
+    @contextmanager
+    def measure(self, name: str, kind: str, **fields):
+        """
+        Mede o bloco como um evento `kind` ('chart', 'fetch', ...). O evento é
+        entregue ao bloco, que pode completá-lo diretamente ou via `annotate`.
+        """
+        event = {
+            'name': name,
+            'kind': kind,
+            'started_at': time.time(),
+            'seconds': None,
+            'rows_in': None,
+            'rows_out': None,
+            'bytes': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'caches': {},
+            'source': None,
+            'error': None,
+            **fields,
+        }
+        parent = _current_event.get()
+        token = _current_event.set(event)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event['error'] = str(e)[:200]
+            raise
+        finally:
+            event['seconds'] = time.perf_counter() - start
+            _current_event.reset(token)
+            if parent is not None:
+                # Os bytes buscados contam também para quem pediu os dados
+                parent['bytes'] = (parent['bytes'] or 0) + (event['bytes'] or 0)
+            self._record(event)
+
+    def _record(self, event: Dict[str, Any]):
+        with self._lock:
+            self._events.append(event)
+            if self.log_target:
+                self._write_log(event)
+
+    def _write_log(self, event: Dict[str, Any]):
+        line = json.dumps({'event': 'perf', **event}, ensure_ascii=False, default=str)
+        if self.log_target == 'stdout':
+            print(line)
+            return
+        try:
+            with open(self.log_target, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar o log de desempenho em {self.log_target}: {e}")
+            self.log_target = ''
+
+    def events(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Cópia dos eventos guardados (opcionalmente só de um tipo), do mais antigo ao mais novo."""
+        with self._lock:
+            return [dict(event) for event in self._events if kind is None or event['kind'] == kind]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def summary(self, kind: Optional[str] = None) -> pd.DataFrame:
+        """
+        Uma linha por (tipo, nome): chamadas, tempos (média, p50, p95, máximo
+        e total), linhas médias, MB somados, taxa de acerto de cache e erros.
+        Ordenado pelo tempo total, com a fatia de cada um no total do seu tipo.
+        """
+        events = self.events(kind)
+        if not events:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(events)
+        grouped = df.groupby(['kind', 'name'])
+        summary = grouped.agg(
+            calls=('seconds', 'size'),
+            mean_s=('seconds', 'mean'),
+            p50_s=('seconds', 'median'),
+            p95_s=('seconds', lambda s: s.quantile(0.95)),
+            max_s=('seconds', 'max'),
+            total_s=('seconds', 'sum'),
+            rows_in=('rows_in', 'mean'),
+            rows_out=('rows_out', 'mean'),
+            mb=('bytes', lambda s: s.sum() / 1024 / 1024),
+            cache_hits=('cache_hits', 'sum'),
+            cache_misses=('cache_misses', 'sum'),
+            errors=('error', 'count'),
+        ).reset_index()
+
+        lookups = summary['cache_hits'] + summary['cache_misses']
+        summary['cache_hit_rate'] = (summary['cache_hits'] / lookups).where(lookups > 0)
+        summary['share'] = summary['total_s'] / summary.groupby('kind')['total_s'].transform('sum')
+        return summary.sort_values(['kind', 'total_s'], ascending=[True, False]).reset_index(drop=True)
+
+
+def timed(kind: str, name: Optional[str] = None):
+    """Decorador: mede cada chamada da função como um evento `kind` (nome da função por padrão)."""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_perf_recorder().measure(label, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_recorder: Optional[PerfRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_perf_recorder() -> PerfRecorder:
+    """Retorna a instância única do processo (compartilhada pelas sessões)."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = PerfRecorder(max_events=config.PERF_MAX_EVENTS, log_target=config.PERF_LOG)
+        return _recorder
@@ -0,0 +1,108 @@
+"""
+Cache em disco das respostas dos LLMs (Groq/Gemini).
+
+Os botões de exemplo do explorador SQL e do chatbot enviam sempre as mesmas
+perguntas, e cada uma custava uma chamada à API (latência e cota). As
+respostas ficam em data/cache/llm (um JSON por chave, via CacheManager),
+compartilhadas pelas sessões e preservadas entre reinícios do app, com
+validade e tamanho total limitados (os arquivos menos usados saem primeiro).
+
+A chave reúne provedor, modelo, prompt normalizado (maiúsculas, espaços e
+pontuação final não distinguem perguntas), temperature, max_tokens e o hash
+do prompt de sistema (o esquema da tabela): uma mudança no esquema gera
+chaves novas. Com temperature > 0 a resposta varia de propósito, então o
+cache é ignorado, a menos que `cache_nonzero_temperature` seja ligado.
+"""
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+from src.utils.cache_manager import CacheManager
+from src.utils.instrumentation import note_cache
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt sem diferenças de maiúsculas, espaços repetidos ou pontuação final."""
+    text = unicodedata.normalize('NFKC', prompt).casefold()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip(' ?!.')
+
+
+def schema_hash(system_prompt: Optional[str]) -> str:
+    """Hash curto do prompt de sistema ('' quando não há)."""
+    if not system_prompt:
+        return ''
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+class LLMCache:
+    """Respostas de LLM em disco, por provedor, modelo, prompt e parâmetros - ver docstring do módulo."""
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 50, max_age_hours: float = 168,
+                 cache_nonzero_temperature: bool = False):
+        """
+        Args:
+            cache_dir: Diretório dos arquivos do cache
+            max_size_mb: Tamanho total máximo (os menos usados são removidos)
+            max_age_hours: Validade de cada resposta
+            cache_nonzero_temperature: Também guarda respostas com temperature > 0
+        """
+        self.store = CacheManager(cache_dir, max_size_mb=max_size_mb)
+        self.max_age_hours = max_age_hours
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def accepts(self, temperature: float) -> bool:
+        """Se respostas com esta `temperature` passam pelo cache."""
+        return temperature <= 0 or self.cache_nonzero_temperature
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, temperature: float, max_tokens: int,
+                 system_prompt: Optional[str] = None) -> str:
+        return json.dumps({
+            'provider': provider,
+            'model': model,
+            'prompt': normalize_prompt(prompt),
+            'temperature': float(temperature),
+            'max_tokens': int(max_tokens),
+            'schema': schema_hash(system_prompt),
+        }, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Resposta guardada para `key`, ou None."""
+        value = self.store.get(key, max_age_hours=self.max_age_hours)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        note_cache('llm', hit=value is not None)
+        return value
+
+    def put(self, key: str, response: str):
+        """Guarda `response` (respostas vazias, de falha, não são guardadas)."""
+        if not response:
+            return
+        try:
+            self.store.set(key, response)
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar o cache de LLM: {e}")
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'size_mb': self.store.size_bytes() / 1024 / 1024,
+                'max_size_mb': self.store.max_size_mb,
+            }
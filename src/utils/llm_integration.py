@@ -7,6 +7,8 @@ import google.generativeai as genai
 import pandas as pd
 
 import config
+from src.utils.dataset_store import get_dataset_store
+from src.utils.llm_cache import LLMCache
 try:
     from src.utils.tools import search_internet
 except ImportError:
@@ -14,6 +16,13 @@ except ImportError:
     def search_internet(query: str) -> str:
         return "Busca na internet não disponível nesta instância."
 
+# Colunas cujos valores distintos vão no prompt de sistema (o modelo acerta os textos dos filtros)
+PROMPT_VALUE_COLUMNS = ['UF', 'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO']
+PROMPT_MAX_VALUES = 40
+PROMPT_DATE_COLUMN = 'DAT_HORA_AUTO_INFRACAO'
+# Datasets compartilhados já carregados de onde saem as estatísticas no Supabase
+PROMPT_DATASET_KEYS = ['ibama_infracao:records', 'ibama_infracao:chatbot']
+
 class LLMIntegration:
     def __init__(self, database=None):
         """
@@ -56,22 +65,121 @@ class LLMIntegration:
         if not self.groq_client and not self.gemini_model:
             print("⚠️ Nenhuma API de LLM configurada. Funcionalidades de IA serão limitadas.")
 
+        # Cache em disco das respostas (perguntas repetidas não chamam a API)
+        self.llm_cache = None
+        if config.LLM_CACHE_MAX_MB > 0:
+            try:
+                self.llm_cache = LLMCache(
+                    config.LLM_CACHE_DIR,
+                    max_size_mb=config.LLM_CACHE_MAX_MB,
+                    max_age_hours=config.LLM_CACHE_MAX_AGE_HOURS,
+                    cache_nonzero_temperature=config.LLM_CACHE_NONZERO_TEMPERATURE,
+                )
+            except OSError as e:
+                print(f"⚠️ Cache de respostas dos LLMs indisponível: {e}")
+
     def _get_system_prompt(self) -> str:
         """
-        Gera o prompt do sistema para geração de SQL baseado no esquema do banco.
+        Prompt do sistema para geração de SQL, com o esquema do banco e
+        estatísticas das colunas. Montado uma vez por versão dos dados e
+        compartilhado pelas sessões (o esquema não é relido a cada pergunta).
         
         Returns:
             str: Prompt formatado para o LLM
         """
+        if self.database is None:
+            return self._build_system_prompt(None)['prompt']
+        
+        try:
+            version = self._schema_version()
+            # Sem estatísticas (base ainda não carregada): refaz quando a base estiver disponível.
+            # A consulta ao store fica fora de is_valid, que roda com o lock do store
+            dataset_loaded = self.database.is_cloud and self._loaded_dataset(version) is not None
+            return get_dataset_store().get_or_load(
+                'ibama_infracao:llm_prompt', version, lambda: self._build_system_prompt(version),
+                is_valid=lambda entry: entry['has_stats'] or not dataset_loaded
+            )['prompt']
+        except Exception as e:
+            print(f"⚠️ Prompt de sistema sem cache: {e}")
+            return self._build_system_prompt(None)['prompt']
+
+    def _schema_version(self) -> str:
+        """Versão dos dados: a do Supabase (verificada no máximo uma vez por intervalo) ou a do arquivo DuckDB."""
+        if self.database.is_cloud and self.database.supabase:
+            from src.utils.supabase_utils import SupabasePaginator
+            return SupabasePaginator(self.database.supabase).get_data_version('ibama_infracao')
+        try:
+            return f"duckdb-{os.path.getmtime(config.DB_PATH)}"
+        except OSError:
+            return "duckdb"
+
+    def _loaded_dataset(self, version: str) -> Optional[pd.DataFrame]:
+        """Dataset compartilhado já carregado nesta versão (dashboard ou chatbot), ou None."""
+        store = get_dataset_store()
+        for key in PROMPT_DATASET_KEYS:
+            df = store.peek(key, version)
+            if df is not None and all(col in df.columns for col in PROMPT_VALUE_COLUMNS):
+                return df
+        return None
+
+    def _column_statistics(self, version: Optional[str]) -> Dict[str, Any]:
+        """
+        Valores distintos de PROMPT_VALUE_COLUMNS e período de PROMPT_DATE_COLUMN.
+        No Supabase vêm do dataset compartilhado (sem nova consulta), no DuckDB
+        de consultas agregadas; {} quando não há de onde tirá-los.
+        """
+        stats = {}
+        if self.database.is_cloud:
+            df = self._loaded_dataset(version) if version else None
+            if df is None:
+                return stats
+            for column in PROMPT_VALUE_COLUMNS:
+                stats[column] = sorted(str(value) for value in df[column].dropna().unique())
+            if PROMPT_DATE_COLUMN in df.columns:
+                dates = pd.to_datetime(df[PROMPT_DATE_COLUMN], errors='coerce')
+                stats['date_range'] = (dates.min(), dates.max())
+        else:
+            for column in PROMPT_VALUE_COLUMNS:
+                stats[column] = [str(value) for value in self.database.get_unique_values(column)]
+            dates = self.database.execute_query(
+                f'SELECT MIN(TRY_CAST("{PROMPT_DATE_COLUMN}" AS TIMESTAMP)) AS min_date, '
+                f'MAX(TRY_CAST("{PROMPT_DATE_COLUMN}" AS TIMESTAMP)) AS max_date FROM ibama_infracao'
+            )
+            if not dates.empty:
+                stats['date_range'] = (dates['min_date'].iloc[0], dates['max_date'].iloc[0])
+        return stats
+
+    def _build_system_prompt(self, version: Optional[str]) -> Dict[str, Any]:
+        """Monta o prompt (esquema + estatísticas); `has_stats` indica se as estatísticas entraram."""
         try:
             schema_df = self.database.get_table_info()
-            schema_str = "\n".join([
-                f'- "{row["name"]}" ({row["type"]})' 
-                for _, row in schema_df.iterrows()
-            ])
+            # Supabase: name/type; DuckDB (DESCRIBE): column_name/column_type
+            name_col = 'name' if 'name' in schema_df.columns else 'column_name'
+            type_col = 'type' if 'type' in schema_df.columns else 'column_type'
+            schema_str = "\n".join(
+                f'- "{name}" ({col_type})' for name, col_type in zip(schema_df[name_col], schema_df[type_col])
+            )
         except Exception:
             schema_str = "Não foi possível carregar o esquema da tabela."
         
+        try:
+            stats = self._column_statistics(version) if self.database is not None else {}
+        except Exception as e:
+            print(f"⚠️ Estatísticas das colunas indisponíveis: {e}")
+            stats = {}
+        
+        stats_lines = []
+        for column in PROMPT_VALUE_COLUMNS:
+            values = stats.get(column)
+            if values:
+                shown = ", ".join(values[:PROMPT_MAX_VALUES]) + (", ..." if len(values) > PROMPT_MAX_VALUES else "")
+                stats_lines.append(f'- "{column}": {shown}')
+        date_range = stats.get('date_range')
+        if date_range and not pd.isna(date_range[0]) and not pd.isna(date_range[1]):
+            stats_lines.append(f'- "{PROMPT_DATE_COLUMN}": de {pd.Timestamp(date_range[0]):%Y-%m-%d} '
+                               f'a {pd.Timestamp(date_range[1]):%Y-%m-%d}')
+        stats_str = "\n        ".join(stats_lines) if stats_lines else "Não disponíveis."
+        
         # Instruções específicas por tipo de banco
         if self.database and self.database.is_cloud:
             sql_dialect_instructions = """
@@ -92,7 +200,7 @@ class LLMIntegration:
             3.  Use LIMIT para restringir resultados.
             """
 
-        return f"""
+        prompt = f"""
         Você é um assistente especialista em dados do IBAMA. Sua função é gerar uma única consulta SQL para responder à pergunta.
         Retorne APENAS o código SQL, nada mais.
 
@@ -101,12 +209,16 @@ class LLMIntegration:
         Esquema da tabela `ibama_infracao`:
         {schema_str}
 
+        Valores existentes nas colunas (use exatamente estes textos nos filtros):
+        {stats_str}
+
         IMPORTANTE: 
         - Sempre use LIMIT para evitar consultas muito grandes
         - Para análises TOP/ranking, use ORDER BY com LIMIT
         - Para buscas de texto, seja flexível com LIKE ou ILIKE
         - Sempre valide que as colunas existem no esquema
         """
+        return {"prompt": prompt, "has_stats": bool(stats_lines)}
 
     def _extract_sql_from_response(self, response_text: str) -> Optional[str]:
         """
@@ -293,40 +405,11 @@ class LLMIntegration:
         system_prompt = self._get_system_prompt()
         user_prompt = f"Pergunta: {question}"
         
-        if provider == 'gemini' and self.gemini_model:
-            try:
-                # Configuração de geração para Gemini
-                generation_config = {
-                    "temperature": temperature,
-                    "max_output_tokens": min(max_tokens, 2048)  # Limite do Gemini
-                }
-                
-                response = self.gemini_model.generate_content(
-                    f"{system_prompt}\n\n{user_prompt}", 
-                    generation_config=generation_config
-                )
-                return response.text
-            except Exception as e:
-                print(f"Erro no Gemini: {e}")
-                return ""
-                
-        elif provider == 'groq' and self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    model=self.groq_model_name,
-                    messages=[
-                        {"role": "system", "content": system_prompt}, 
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=temperature, 
-                    max_tokens=min(max_tokens, 1024)  # Limite do Groq
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                print(f"Erro no Groq: {e}")
-                return ""
-        
-        return ""
+        try:
+            return self._complete(provider, user_prompt, system_prompt, temperature, max_tokens) or ""
+        except Exception as e:
+            print(f"Erro no {'Gemini' if provider == 'gemini' else 'Groq'}: {e}")
+            return ""
 
     def generate_analysis(self, prompt: str, provider: str, temperature: float = 0.3, max_tokens: int = 1000) -> str:
         """
@@ -349,37 +432,73 @@ class LLMIntegration:
         {prompt}
         """
         
-        if provider == 'gemini' and self.gemini_model:
-            try:
-                generation_config = {
-                    "temperature": temperature,
-                    "max_output_tokens": min(max_tokens, 2048)
-                }
-                response = self.gemini_model.generate_content(
-                    analysis_prompt, 
-                    generation_config=generation_config
-                )
-                analysis_result = response.text
-                analysis_result += "\n\n⚠️ **Aviso Importante:** Todas as respostas precisam ser checadas. Os modelos de IA podem ter erros de alucinação, baixa qualidade em certos pontos, vieses ou problemas éticos."
-                return analysis_result
-            except Exception as e:
-                return f"Erro na análise com Gemini: {str(e)}"
-                
-        elif provider == 'groq' and self.groq_client:
-            try:
-                response = self.groq_client.chat.completions.create(
-                    model=self.groq_model_name,
-                    messages=[{"role": "user", "content": analysis_prompt}],
-                    temperature=temperature, 
-                    max_tokens=min(max_tokens, 1024)
-                )
-                analysis_result = response.choices[0].message.content
-                analysis_result += "\n\n⚠️ **Aviso Importante:** Todas as respostas precisam ser checadas. Os modelos de IA podem ter erros de alucinação, baixa qualidade em certos pontos, vieses ou problemas éticos."
-                return analysis_result
-            except Exception as e:
-                return f"Erro na análise com Groq: {str(e)}"
+        try:
+            analysis_result = self._complete(provider, analysis_prompt, None, temperature, max_tokens)
+        except Exception as e:
+            return f"Erro na análise com {'Gemini' if provider == 'gemini' else 'Groq'}: {str(e)}"
+        
+        if analysis_result is None:
+            return "Análise não disponível (nenhum modelo configurado)"
+        
+        analysis_result += "\n\n⚠️ **Aviso Importante:** Todas as respostas precisam ser checadas. Os modelos de IA podem ter erros de alucinação, baixa qualidade em certos pontos, vieses ou problemas éticos."
+        return analysis_result
+
+    def _complete(self, provider: str, prompt: str, system_prompt: Optional[str],
+                  temperature: float, max_tokens: int) -> Optional[str]:
+        """
+        Resposta do LLM para `prompt`, consultando antes o cache de respostas
+        (src/utils/llm_cache.py). None se o provedor não estiver configurado.
+        """
+        if not self.get_available_providers().get(provider):
+            return None
+        
+        model = self.gemini_model_name if provider == 'gemini' else self.groq_model_name
+        use_cache = self.llm_cache is not None and self.llm_cache.accepts(temperature)
+        if use_cache:
+            key = LLMCache.make_key(provider, model, prompt, temperature, max_tokens, system_prompt)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        response = self._call_provider(provider, prompt, system_prompt, temperature, max_tokens)
+        if use_cache:
+            self.llm_cache.put(key, response)
+        return response
+
+    def _call_provider(self, provider: str, prompt: str, system_prompt: Optional[str],
+                       temperature: float, max_tokens: int) -> str:
+        """
+        Chamada à API do provedor (erros são propagados).
+        
+        Args:
+            provider: 'groq' ou 'gemini' (já configurado)
+            prompt: Mensagem do usuário
+            system_prompt: Instruções de sistema (no Gemini, vão antes do prompt)
+            temperature: Criatividade do modelo
+            max_tokens: Máximo de tokens (limitado ao teto de cada provedor)
+            
+        Returns:
+            str: Texto da resposta
+        """
+        if provider == 'gemini':
+            generation_config = {
+                "temperature": temperature,
+                "max_output_tokens": min(max_tokens, 2048)  # Limite do Gemini
+            }
+            content = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+            response = self.gemini_model.generate_content(content, generation_config=generation_config)
+            return response.text
         
-        return "Análise não disponível (nenhum modelo configurado)"
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        response = self.groq_client.chat.completions.create(
+            model=self.groq_model_name,
+            messages=messages,
+            temperature=temperature, 
+            max_tokens=min(max_tokens, 1024)  # Limite do Groq
+        )
+        return response.choices[0].message.content
 
     def _format_results(self, question: str, results: pd.DataFrame) -> str:
         """
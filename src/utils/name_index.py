@@ -0,0 +1,189 @@
+"""
+Índice de nomes para as perguntas sobre um infrator específico.
+
+Sem índice, cada pergunta compara o nome buscado com todos os NOME_INFRATOR
+distintos (fuzzywuzzy) e depois percorre a base para achar as linhas. O
+índice, montado uma vez por versão dos dados, guarda:
+
+- os nomes distintos normalizados (sem acentos, em maiúsculas, pontuação
+  trocada por espaço);
+- um índice invertido de trigramas por palavra: para cada trigrama, os nomes
+  que o contêm;
+- as posições das linhas de cada nome e de cada documento (só os dígitos do
+  CPF/CNPJ, como DOC_KEY em src/utils/documents.py).
+
+Uma busca pega os nomes que mais compartilham trigramas com o nome pedido
+(MAX_CANDIDATES, mais todos os empatados com o último, para um empate não ser
+decidido pelo tamanho do nome) e só nesses aplica o mesmo escore do
+fuzzywuzzy usado antes; a busca por documento é uma consulta exata. Nomes com
+menos de MIN_SHARED_FRACTION dos trigramas do menor dos dois em comum ficam
+de fora: o WRatio só chega a 90 com nomes quase iguais, com um contido no
+outro ou com as palavras de um contidas no outro, casos que ficam bem acima do
+corte. Sem ele, uma busca sem resposta empataria todos os nomes em um ou
+dois trigramas comuns e viraria uma varredura completa.
+
+Troca de precisão por tempo: um nome fora desse grupo não é avaliado, mesmo
+que o fuzzywuzzy lhe desse escore suficiente - por exemplo, um nome com erro
+de digitação (menos trigramas em comum) quando mais de MAX_CANDIDATES nomes
+contêm todas as palavras pedidas. Com empates, o grupo pode crescer até todos os
+nomes, o mesmo custo da varredura completa de antes. Os trigramas são
+calculados em lote com numpy sobre os bytes dos nomes (ASCII depois da
+normalização), sem laço Python por nome.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.utils.documents import describe_documents
+
+# Nomes comparados pelo fuzzywuzzy em cada busca (os de mais trigramas em comum,
+# mais os empatados com o último)
+MAX_CANDIDATES = 500
+# Fração mínima dos trigramas do menor dos dois nomes (o pedido ou o indexado)
+# que um candidato precisa ter em comum
+MIN_SHARED_FRACTION = 0.5
+# Caracteres considerados de cada nome (nomes maiores são truncados nos trigramas)
+MAX_NAME_CHARS = 96
+# Nomes processados por lote ao montar os trigramas (limita a memória temporária)
+CHUNK_SIZE = 50000
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Sem acentos, em maiúsculas, com pontuação e espaços repetidos trocados por um espaço."""
+    text = names.astype(object).where(names.notna(), '').astype(str)
+    return (text.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+            .str.upper().str.replace(r'[^A-Z0-9]+', ' ', regex=True).str.strip())
+
+
+def _trigrams(names: np.ndarray) -> tuple:
+    """
+    Pares (nome, trigrama) sem repetição para os nomes normalizados em `names`.
+    Cada trigrama vira um inteiro de 24 bits (três bytes ASCII). Os espaços
+    são duplicados e cada nome ganha dois espaços em cada ponta: assim cada
+    palavra rende os mesmos trigramas em qualquer posição (nenhum trigrama
+    junta duas palavras), e palavras a mais ou fora de ordem não tiram
+    trigramas do nome - como nas comparações por tokens do WRatio.
+    """
+    name_ids, grams = [], []
+    for start in range(0, len(names), CHUNK_SIZE):
+        chunk = [f"  {name[:MAX_NAME_CHARS].replace(' ', '  ')}  " for name in names[start:start + CHUNK_SIZE]]
+        if not chunk:
+            continue
+        lengths = np.fromiter((len(name) for name in chunk), dtype=np.int32, count=len(chunk))
+        width = int(lengths.max())
+        if width < 3:
+            continue
+        data = np.array(chunk, dtype=f'S{width}').view(np.uint8).reshape(len(chunk), width).astype(np.int32)
+        codes = (data[:, :-2] << 16) | (data[:, 1:-1] << 8) | data[:, 2:]
+        valid = np.arange(width - 2) < (lengths - 2)[:, None]
+        rows = np.broadcast_to(np.arange(start, start + len(chunk), dtype=np.int64)[:, None], codes.shape)
+        pairs = np.unique(rows[valid] << 24 | codes[valid])
+        name_ids.append((pairs >> 24).astype(np.int32))
+        grams.append((pairs & 0xFFFFFF).astype(np.int32))
+    if not name_ids:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    return np.concatenate(name_ids), np.concatenate(grams)
+
+
+def _group_positions(values: pd.Series) -> tuple:
+    """(valores distintos, posições das linhas ordenadas por valor, início de cada valor)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    offsets = int((codes < 0).sum()) + np.concatenate([[0], np.cumsum(counts)])
+    return np.asarray(uniques, dtype=object), order, offsets
+
+
+class NameIndex:
+    """Busca de infratores por nome aproximado ou documento - ver docstring do módulo."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Args:
+            df: Dataset do chatbot no esquema canônico (NOME_INFRATOR e
+                CPF_CNPJ_INFRATOR). O índice vale só para este DataFrame, ver `matches`.
+        """
+        self.rows = len(df)
+        self._frame_index = df.index
+
+        self.names, self._name_order, self._name_offsets = _group_positions(df['NOME_INFRATOR'])
+        self._name_lookup = pd.Index(self.names)
+        normalized = normalize_names(pd.Series(self.names, dtype=object)).to_numpy()
+        self._lengths = np.fromiter((len(name) for name in normalized), dtype=np.int32, count=len(normalized))
+
+        # Índice invertido: pares ordenados por trigrama, com o início de cada trigrama
+        name_ids, grams = _trigrams(normalized)
+        order = np.argsort(grams, kind='stable')
+        self._posting_names = name_ids[order]
+        self._grams, starts = np.unique(grams[order], return_index=True)
+        self._posting_offsets = np.append(starts, len(order))
+        self._gram_counts = np.bincount(name_ids, minlength=len(self.names)).astype(np.int32)
+
+        documents = describe_documents(df['CPF_CNPJ_INFRATOR'])['DOC_KEY']
+        documents, self._document_order, self._document_offsets = _group_positions(documents)
+        self._document_ids: Dict[str, int] = {document: position for position, document in enumerate(documents)}
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """Se o índice foi montado a partir de `df` (o mesmo objeto de linhas)."""
+        return df.index is self._frame_index and len(df) == self.rows
+
+    def memory_usage(self, deep: bool = True) -> pd.Series:
+        """Memória dos arrays do índice (para o diagnóstico do DatasetStore)."""
+        return pd.Series({
+            'names': pd.Series(self.names).memory_usage(deep=deep) + self._lengths.nbytes,
+            'trigrams': (self._posting_names.nbytes + self._grams.nbytes + self._posting_offsets.nbytes
+                         + self._gram_counts.nbytes),
+            'rows': sum(array.nbytes for array in (self._name_order, self._name_offsets,
+                                                   self._document_order, self._document_offsets)),
+        })
+
+    def candidates(self, search_name: str, limit: int = MAX_CANDIDATES) -> np.ndarray:
+        """
+        Ids dos `limit` nomes com mais trigramas em comum com `search_name` e
+        de todos os empatados com o último, do maior ao menor número de
+        trigramas em comum (empates: nomes mais curtos primeiro).
+        """
+        normalized = normalize_names(pd.Series([search_name])).to_numpy()
+        _, grams = _trigrams(normalized)
+        slots = np.searchsorted(self._grams, grams)
+        slots = slots[(slots < len(self._grams)) & (self._grams[np.minimum(slots, len(self._grams) - 1)] == grams)]
+        if len(slots) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        postings = np.concatenate([self._posting_names[self._posting_offsets[slot]:self._posting_offsets[slot + 1]]
+                                   for slot in slots])
+        shared = np.bincount(postings, minlength=len(self.names))
+        needed = np.maximum(1, MIN_SHARED_FRACTION * np.minimum(len(grams), self._gram_counts))
+        found = np.flatnonzero(shared >= needed)
+        if len(found) > limit:
+            # Corta abaixo do `limit`-ésimo colocado, mas nunca no meio de um empate
+            kth = np.partition(shared[found], len(found) - limit)[len(found) - limit]
+            found = found[shared[found] >= kth]
+        return found[np.lexsort((self._lengths[found], -shared[found]))]
+
+    def search(self, search_name: str, min_score: int = 90, limit: int = 5) -> List[str]:
+        """Nomes originais parecidos com `search_name`, pelo escore padrão do fuzzywuzzy (WRatio)."""
+        from fuzzywuzzy import process
+
+        candidates = self.candidates(search_name)
+        if len(candidates) == 0:
+            return []
+        choices = dict(enumerate(self.names[candidates]))
+        matches = process.extractBests(search_name, choices, score_cutoff=min_score, limit=limit)
+        return [name for name, _, _ in matches]
+
+    def rows_for_names(self, names: List[str]) -> np.ndarray:
+        """Posições (crescentes) das linhas com algum dos `names` (exatos)."""
+        ids = self._name_lookup.get_indexer(list(names))
+        return self._positions([int(i) for i in ids if i >= 0], self._name_order, self._name_offsets)
+
+    def rows_for_document(self, digits: str) -> np.ndarray:
+        """Posições (crescentes) das linhas do CPF/CNPJ `digits` (só os dígitos)."""
+        document = self._document_ids.get(digits)
+        return self._positions([] if document is None else [document], self._document_order, self._document_offsets)
+
+    @staticmethod
+    def _positions(ids: List[int], order: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        parts = [order[offsets[i]:offsets[i + 1]] for i in ids]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
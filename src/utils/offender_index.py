@@ -0,0 +1,241 @@
+"""
+Índice de infratores para os rankings do chatbot ("maiores infratores").
+
+Em vez de agrupar os registros por (NOME_INFRATOR, CPF_CNPJ_INFRATOR) a cada
+pergunta, o índice guarda, uma vez por versão dos dados, o valor e o número de
+autos de cada infrator em cada partição (UF, ano, tipo de infração, gravidade,
+tipo de documento). Uma pergunta escolhe as partições dos seus filtros e:
+
+- com uma única partição, lê o início da lista já ordenada por valor;
+- com várias, soma os pares (partição, infrator) selecionados por id inteiro
+  (np.bincount) e separa só os `limit` maiores (np.partition), sem ordenar
+  todos os infratores.
+
+Novos registros entram com `with_rows`, que soma apenas as linhas novas aos
+pares existentes (sem reler a base) e devolve um novo índice: o índice em uso
+por outras sessões nunca é alterado no lugar.
+
+Espera o dataset no esquema canônico (src/utils/schema.py): YEAR, DOC_TYPE e
+VAL_AUTO_INFRACAO numérico, textos aparados com vazio como nulo.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Dimensões das partições, na ordem da chave
+PARTITION_COLUMNS = ['UF', 'YEAR', 'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'DOC_TYPE']
+IDENTITY_COLUMNS = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']
+
+
+def _keys(series: pd.Series) -> np.ndarray:
+    """Valores de uma dimensão como object, com nulo padronizado em None (hashable e comparável)."""
+    values = series.astype(object)
+    return values.where(values.notna(), None).to_numpy()
+
+
+class OffenderIndex:
+    """Valor e número de autos por infrator e partição - ver docstring do módulo."""
+
+    def __init__(self, df: pd.DataFrame = None):
+        """
+        Args:
+            df: Dataset deduplicado no esquema canônico (pode ter a coluna id,
+                usada por `with_rows` para saber quais linhas são novas)
+        """
+        self.rows = 0
+        self.max_id = None
+        self.partitions = pd.DataFrame(columns=PARTITION_COLUMNS)
+        self.offenders = pd.DataFrame(columns=IDENTITY_COLUMNS)
+        self._partition_ids: Dict[tuple, int] = {}
+        self._offender_ids: Dict[tuple, int] = {}
+        self._set_pairs(np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0), np.empty(0, np.int64))
+
+        if df is not None and not df.empty:
+            self._add(df)
+
+    # --- construção ---
+
+    def _set_pairs(self, partition: np.ndarray, offender: np.ndarray, value: np.ndarray, count: np.ndarray):
+        """
+        Guarda os pares ordenados por partição e, dentro dela, por valor
+        decrescente (empates pela ordem alfabética dos infratores).
+        """
+        names = self.offenders.sort_values(IDENTITY_COLUMNS).index.to_numpy(dtype=np.int64)
+        self.offender_rank = np.empty(len(names), dtype=np.int64)
+        self.offender_rank[names] = np.arange(len(names))
+        order = np.lexsort((self.offender_rank[offender], -value, partition))
+        self.pair_partition = partition[order]
+        self.pair_offender = offender[order]
+        self.pair_value = value[order]
+        self.pair_count = count[order]
+        # Início de cada partição em pair_*: a partição p ocupa offsets[p]:offsets[p + 1]
+        self.offsets = np.searchsorted(self.pair_partition, np.arange(len(self.partitions) + 1))
+
+    @staticmethod
+    def _assign_ids(keys: pd.DataFrame, known: Dict[tuple, int]) -> tuple:
+        """Ids das chaves (uma por linha de `keys`), criando ids novos para as que não estão em `known`."""
+        # Códigos locais na ordem de primeira aparição, a mesma de drop_duplicates
+        local = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+        new_rows = []
+        ids = np.empty(local.max() + 1, dtype=np.int32)
+        for position, key in enumerate(keys.drop_duplicates().itertuples(index=False, name=None)):
+            key_id = known.get(key)
+            if key_id is None:
+                key_id = known[key] = len(known)
+                new_rows.append(key)
+            ids[position] = key_id
+        return ids[local], new_rows
+
+    def _add(self, df: pd.DataFrame):
+        """Soma as linhas de `df` aos pares do índice (altera este objeto)."""
+        self.rows += len(df)
+        if 'id' in df.columns and df['id'].notna().any():
+            new_max = int(pd.to_numeric(df['id'], errors='coerce').max())
+            self.max_id = new_max if self.max_id is None else max(self.max_id, new_max)
+
+        if not all(col in df.columns for col in IDENTITY_COLUMNS + ['VAL_AUTO_INFRACAO']):
+            return
+        valid = (df['NOME_INFRATOR'].notna() & df['CPF_CNPJ_INFRATOR'].notna()).to_numpy()
+        df = df[valid]
+        if df.empty:
+            return
+
+        partition_keys = pd.DataFrame({
+            col: _keys(df[col]) if col in df.columns else np.full(len(df), None, dtype=object)
+            for col in PARTITION_COLUMNS
+        })
+        partition, new_partitions = self._assign_ids(partition_keys, self._partition_ids)
+        offender, new_offenders = self._assign_ids(
+            pd.DataFrame({col: _keys(df[col]) for col in IDENTITY_COLUMNS}), self._offender_ids
+        )
+        if new_partitions:
+            self.partitions = pd.concat(
+                [self.partitions, pd.DataFrame(new_partitions, columns=PARTITION_COLUMNS)], ignore_index=True
+            )
+        if new_offenders:
+            self.offenders = pd.concat(
+                [self.offenders, pd.DataFrame(new_offenders, columns=IDENTITY_COLUMNS)], ignore_index=True
+            )
+
+        # Só multas positivas entram no valor; todos os autos entram na contagem
+        values = df['VAL_AUTO_INFRACAO'].to_numpy(dtype=float)
+        pairs = pd.DataFrame({
+            'partition': np.concatenate([self.pair_partition, partition]),
+            'offender': np.concatenate([self.pair_offender, offender]),
+            'value': np.concatenate([self.pair_value, np.where(values > 0, values, 0.0)]),
+            'count': np.concatenate([self.pair_count, np.ones(len(df), dtype=np.int64)]),
+        }).groupby(['partition', 'offender'], sort=False).sum().reset_index()
+
+        self._set_pairs(pairs['partition'].to_numpy(np.int32), pairs['offender'].to_numpy(np.int32),
+                        pairs['value'].to_numpy(float), pairs['count'].to_numpy(np.int64))
+
+    def with_rows(self, df: pd.DataFrame) -> 'OffenderIndex':
+        """Novo índice com as linhas de `df` somadas às deste (este não muda)."""
+        index = OffenderIndex()
+        index.rows = self.rows
+        index.max_id = self.max_id
+        index.partitions = self.partitions
+        index.offenders = self.offenders
+        index._partition_ids = dict(self._partition_ids)
+        index._offender_ids = dict(self._offender_ids)
+        index.pair_partition, index.pair_offender = self.pair_partition, self.pair_offender
+        index.pair_value, index.pair_count, index.offsets = self.pair_value, self.pair_count, self.offsets
+        index.offender_rank = self.offender_rank
+        if not df.empty:
+            index._add(df)
+        return index
+
+    def updated_from(self, df: pd.DataFrame) -> Optional['OffenderIndex']:
+        """
+        Índice para a nova versão `df` do dataset somando só as linhas com id
+        maior que `max_id`. Retorna None se a atualização incremental não vale
+        (sem id, ou linhas removidas/alteradas): aí o índice deve ser refeito.
+        """
+        if self.max_id is None or 'id' not in df.columns:
+            return None
+        new_rows = df[pd.to_numeric(df['id'], errors='coerce') > self.max_id]
+        if self.rows + len(new_rows) != len(df):
+            return None
+        return self.with_rows(new_rows)
+
+    # --- consultas ---
+
+    @property
+    def empty(self) -> bool:
+        return len(self.pair_partition) == 0
+
+    def memory_usage(self, deep: bool = True) -> pd.Series:
+        """Memória das tabelas do índice (para o diagnóstico do DatasetStore)."""
+        arrays = {
+            'pairs': sum(array.nbytes for array in (self.pair_partition, self.pair_offender, self.pair_value,
+                                                    self.pair_count, self.offsets, self.offender_rank)),
+            'partitions': self.partitions.memory_usage(deep=deep).sum(),
+            'offenders': self.offenders.memory_usage(deep=deep).sum(),
+        }
+        return pd.Series(arrays)
+
+    def select_partitions(self, years: Iterable[int] = None, ufs: Iterable[str] = None,
+                          tipos: Iterable[str] = None, gravidades: Iterable[str] = None,
+                          doc_type: str = None, **_) -> np.ndarray:
+        """
+        Partições dos filtros no formato do chatbot (listas vazias ou None não
+        filtram; tipos comparados sem diferenciar maiúsculas).
+        """
+        partitions = self.partitions
+        mask = np.ones(len(partitions), dtype=bool)
+        if years:
+            mask &= partitions['YEAR'].isin([int(year) for year in years]).to_numpy()
+        if ufs:
+            mask &= partitions['UF'].isin(list(ufs)).to_numpy()
+        if tipos:
+            tipos_lower = [tipo.lower() for tipo in tipos]
+            mask &= partitions['TIPO_INFRACAO'].astype(str).str.lower().isin(tipos_lower).to_numpy()
+        if gravidades:
+            mask &= partitions['GRAVIDADE_INFRACAO'].isin(list(gravidades)).to_numpy()
+        if doc_type:
+            mask &= (partitions['DOC_TYPE'] == doc_type).to_numpy()
+        return np.flatnonzero(mask)
+
+    def top(self, by: str = 'value', limit: int = 10, **filters: Any) -> pd.DataFrame:
+        """
+        Maiores infratores por `by` ('value' = soma das multas, 'count' =
+        número de autos) nas partições dos filtros (ver `select_partitions`).
+        Retorna NOME_INFRATOR, CPF_CNPJ_INFRATOR, value e count, em ordem decrescente.
+        """
+        columns = IDENTITY_COLUMNS + ['value', 'count']
+        partitions = self.select_partitions(**filters)
+        if len(partitions) == 0 or self.empty:
+            return pd.DataFrame(columns=columns)
+
+        if len(partitions) == 1 and by == 'value':
+            # Partição única: os pares já estão em ordem decrescente de valor
+            start, end = self.offsets[partitions[0]], self.offsets[partitions[0] + 1]
+            offender = self.pair_offender[start:end][:limit]
+            value = self.pair_value[start:end][:limit]
+            count = self.pair_count[start:end][:limit]
+        else:
+            selected = np.isin(self.pair_partition, partitions)
+            offender_ids = self.pair_offender[selected]
+            size = len(self.offenders)
+            totals = {
+                'value': np.bincount(offender_ids, weights=self.pair_value[selected], minlength=size),
+                'count': np.bincount(offender_ids, weights=self.pair_count[selected], minlength=size),
+            }
+            ranking = totals[by]
+            candidates = np.flatnonzero(ranking > 0)
+            if len(candidates) > limit:
+                # Valor do `limit`-ésimo colocado; os empatados com ele ficam para o desempate
+                kth = np.partition(ranking[candidates], len(candidates) - limit)[len(candidates) - limit]
+                candidates = candidates[ranking[candidates] >= kth]
+            offender = candidates[np.lexsort((self.offender_rank[candidates], -ranking[candidates]))][:limit]
+            value, count = totals['value'][offender], totals['count'][offender].astype(np.int64)
+
+        keep = (value if by == 'value' else count) > 0
+        names = self.offenders.iloc[offender[keep]]
+        return pd.DataFrame({
+            'NOME_INFRATOR': names['NOME_INFRATOR'].to_numpy(),
+            'CPF_CNPJ_INFRATOR': names['CPF_CNPJ_INFRATOR'].to_numpy(),
+            'value': value[keep],
+            'count': count[keep],
+        }, columns=columns)
@@ -0,0 +1,113 @@
+"""
+Carga do dataset em segundo plano, iniciada quando a sessão abre.
+
+Sem ela, o download da base só começa quando o primeiro gráfico pede os
+dados, e o primeiro visitante depois de um deploy espera a carga inteira
+antes de ver qualquer coisa. `DatasetPrefetch.start` roda a carga em uma
+thread de fundo enquanto a barra lateral é desenhada; os gráficos que
+pedirem os mesmos dados esperam por ela no DatasetStore (carga única), e a
+página mostra o progresso (`status`) em vez de um spinner parado.
+
+Há uma única tarefa por processo: sessões que abrem durante a carga
+reutilizam a que está em andamento. Depois de terminada, a próxima sessão
+inicia outra, que só baixa algo se a versão dos dados tiver mudado.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.instrumentation import get_perf_recorder
+
+
+class DatasetPrefetch:
+    """Tarefa de carga em segundo plano, com progresso em registros baixados."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+        self._future: Optional[Future] = None
+        self.rows = 0
+        self.total: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self, task: Callable[[], Any]) -> Future:
+        """Inicia `task` em segundo plano, ou retorna a carga que já está em andamento."""
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return self._future
+            self.rows, self.total = 0, None
+            self.started_at, self.finished_at = time.time(), None
+            self._future = self._executor.submit(self._run, task)
+            return self._future
+
+    def _run(self, task: Callable[[], Any]) -> Any:
+        try:
+            with get_perf_recorder().measure('prefetch:ibama_infracao', 'prefetch'):
+                return task()
+        except Exception as e:
+            print(f"⚠️ Erro na carga em segundo plano: {e}")
+            raise
+        finally:
+            self.finished_at = time.time()
+
+    def report(self, rows: int, total: Optional[int] = None):
+        """
+        Soma `rows` registros baixados (callback do paginador). Um `total`
+        indica o início de uma nova varredura e zera a contagem.
+        """
+        with self._lock:
+            if total is not None:
+                self.rows, self.total = 0, total
+            self.rows += rows
+
+    @property
+    def running(self) -> bool:
+        future = self._future
+        return future is not None and not future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a carga até `timeout` segundos; True se ela terminou (com ou sem erro)."""
+        future = self._future
+        if future is None:
+            return True
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return False
+        except Exception:
+            pass  # O erro já foi registrado; os gráficos tentam a própria carga
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Estado ('idle', 'running', 'done' ou 'error'), registros baixados, total esperado e segundos."""
+        future = self._future
+        if future is None:
+            state = 'idle'
+        elif not future.done():
+            state = 'running'
+        else:
+            state = 'error' if future.exception() is not None else 'done'
+
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                'state': state,
+                'rows': self.rows,
+                'total': self.total,
+                'seconds': end - self.started_at if self.started_at else 0.0,
+            }
+
+
+_prefetch: Optional[DatasetPrefetch] = None
+_prefetch_lock = threading.Lock()
+
+
+def get_prefetch() -> DatasetPrefetch:
+    """Retorna a instância única do processo (compartilhada pelas sessões)."""
+    global _prefetch
+    with _prefetch_lock:
+        if _prefetch is None:
+            _prefetch = DatasetPrefetch()
+        return _prefetch
@@ -0,0 +1,135 @@
+"""
+Esquema canônico do dataset do IBAMA.
+
+Os dados chegam como texto (Supabase, CSV) ou parcialmente tipados (snapshot
+Parquet, DuckDB). `normalize_dataset` converte tudo uma única vez, no
+carregamento, para que gráficos e chatbot não precisem reconverter colunas:
+
+- VAL_AUTO_INFRACAO           float64 (aceita vírgula decimal)
+- DAT_HORA_AUTO_INFRACAO      datetime64, com YEAR (int16) e MONTH (int8);
+                              0 indica data ausente ou inválida
+- NUM_LATITUDE/LONGITUDE_AUTO float32
+- UF, MUNICIPIO, TIPO_INFRACAO,
+  GRAVIDADE_INFRACAO,
+  DES_STATUS_FORMULARIO       category (texto aparado, vazio vira nulo)
+- NOME_INFRATOR,
+  CPF_CNPJ_INFRATOR           string[pyarrow] (texto aparado, vazio vira nulo)
+- DOC_TYPE                    category: CPF, CNPJ ou OUTRO (src/utils/documents.py)
+- demais colunas de texto     category se tiverem poucos valores distintos,
+                              senão string[pyarrow]
+
+Strings do PyArrow guardam os textos em um buffer contíguo em vez de um objeto
+Python por célula: a base em memória fica várias vezes menor (ver
+`memory_report` e `benchmark_performance.py --only memory`). Nulos nessas
+colunas são pd.NA, e comparações com nulo dão pd.NA - combine-as com
+`notna()` antes de filtrar.
+
+Textos longos (WIDE_TEXT_COLUMNS) não fazem parte da base: as telas pedem só
+as colunas que usam ao paginador (`get_all_records(columns=...)`), que busca
+as que faltarem quando alguma tela precisar delas.
+
+Colunas categóricas exigem `observed=True` em groupby e descartar contagens
+zero em value_counts.
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.documents import STRING_DTYPE, classify_documents
+
+CATEGORY_COLUMNS = ['UF', 'MUNICIPIO', 'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'DES_STATUS_FORMULARIO']
+TEXT_COLUMNS = ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR']
+COORDINATE_COLUMNS = ['NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO']
+# Textos longos, carregados só quando uma tela os pede explicitamente
+WIDE_TEXT_COLUMNS = ['DES_AUTO_INFRACAO', 'DS_WKT', 'DES_LOCAL_INFRACAO', 'DS_REFERENCIA_ACAO_FISCALIZATORIA']
+# Demais colunas de texto viram category até esta fração de valores distintos
+CATEGORY_MAX_RATIO = 0.5
+# Colunas calculadas por normalize_dataset: mantenha-as ao selecionar colunas
+# de um DataFrame já normalizado (ele não é normalizado de novo)
+DERIVED_COLUMNS = ['YEAR', 'MONTH', 'DOC_TYPE']
+
+
+def parse_decimal(series: pd.Series) -> pd.Series:
+    """Converte texto com vírgula ou ponto decimal em float64 (inválidos viram NaN)."""
+    if series.dtype.kind in 'iuf':
+        return series.astype('float64')
+    return pd.to_numeric(series.astype(str).str.strip().str.replace(',', '.'), errors='coerce')
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    """Apara os textos e troca vazios por nulo, mantendo os nulos originais."""
+    text = series.astype(object)
+    present = text.notna()
+    text = text.where(~present, text.astype(str).str.strip())
+    return text.replace('', np.nan)
+
+
+def _compact_text(series: pd.Series) -> pd.Series:
+    """
+    Coluna de texto sem tipo definido (object) no menor formato equivalente:
+    category com poucos valores distintos, string[pyarrow] nos demais casos.
+    Colunas com valores que não são texto (números, datas) ficam como estão.
+    """
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return series
+    distinct = series.nunique(dropna=True)
+    if distinct <= max(1, len(series) * CATEGORY_MAX_RATIO):
+        return series.astype('category')
+    return series.astype(STRING_DTYPE)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Memória de cada coluna (column, dtype, mb), da maior para a menor."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'column': usage.index,
+        'dtype': [str(df[col].dtype) for col in usage.index],
+        'mb': usage.to_numpy() / 1024 / 1024,
+    })
+    return report.sort_values('mb', ascending=False).reset_index(drop=True)
+
+
+def normalize_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Retorna o DataFrame no esquema canônico (ver docstring do módulo).
+    Não altera `df`; colunas que já estão no tipo certo não são reprocessadas.
+    """
+    if df.empty or df.attrs.get('normalized'):
+        return df
+
+    columns = {}
+
+    if 'VAL_AUTO_INFRACAO' in df.columns:
+        columns['VAL_AUTO_INFRACAO'] = parse_decimal(df['VAL_AUTO_INFRACAO'])
+
+    if 'DAT_HORA_AUTO_INFRACAO' in df.columns:
+        dates = df['DAT_HORA_AUTO_INFRACAO']
+        if dates.dtype.kind != 'M':
+            dates = pd.to_datetime(dates, errors='coerce')
+        columns['DAT_HORA_AUTO_INFRACAO'] = dates
+        columns['YEAR'] = dates.dt.year.fillna(0).astype('int16')
+        columns['MONTH'] = dates.dt.month.fillna(0).astype('int8')
+
+    for col in COORDINATE_COLUMNS:
+        if col in df.columns and df[col].dtype != 'float32':
+            columns[col] = parse_decimal(df[col]).astype('float32')
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            columns[col] = _clean_text(df[col]).astype('category')
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            columns[col] = _clean_text(df[col]).astype(STRING_DTYPE)
+
+    if 'CPF_CNPJ_INFRATOR' in df.columns:
+        columns['DOC_TYPE'] = classify_documents(columns['CPF_CNPJ_INFRATOR'])
+
+    for col in df.columns:
+        if col not in columns and df[col].dtype == object:
+            compact = _compact_text(df[col])
+            if compact is not df[col]:
+                columns[col] = compact
+
+    normalized = df.assign(**columns)
+    normalized.attrs = {**df.attrs, 'normalized': True}
+    return normalized
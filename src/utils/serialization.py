@@ -0,0 +1,108 @@
+"""
+Serialização vetorizada de DataFrames para o JSON do PostgREST.
+
+Converte colunas inteiras de uma vez, conforme o dtype, em vez de chamar uma
+função Python por célula:
+- NaN/NaT/pd.NA -> None
+- escalares numpy -> int/float/bool nativos
+- datas -> texto 'YYYY-MM-DD HH:MM:SS'
+- textos -> sem espaços nas pontas, vazios viram None
+
+Depende apenas de pandas/numpy para ser usado pelos scripts de upload.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _finalize(values: pd.Series, missing: pd.Series) -> np.ndarray:
+    """Converte para array de objetos com None nas posições ausentes."""
+    result = values.to_numpy(dtype=object, copy=True)
+    result[missing.to_numpy()] = None
+    return result
+
+
+def _clean_text(value: Any, stringify: bool) -> Any:
+    if isinstance(value, str) or stringify:
+        value = str(value).strip()
+        return value if value else None
+    return value
+
+
+def _serialize_text(series: pd.Series, stringify: bool) -> np.ndarray:
+    """
+    Limpa colunas de texto trabalhando só com os valores distintos: a coluna
+    é fatorada (em C) e a limpeza roda uma vez por valor único, não por célula.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    cleaned = np.empty(len(uniques) + 1, dtype=object)
+    cleaned[:-1] = [_clean_text(value, stringify) for value in np.asarray(uniques, dtype=object)]
+    cleaned[-1] = None  # código -1 (ausente) aponta para a última posição
+    return cleaned[codes]
+
+
+def serialize_column(series: pd.Series, numeric: bool = False, stringify: bool = False) -> np.ndarray:
+    """
+    Converte uma coluna em um array de objetos prontos para JSON.
+
+    Args:
+        series: Coluna a converter
+        numeric: Força a conversão numérica (valores inválidos viram None);
+            colunas só com inteiros são enviadas como int
+        stringify: Envia todos os valores não nulos como texto aparado
+    """
+    if numeric:
+        series = pd.to_numeric(series, errors='coerce')
+        non_null = series.dropna()
+        if series.dtype.kind == 'f' and (non_null == np.floor(non_null)).all():
+            series = series.astype('Int64')
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+
+    missing = series.isna()
+    kind = series.dtype.kind
+
+    if kind == 'M':
+        return _finalize(series.dt.strftime(DATETIME_FORMAT), missing)
+
+    if stringify:
+        return _serialize_text(series, stringify=True)
+
+    if kind in 'biuf':
+        # astype(object) em dtypes numpy/nullable devolve int/float/bool nativos
+        return _finalize(series.astype(object), missing)
+
+    return _serialize_text(series, stringify=False)
+
+
+def serialize_dataframe(df: pd.DataFrame, numeric_columns: Optional[Iterable[str]] = None,
+                        stringify: bool = False) -> pd.DataFrame:
+    """
+    Retorna uma cópia de `df` com todas as colunas já convertidas para
+    valores serializáveis (dtype object).
+    """
+    numeric_columns = set(numeric_columns or ())
+    return pd.DataFrame(
+        {col: serialize_column(df[col], numeric=col in numeric_columns, stringify=stringify)
+         for col in df.columns},
+        index=df.index,
+    )
+
+
+def dataframe_to_records(df: pd.DataFrame, numeric_columns: Optional[Iterable[str]] = None,
+                         stringify: bool = False) -> List[Dict[str, Any]]:
+    """
+    Converte o DataFrame em uma lista de dicts prontos para `insert()`.
+
+    Colunas com nome vazio são descartadas.
+    """
+    columns = [col for col in df.columns if isinstance(col, str) and col.strip()]
+    numeric_columns = set(numeric_columns or ())
+    arrays = [serialize_column(df[col], numeric=col in numeric_columns, stringify=stringify)
+              for col in columns]
+    return [dict(zip(columns, row)) for row in zip(*arrays)]
+
@@ -0,0 +1,221 @@
+"""
+Snapshot colunar (Parquet) da tabela ibama_infracao.
+
+O pipeline de atualização grava, depois do upload, um arquivo Parquet com as
+colunas usadas pelo app e um manifesto com a versão dos dados. Os dois são
+enviados ao Supabase Storage. No app, um cold start lê o snapshot local (ou
+baixa os dois arquivos do Storage) quando a versão bate com a do banco, e só
+volta a paginar a tabela pela rede quando o snapshot está desatualizado.
+
+Depende apenas de pandas/pyarrow e do cliente do Supabase, para rodar no
+GitHub Actions sem o Streamlit.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Colunas do snapshot: as do dashboard (visualization.DASHBOARD_COLUMNS), que
+# cobrem também as do chatbot, mais o id usado como cursor da paginação
+SNAPSHOT_COLUMNS = [
+    'id', 'NUM_AUTO_INFRACAO', 'DAT_HORA_AUTO_INFRACAO', 'UF', 'COD_MUNICIPIO', 'MUNICIPIO',
+    'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'DES_STATUS_FORMULARIO', 'VAL_AUTO_INFRACAO',
+    'NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO'
+]
+
+# Colunas de baixa cardinalidade gravadas com dicionário no Parquet
+DICTIONARY_COLUMNS = [
+    'UF', 'MUNICIPIO', 'COD_MUNICIPIO', 'TIPO_INFRACAO',
+    'GRAVIDADE_INFRACAO', 'DES_STATUS_FORMULARIO'
+]
+
+DATE_COLUMNS = ['DAT_HORA_AUTO_INFRACAO']
+DECIMAL_COLUMNS = ['VAL_AUTO_INFRACAO', 'NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO']
+
+DEFAULT_SNAPSHOT_DIR = 'data/snapshots'
+DEFAULT_BUCKET = 'snapshots'
+
+
+def probe_data_version(supabase, table_name: str = 'ibama_infracao') -> str:
+    """
+    Versão dos dados no banco: total de registros + maior id. Muda a cada
+    carga completa ou incremental (linhas alteradas são reinseridas com novo id).
+    """
+    try:
+        result_count = supabase.table(table_name).select('id', count='exact').limit(1).execute()
+        result_max = supabase.table(table_name).select('id').order('id', desc=True).limit(1).execute()
+        max_id = result_max.data[0]['id'] if result_max.data else 0
+        return f"{getattr(result_count, 'count', 0)}-{max_id}"
+    except Exception as e:
+        print(f"⚠️ Não foi possível verificar a versão dos dados: {e}")
+        return "unknown"
+
+
+def _paths(table_name: str, directory: str) -> Dict[str, str]:
+    return {
+        'data': os.path.join(directory, f"{table_name}.parquet"),
+        'manifest': os.path.join(directory, f"{table_name}.manifest.json"),
+    }
+
+
+def prepare_snapshot_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipa as colunas para o Parquet: datas como datetime, valores e coordenadas
+    como float (aceitando vírgula decimal) e ids como inteiros.
+    """
+    columns = {}
+    for col in DATE_COLUMNS:
+        if col in df.columns and df[col].dtype.kind != 'M':
+            columns[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in DECIMAL_COLUMNS:
+        if col in df.columns and df[col].dtype.kind not in 'if':
+            columns[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
+    if 'id' in df.columns:
+        columns['id'] = pd.to_numeric(df['id'], errors='coerce').astype('Int64')
+    return df.assign(**columns) if columns else df
+
+
+def write_snapshot(df: pd.DataFrame, version: str, table_name: str = 'ibama_infracao',
+                   directory: str = DEFAULT_SNAPSHOT_DIR) -> Dict[str, Any]:
+    """
+    Grava o snapshot (Parquet zstd + manifesto) de forma atômica e retorna o manifesto.
+    O manifesto é gravado por último: um snapshot incompleto nunca parece atual.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = _paths(table_name, directory)
+    # Colunas derivadas (ano, mês, tipo de documento) são recalculadas na leitura
+    df = prepare_snapshot_frame(df[[col for col in df.columns if col in SNAPSHOT_COLUMNS]])
+
+    tmp_data = paths['data'] + '.tmp'
+    df.to_parquet(
+        tmp_data, engine='pyarrow', index=False, compression='zstd',
+        use_dictionary=[col for col in DICTIONARY_COLUMNS if col in df.columns],
+    )
+    os.replace(tmp_data, paths['data'])
+
+    manifest = {
+        'table': table_name,
+        'version': version,
+        'rows': len(df),
+        'columns': list(df.columns),
+        'size_bytes': os.path.getsize(paths['data']),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    tmp_manifest = paths['manifest'] + '.tmp'
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_manifest, paths['manifest'])
+
+    print(f"📦 Snapshot gravado: {len(df):,} registros, "
+          f"{manifest['size_bytes'] / 1024 / 1024:.1f} MB (versão {version})")
+    return manifest
+
+
+def read_manifest(table_name: str = 'ibama_infracao',
+                  directory: str = DEFAULT_SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    """Manifesto do snapshot local, ou None se não existir."""
+    path = _paths(table_name, directory)['manifest']
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_snapshot(version: str, table_name: str = 'ibama_infracao',
+                  directory: str = DEFAULT_SNAPSHOT_DIR) -> Optional[pd.DataFrame]:
+    """
+    Lê o snapshot local se ele for da `version` pedida. Com version "unknown"
+    (banco inacessível), usa o snapshot que houver.
+    """
+    manifest = read_manifest(table_name, directory)
+    if manifest is None:
+        return None
+    if version != 'unknown' and manifest.get('version') != version:
+        print(f"⏳ Snapshot local desatualizado ({manifest.get('version')} ≠ {version})")
+        return None
+
+    try:
+        df = pd.read_parquet(_paths(table_name, directory)['data'], engine='pyarrow')
+    except Exception as e:
+        print(f"⚠️ Erro ao ler snapshot: {e}")
+        return None
+
+    print(f"⚡ Snapshot local carregado: {len(df):,} registros (versão {manifest.get('version')})")
+    return df
+
+
+def upload_snapshot(supabase, table_name: str = 'ibama_infracao',
+                    directory: str = DEFAULT_SNAPSHOT_DIR, bucket: str = DEFAULT_BUCKET) -> bool:
+    """Envia o snapshot local ao Supabase Storage (dados primeiro, manifesto por último)."""
+    paths = _paths(table_name, directory)
+    storage = supabase.storage.from_(bucket)
+    try:
+        for kind, content_type in (('data', 'application/octet-stream'), ('manifest', 'application/json')):
+            with open(paths[kind], 'rb') as f:
+                storage.upload(os.path.basename(paths[kind]), f.read(),
+                               {'content-type': content_type, 'upsert': 'true'})
+        print(f"☁️ Snapshot enviado ao bucket '{bucket}'")
+        return True
+    except Exception as e:
+        print(f"⚠️ Não foi possível enviar o snapshot ao Storage: {e}")
+        return False
+
+
+def download_snapshot(supabase, version: str, table_name: str = 'ibama_infracao',
+                      directory: str = DEFAULT_SNAPSHOT_DIR, bucket: str = DEFAULT_BUCKET) -> bool:
+    """
+    Baixa o snapshot do Supabase Storage se o manifesto remoto for da `version`
+    pedida. Retorna True se o snapshot local ficou atualizado.
+    """
+    paths = _paths(table_name, directory)
+    storage = supabase.storage.from_(bucket)
+    try:
+        manifest = json.loads(storage.download(os.path.basename(paths['manifest'])))
+        if manifest.get('version') != version:
+            print(f"⏳ Snapshot do Storage desatualizado ({manifest.get('version')} ≠ {version})")
+            return False
+
+        os.makedirs(directory, exist_ok=True)
+        tmp_data = paths['data'] + '.tmp'
+        with open(tmp_data, 'wb') as f:
+            f.write(storage.download(os.path.basename(paths['data'])))
+        os.replace(tmp_data, paths['data'])
+        with open(paths['manifest'], 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        print(f"☁️ Snapshot baixado do Storage: {manifest.get('rows', 0):,} registros")
+        return True
+    except Exception as e:
+        print(f"⚠️ Snapshot indisponível no Storage: {e}")
+        return False
+
+
+def fetch_snapshot_frame(supabase, table_name: str = 'ibama_infracao', columns: List[str] = None,
+                         page_size: int = 1000) -> pd.DataFrame:
+    """
+    Lê as colunas do snapshot direto da tabela (keyset por id, sequencial) e
+    remove duplicatas como o app: primeiro registro de cada NUM_AUTO_INFRACAO.
+    Usado pelo pipeline, que não tem o paginador do app (depende do Streamlit).
+    """
+    sample = supabase.table(table_name).select('*').limit(1).execute().data
+    if not sample:
+        return pd.DataFrame()
+    # Só pede as colunas que existem na tabela
+    columns = [col for col in (columns or SNAPSHOT_COLUMNS) if col in sample[0]]
+
+    records = []
+    last_id = 0
+    while True:
+        page = (supabase.table(table_name).select(','.join(columns))
+                .gt('id', last_id).order('id').limit(page_size).execute()).data or []
+        records.extend(page)
+        if len(page) < page_size:
+            break
+        last_id = page[-1]['id']
+
+    df = pd.DataFrame(records, columns=columns)
+    df = df[df['NUM_AUTO_INFRACAO'].notna() & (df['NUM_AUTO_INFRACAO'] != '')]
+    return df.drop_duplicates(subset=['NUM_AUTO_INFRACAO'], keep='first').reset_index(drop=True)
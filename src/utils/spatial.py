@@ -0,0 +1,89 @@
+"""
+Agregação espacial das infrações para o mapa do dashboard.
+
+Em vez de enviar pontos ao navegador, as coordenadas válidas são agrupadas em
+uma grade regular (em graus) cujo tamanho acompanha a extensão do recorte:
+o Brasil inteiro fica em células de ~0,25°, um estado em células menores,
+e a grade engrossa se passar de MAX_CELLS células ocupadas. Cada célula leva
+o total de infrações e a soma das multas, e o mapa desenha as células como
+camada de densidade: todas as infrações entram no mapa com um payload de no
+máximo MAX_CELLS linhas.
+"""
+import numpy as np
+import pandas as pd
+
+# Tamanhos de célula possíveis, em graus (0,01° ≈ 1,1 km)
+GRID_SIZES = [0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+# Células ao longo do maior lado do recorte
+TARGET_BINS = 200
+
+# Máximo de células enviadas ao navegador; acima disso a grade fica mais grossa
+MAX_CELLS = 3000
+
+
+def choose_grid_size(lat: pd.Series, lon: pd.Series, target_bins: int = TARGET_BINS) -> float:
+    """Menor tamanho de célula que cobre a extensão do recorte com até `target_bins` células por lado."""
+    span = max(float(lat.max() - lat.min()), float(lon.max() - lon.min()), 0.0)
+    for size in GRID_SIZES:
+        if span / size <= target_bins:
+            return size
+    return GRID_SIZES[-1]
+
+
+def map_zoom(grid_size: float) -> float:
+    """Zoom inicial do mapa compatível com o tamanho de célula escolhido."""
+    return float(np.clip(3 + np.log2(0.25 / grid_size), 3, 11))
+
+
+def bin_coordinates(df: pd.DataFrame, grid_size: float = None, max_cells: int = MAX_CELLS) -> pd.DataFrame:
+    """
+    Agrupa NUM_LATITUDE_AUTO/NUM_LONGITUDE_AUTO em células da grade. Sem
+    `grid_size`, usa o tamanho de `choose_grid_size` e aumenta-o até caber
+    em `max_cells` células ocupadas.
+
+    Retorna uma linha por célula ocupada com o centro (lat, lon), `total` de
+    infrações e `valor` (soma de VAL_AUTO_INFRACAO). Em `attrs` ficam o
+    tamanho da célula (`grid_size`) e o número de infrações com coordenadas
+    (`points`).
+    """
+    columns = ['lat', 'lon', 'total', 'valor']
+    if df.empty or not {'NUM_LATITUDE_AUTO', 'NUM_LONGITUDE_AUTO'}.issubset(df.columns):
+        return pd.DataFrame(columns=columns)
+
+    lat = df['NUM_LATITUDE_AUTO'].astype('float64')
+    lon = df['NUM_LONGITUDE_AUTO'].astype('float64')
+    valid = lat.between(-90, 90) & lon.between(-180, 180)
+    lat, lon = lat[valid], lon[valid]
+    if lat.empty:
+        return pd.DataFrame(columns=columns)
+
+    values = (df.loc[valid, 'VAL_AUTO_INFRACAO'].astype('float64').to_numpy()
+              if 'VAL_AUTO_INFRACAO' in df.columns else np.zeros(len(lat)))
+
+    if grid_size is not None:
+        bins = _bin(lat.to_numpy(), lon.to_numpy(), values, grid_size)
+    else:
+        sizes = GRID_SIZES[GRID_SIZES.index(choose_grid_size(lat, lon)):]
+        for grid_size in sizes:
+            bins = _bin(lat.to_numpy(), lon.to_numpy(), values, grid_size)
+            if len(bins) <= max_cells:
+                break
+
+    bins.attrs = {'grid_size': grid_size, 'points': int(valid.sum())}
+    return bins
+
+
+def _bin(lat: np.ndarray, lon: np.ndarray, values: np.ndarray, grid_size: float) -> pd.DataFrame:
+    cells = pd.DataFrame({
+        'row': np.floor(lat / grid_size).astype('int32'),
+        'col': np.floor(lon / grid_size).astype('int32'),
+        'valor': values,
+    })
+    grouped = cells.groupby(['row', 'col']).agg(total=('valor', 'size'), valor=('valor', 'sum')).reset_index()
+    return pd.DataFrame({
+        'lat': (grouped['row'] + 0.5) * grid_size,
+        'lon': (grouped['col'] + 0.5) * grid_size,
+        'total': grouped['total'].astype('int64'),
+        'valor': grouped['valor'],
+    })
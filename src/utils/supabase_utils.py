@@ -1,27 +1,201 @@
 import pandas as pd
-import streamlit as st
 from typing import List, Dict, Any, Optional
-import hashlib
 import time
 import random
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from src.utils.dataset_store import get_aggregate_cache, get_answer_cache, get_dataset_store, get_filter_cache
+from src.utils.instrumentation import estimate_bytes, get_perf_recorder
+from src.utils import snapshot
+from src.utils.schema import normalize_dataset
 
 class SupabasePaginator:
     """Classe CORRIGIDA DEFINITIVAMENTE para buscar dados únicos do Supabase."""
     
     def __init__(self, supabase_client):
         self.supabase = supabase_client
-        self.page_size = 1000
-        self.max_pages = 100   # Suficiente para até 100k registros
+        self.page_size = 1000  # Limite padrão de linhas por requisição do PostgREST
+        self.max_workers = config.SUPABASE_FETCH_WORKERS
+        self.max_retries = 4
+        self.base_delay = 0.5
+        self.pagination_mode = str(config.SUPABASE_PAGINATION_MODE).strip().lower()
+        self._table_columns: Dict[str, List[str]] = {}
+        # Chamado com (registros, total) a cada página baixada (ex.: carga de fundo)
+        self.on_progress = None
+    
+    def _report_progress(self, rows: int, total: Optional[int] = None):
+        if self.on_progress is not None:
+            self.on_progress(rows, total)
+    
+    def _count_rows(self, table_name: str) -> int:
+        """Total exato de registros da tabela."""
+        result = self.supabase.table(table_name).select('id', count='exact').limit(1).execute()
+        return getattr(result, 'count', 0) or 0
+    
+    def _execute_with_retry(self, build_query, label: str) -> List[Dict[str, Any]]:
+        """Executa a consulta montada por `build_query()`, repetindo com backoff em caso de erro."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return build_query().execute().data or []
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise Exception(f"{label} falhou após {attempt + 1} tentativas: {e}")
+                delay = random.uniform(0, self.base_delay * (2 ** attempt))
+                print(f"   ⚠️ Erro em {label} (tentativa {attempt + 1}): {e} - repetindo em {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _fetch_page(self, table_name: str, columns: str, page: int) -> List[Dict[str, Any]]:
+        """
+        Busca uma página por offset (.range).
+        Ordena por id para que os intervalos não se sobreponham entre requisições.
+        """
+        start = page * self.page_size
+        end = start + self.page_size - 1
+        records = self._execute_with_retry(
+            lambda: self.supabase.table(table_name).select(columns).order('id').range(start, end),
+            f"página {page + 1}"
+        )
+        self._report_progress(len(records))
+        return records
+    
+    def _get_id_bounds(self, table_name: str) -> Optional[tuple]:
+        """Menor e maior id da tabela, ou None se estiver vazia."""
+        first = self._execute_with_retry(
+            lambda: self.supabase.table(table_name).select('id').order('id').limit(1), "menor id"
+        )
+        last = self._execute_with_retry(
+            lambda: self.supabase.table(table_name).select('id').order('id', desc=True).limit(1), "maior id"
+        )
+        if not first or not last:
+            return None
+        return first[0]['id'], last[0]['id']
+    
+    def _get_id_splits(self, table_name: str, total: int, parts: int) -> List[int]:
+        """
+        Ids nas posições total/parts, 2*total/parts, ... em ordem de id: limites
+        que dividem a tabela em `parts` faixas com o mesmo número de registros
+        (uma consulta de uma linha por limite).
+        """
+        offsets = [part * total // parts for part in range(1, parts)]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(offsets)))) as executor:
+            rows = list(executor.map(
+                lambda offset: self._execute_with_retry(
+                    lambda: self.supabase.table(table_name).select('id').order('id').range(offset, offset),
+                    f"id na posição {offset}"
+                ),
+                offsets
+            ))
+        return [row[0]['id'] for row in rows if row]
+    
+    def _fetch_id_range(self, table_name: str, columns: str, after_id: int, until_id: int) -> List[Dict[str, Any]]:
+        """
+        Lê os registros com after_id < id <= until_id por keyset: cada página pede
+        `id > último visto` com limite, então custa o mesmo em qualquer profundidade.
+        """
+        # O id é necessário para avançar o cursor, mesmo em projeções de colunas
+        select_columns = columns if columns == '*' or 'id' in columns.split(',') else f"id,{columns}"
+        records = []
+        last_id = after_id
+        
+        while True:
+            page = self._execute_with_retry(
+                lambda: (self.supabase.table(table_name).select(select_columns)
+                         .gt('id', last_id).lte('id', until_id)
+                         .order('id').limit(self.page_size)),
+                f"ids após {last_id}"
+            )
+            records.extend(page)
+            self._report_progress(len(page))
+            if len(page) < self.page_size:
+                return records
+            last_id = page[-1]['id']
+    
+    def _fetch_all_keyset(self, table_name: str, columns: str, total: int = None) -> List[Dict[str, Any]]:
+        """
+        Varredura completa por keyset. O intervalo [menor id, maior id] lido no
+        início é dividido em faixas com o mesmo número de registros (pela
+        contagem exata, já que ids removidos deixam buracos), percorridas em
+        paralelo; como o limite superior é fixo, o resultado é um retrato
+        consistente da tabela naquele momento (cada id é lido uma única vez,
+        inserções posteriores ficam de fora).
+        """
+        bounds = self._get_id_bounds(table_name)
+        if bounds is None:
+            return []
+        if total is None:
+            total = self._count_rows(table_name)
+        
+        min_id, max_id = bounds
+        # Mais faixas que workers para que uma faixa lenta não segure a carga
+        num_ranges = max(1, min(self.max_workers * 4, -(-total // self.page_size)))
+        splits = sorted({split for split in self._get_id_splits(table_name, total, num_ranges)
+                         if min_id <= split < max_id})
+        edges = [min_id - 1] + splits + [max_id]
+        ranges = list(zip(edges[:-1], edges[1:]))
+        workers = max(1, min(self.max_workers, len(ranges)))
+        print(f"   📄 Keyset: {total:,} registros (ids {min_id:,} a {max_id:,}) em {len(ranges)} faixas "
+              f"({workers} requisições simultâneas)")
+        self._report_progress(0, total)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map preserva a ordem das faixas
+            chunks = list(executor.map(
+                lambda bounds: self._fetch_id_range(table_name, columns, bounds[0], bounds[1]), ranges
+            ))
+        
+        return [record for chunk in chunks for record in chunk]
+    
+    def _fetch_all_offset(self, table_name: str, columns: str, total: int = None) -> List[Dict[str, Any]]:
+        """
+        Varredura completa por offset: conta os registros e busca as páginas em paralelo.
+        Registros inseridos depois da contagem são lidos enquanto a última página vier cheia.
+        """
+        if total is None:
+            total = self._count_rows(table_name)
+        
+        num_pages = -(-total // self.page_size)
+        workers = max(1, min(self.max_workers, num_pages))
+        print(f"   📄 Offset: {total:,} registros em {num_pages} páginas ({workers} requisições simultâneas)")
+        self._report_progress(0, total)
+        
+        pages = []
+        if num_pages:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map preserva a ordem das páginas
+                pages = list(executor.map(lambda page: self._fetch_page(table_name, columns, page),
+                                          range(num_pages)))
+        
+        page = num_pages
+        while not pages or len(pages[-1]) == self.page_size:
+            extra = self._fetch_page(table_name, columns, page)
+            if not extra:
+                break
+            pages.append(extra)
+            page += 1
+        
+        return [record for page_data in pages for record in page_data]
     
-    def _get_session_key(self, table_name: str = 'ibama_infracao', filters: str = "") -> str:
-        """Gera chave única POR SESSÃO para cache isolado."""
-        if 'session_uuid' not in st.session_state:
-            st.session_state.session_uuid = str(uuid.uuid4())[:8]
-        
-        session_id = st.session_state.session_uuid
-        filter_hash = hashlib.md5(f"{table_name}_{filters}_{session_id}".encode()).hexdigest()[:8]
-        return f"data_{session_id}_{filter_hash}"
+    def _fetch_all_pages(self, table_name: str, columns: str = '*', total: int = None) -> List[Dict[str, Any]]:
+        """
+        Baixa a tabela inteira em ordem de id, com até `max_workers` requisições
+        simultâneas, no modo de `pagination_mode` ('keyset' ou 'offset').
+        
+        Páginas com erro são repetidas individualmente; se alguma continuar
+        falhando, levanta exceção em vez de devolver dados incompletos.
+        """
+        start_time = time.time()
+        with get_perf_recorder().measure(f"supabase:{table_name}", 'fetch', source=self.pagination_mode) as event:
+            if self.pagination_mode == 'offset':
+                records = self._fetch_all_offset(table_name, columns, total)
+            else:
+                records = self._fetch_all_keyset(table_name, columns, total)
+            event['rows_out'] = len(records)
+            event['bytes'] = estimate_bytes(records)
+        
+        elapsed = time.time() - start_time
+        print(f"   ✅ {len(records):,} registros em {elapsed:.1f}s ({len(records) / max(elapsed, 1e-6):,.0f} registros/s)")
+        return records
     
     def get_real_count_corrected(self, table_name: str = 'ibama_infracao') -> Dict[str, Any]:
         """
@@ -32,47 +206,18 @@ class SupabasePaginator:
             print("🔍 CONTAGEM REAL CORRIGIDA: Iniciando contagem definitiva...")
             
             # 1. Conta total de registros
-            result_total = self.supabase.table(table_name).select('*', count='exact').limit(1).execute()
-            total_records = getattr(result_total, 'count', 0)
+            total_records = self._count_rows(table_name)
             print(f"📊 Total de registros no banco: {total_records:,}")
             
             # 2. Busca TODOS os NUM_AUTO_INFRACAO de forma eficiente
             print("🔄 Buscando todos os NUM_AUTO_INFRACAO...")
             
-            all_num_auto = []
-            page = 0
-            
-            while True:
-                start = page * self.page_size
-                end = start + self.page_size - 1
-                
-                try:
-                    # Busca apenas NUM_AUTO_INFRACAO para eficiência
-                    result = self.supabase.table(table_name).select('NUM_AUTO_INFRACAO').range(start, end).execute()
-                    
-                    if not result.data or len(result.data) == 0:
-                        break
-                    
-                    # Adiciona todos os valores (incluindo possíveis duplicatas)
-                    for record in result.data:
-                        num_auto = record.get('NUM_AUTO_INFRACAO')
-                        if num_auto and str(num_auto).strip():  # Só aceita valores válidos
-                            all_num_auto.append(num_auto)
-                    
-                    print(f"   📄 Página {page + 1}: {len(result.data)} registros coletados")
-                    
-                    if len(result.data) < self.page_size:
-                        break
-                    
-                    page += 1
-                    
-                    if page >= self.max_pages:
-                        print(f"   ⚠️ Limite de páginas atingido: {self.max_pages}")
-                        break
-                        
-                except Exception as e:
-                    print(f"   ❌ Erro na página {page + 1}: {e}")
-                    break
+            all_num_auto = [
+                record.get('NUM_AUTO_INFRACAO')
+                for record in self._fetch_all_pages(table_name, 'NUM_AUTO_INFRACAO', total=total_records)
+            ]
+            # Só aceita valores válidos
+            all_num_auto = [num_auto for num_auto in all_num_auto if num_auto and str(num_auto).strip()]
             
             # 3. Análise correta dos dados coletados
             total_coletados = len(all_num_auto)
@@ -115,56 +260,152 @@ class SupabasePaginator:
                 'error': str(e)
             }
     
-    def get_all_records_corrected(self, table_name: str = 'ibama_infracao', cache_key: str = None) -> pd.DataFrame:
+    def _probe_data_version(self, table_name: str) -> str:
+        """Versão dos dados no banco (total de registros + maior id)."""
+        return snapshot.probe_data_version(self.supabase, table_name)
+    
+    def get_data_version(self, table_name: str = 'ibama_infracao', force: bool = False) -> str:
+        """Versão atual dos dados, verificada no banco no máximo uma vez por intervalo."""
+        return get_dataset_store().get_version(
+            table_name, lambda: self._probe_data_version(table_name), force=force
+        )
+    
+    def _get_table_columns(self, table_name: str) -> Optional[List[str]]:
+        """Colunas existentes na tabela (lidas de um registro), ou None se não for possível."""
+        if table_name not in self._table_columns:
+            try:
+                result = self.supabase.table(table_name).select('*').limit(1).execute()
+                if not result.data:
+                    return None
+                self._table_columns[table_name] = list(result.data[0].keys())
+            except Exception as e:
+                print(f"⚠️ Não foi possível listar as colunas de {table_name}: {e}")
+                return None
+        return self._table_columns[table_name]
+    
+    def _resolve_columns(self, table_name: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        Projeção efetivamente buscada: as colunas pedidas que existem na tabela,
+        mais `id` (cursor do keyset) e NUM_AUTO_INFRACAO (deduplicação).
+        None significa todas as colunas.
+        """
+        if columns is None:
+            return None
+        
+        wanted = list(dict.fromkeys(['id', 'NUM_AUTO_INFRACAO', *columns]))
+        available = self._get_table_columns(table_name)
+        if available is None:
+            return None  # Sem saber o esquema, busca tudo para não pedir coluna inexistente
+        return [col for col in wanted if col in available]
+    
+    def get_all_records_corrected(self, table_name: str = 'ibama_infracao', cache_key: str = None,
+                                  columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         VERSÃO CORRIGIDA DEFINITIVA: Busca TODOS os registros únicos corretamente.
+        
+        Os dados ficam no dataset compartilhado do processo (uma cópia para todas
+        as sessões) e só são baixados de novo quando a versão no banco muda.
+        `cache_key` é mantido por compatibilidade e não é mais usado.
+        
+        Com `columns`, busca apenas essas colunas (além de id e NUM_AUTO_INFRACAO).
+        As projeções se acumulam em uma única entrada: se outra tela já carregou
+        as colunas pedidas, nada é baixado; se faltarem colunas, só elas são buscadas.
+        O DataFrame retornado pode ter mais colunas que as pedidas.
+        
+        O DataFrame retornado é compartilhado - não altere no lugar.
         """
-        if cache_key is None:
-            cache_key = self._get_session_key(table_name)
+        version = self.get_data_version(table_name)
+        wanted = self._resolve_columns(table_name, columns)
+        store = get_dataset_store()
+        key = f"{table_name}:records"
         
-        cache_storage_key = f"paginated_data_{cache_key}"
-        if cache_storage_key in st.session_state:
-            print(f"✅ Retornando dados únicos do cache da sessão")
-            return st.session_state[cache_storage_key]
+        def covers(df: pd.DataFrame) -> bool:
+            projection = df.attrs.get('projection')
+            if projection is None:
+                return True  # Tabela completa
+            return wanted is not None and set(wanted) <= set(projection)
         
-        print(f"🔄 BUSCA CORRIGIDA: Carregando TODOS os dados únicos...")
+        def load() -> pd.DataFrame:
+            existing = store.peek(key, version)
+            if wanted is not None and existing is not None and existing.attrs.get('projection') is not None:
+                return self._extend_projection(table_name, existing, wanted)
+            if wanted is not None and table_name == 'ibama_infracao' and set(wanted) <= set(snapshot.SNAPSHOT_COLUMNS):
+                return self._load_snapshot_columns(table_name, version)
+            return self._fetch_all_unique(table_name, wanted)
         
-        all_data = []
-        page = 0
+        return store.get_or_load(key, version, load, is_valid=covers)
+    
+    def _load_snapshot_columns(self, table_name: str, version: str) -> pd.DataFrame:
+        """
+        Carrega as colunas do snapshot: do Parquet local se estiver na versão
+        atual, senão do Supabase Storage, e só em último caso pela rede - neste
+        caso o resultado é gravado como snapshot local para o próximo cold start.
+        """
+        directory = config.SNAPSHOT_DIR
+        with get_perf_recorder().measure(f"snapshot:{table_name}", 'fetch', source='local') as event:
+            df = snapshot.read_snapshot(version, table_name, directory)
+            if df is None and version != 'unknown':
+                if snapshot.download_snapshot(self.supabase, version, table_name, directory, config.SNAPSHOT_BUCKET):
+                    event['source'] = 'storage'
+                    df = snapshot.read_snapshot(version, table_name, directory)
+            if df is not None:
+                event['rows_out'] = len(df)
+                event['bytes'] = (snapshot.read_manifest(table_name, directory) or {}).get('size_bytes', 0)
         
-        while True:
-            start = page * self.page_size
-            end = start + self.page_size - 1
-            
-            print(f"   📄 Página {page + 1}: registros {start} a {end}")
-            
+        if df is not None:
+            df.attrs['projection'] = tuple(df.columns)
+            return normalize_dataset(df)
+        
+        df = self._fetch_all_unique(table_name, self._resolve_columns(table_name, snapshot.SNAPSHOT_COLUMNS))
+        if df.empty:
+            return df
+        
+        if version != 'unknown':
             try:
-                # Busca todos os campos
-                result = self.supabase.table(table_name).select('*').range(start, end).execute()
-                
-                if not result.data or len(result.data) == 0:
-                    print(f"   ✅ Fim da paginação na página {page + 1}")
-                    break
-                
-                # Adiciona todos os registros (incluindo possíveis duplicatas)
-                # A deduplicação será feita no final usando pandas
-                all_data.extend(result.data)
-                
-                print(f"   📊 Carregados: {len(result.data)} registros (total: {len(all_data):,})")
-                
-                if len(result.data) < self.page_size:
-                    print(f"   ✅ Última página alcançada")
-                    break
-                
-                page += 1
-                
-                if page >= self.max_pages:
-                    print(f"   ⚠️ Limite de páginas atingido: {self.max_pages}")
-                    break
-                
+                snapshot.write_snapshot(df, version, table_name, directory)
             except Exception as e:
-                print(f"   ❌ Erro na página {page + 1}: {e}")
-                break
+                print(f"⚠️ Não foi possível gravar o snapshot local: {e}")
+        return df
+    
+    def _extend_projection(self, table_name: str, existing: pd.DataFrame, wanted: List[str]) -> pd.DataFrame:
+        """
+        Busca só as colunas que faltam na projeção em cache e as junta pelo id.
+        Se a busca falhar, devolve `existing` sem as colunas novas: os dados já
+        carregados continuam valendo e a próxima consulta tenta de novo.
+        """
+        projection = list(existing.attrs['projection'])
+        missing = [col for col in wanted if col not in projection]
+        print(f"🔄 Ampliando projeção em cache com {len(missing)} colunas: {', '.join(missing)}")
+        
+        try:
+            extra = pd.DataFrame(self._fetch_all_pages(table_name, ','.join(['id', *missing])),
+                                 columns=['id', *missing])
+        except Exception as e:
+            print(f"   ⚠️ Erro ao carregar colunas, mantendo a projeção atual: {e}")
+            return existing
+        
+        # Colunas novas no mesmo esquema tipado da base
+        extra = normalize_dataset(extra)
+        df = existing.merge(extra, on='id', how='left')
+        df.index = existing.index
+        df.attrs = {**existing.attrs, 'projection': tuple(projection + missing)}
+        return df
+    
+    def _fetch_all_unique(self, table_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Baixa a tabela inteira (páginas em paralelo) e remove duplicatas.
+        `columns` limita as colunas buscadas (None = todas).
+        """
+        print(f"🔄 BUSCA CORRIGIDA: Carregando TODOS os dados únicos...")
+        if columns is not None:
+            print(f"   📋 Projeção: {len(columns)} colunas")
+        
+        try:
+            all_data = self._fetch_all_pages(table_name, ','.join(columns) if columns is not None else '*')
+        except Exception as e:
+            # Vazio não fica no dataset compartilhado: a próxima consulta tenta de novo
+            print(f"   ❌ Erro ao carregar dados: {e}")
+            return pd.DataFrame()
         
         print(f"🎉 DADOS CARREGADOS: {len(all_data):,} registros")
         
@@ -193,30 +434,29 @@ class SupabasePaginator:
             
             df = df_unique
         
-        # Armazena no cache da sessão
-        st.session_state[cache_storage_key] = df
-        print(f"💾 Dados únicos armazenados no cache da sessão")
-        
-        return df
+        df.attrs['projection'] = tuple(df.columns) if columns is not None else None
+        # Tipos canônicos uma única vez, no carregamento (ver src/utils/schema.py)
+        return normalize_dataset(df)
     
     # Métodos mantidos para compatibilidade - agora chamam as versões corrigidas
     def get_real_count(self, table_name: str = 'ibama_infracao') -> Dict[str, Any]:
         """Método original - chama a versão corrigida."""
         return self.get_real_count_corrected(table_name)
     
-    def get_all_records(self, table_name: str = 'ibama_infracao', cache_key: str = None) -> pd.DataFrame:
+    def get_all_records(self, table_name: str = 'ibama_infracao', cache_key: str = None,
+                        columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Método original - chama a versão corrigida."""
-        return self.get_all_records_corrected(table_name, cache_key)
+        return self.get_all_records_corrected(table_name, cache_key, columns)
     
     def get_filtered_data(self, selected_ufs: List[str] = None, year_range: tuple = None) -> pd.DataFrame:
-        """Busca dados filtrados com garantia de unicidade."""
-        filter_str = f"ufs_{selected_ufs}_years_{year_range}"
-        cache_key = self._get_session_key('ibama_infracao', filter_str)
-        
+        """
+        Busca dados filtrados com garantia de unicidade. Os filtros são
+        aplicados sobre o dataset compartilhado entre as sessões.
+        """
         print(f"🔍 Buscando dados filtrados únicos...")
         
-        # Busca todos os dados únicos desta sessão
-        df = self.get_all_records_corrected('ibama_infracao', cache_key)
+        # Dataset único por versão (DatasetStore), o mesmo para todas as sessões
+        df = self.get_all_records_corrected('ibama_infracao')
         
         if df.empty:
             return df
@@ -231,7 +471,8 @@ class SupabasePaginator:
         
         if year_range and 'DAT_HORA_AUTO_INFRACAO' in df.columns:
             try:
-                df['DAT_HORA_AUTO_INFRACAO'] = pd.to_datetime(df['DAT_HORA_AUTO_INFRACAO'], errors='coerce')
+                # assign: o DataFrame base é compartilhado entre sessões
+                df = df.assign(DAT_HORA_AUTO_INFRACAO=pd.to_datetime(df['DAT_HORA_AUTO_INFRACAO'], errors='coerce'))
                 df = df[
                     (df['DAT_HORA_AUTO_INFRACAO'].dt.year >= year_range[0]) &
                     (df['DAT_HORA_AUTO_INFRACAO'].dt.year <= year_range[1])
@@ -244,21 +485,17 @@ class SupabasePaginator:
         return df
     
     def clear_cache(self):
-        """Limpa o cache específico desta sessão."""
+        """
+        Descarta o dataset compartilhado: a próxima consulta verifica a versão
+        no banco e recarrega os dados (uma vez, para todas as sessões).
+        """
         try:
-            session_uuid = st.session_state.get('session_uuid', '')
-            
-            keys_to_remove = []
-            for key in st.session_state.keys():
-                if key.startswith(f'paginated_data_data_{session_uuid}'):
-                    keys_to_remove.append(key)
-            
-            for key in keys_to_remove:
-                del st.session_state[key]
-            
-            st.session_state.session_uuid = str(uuid.uuid4())[:8]
+            get_dataset_store().invalidate('ibama_infracao')
+            get_filter_cache().clear()
+            get_aggregate_cache().clear()
+            get_answer_cache().clear()
             
-            print(f"🧹 Cache da sessão limpo ({len(keys_to_remove)} chaves removidas)")
+            print(f"🧹 Dataset compartilhado descartado - será recarregado na próxima consulta")
             return True
         except Exception as e:
             print(f"❌ Erro ao limpar cache: {e}")
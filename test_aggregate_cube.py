@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Testes do cubo de agregados do dashboard (src/utils/aggregate_cube.py): cada
+agregação é conferida contra o cálculo em pandas de DataVisualization sobre
+os registros filtrados.
+"""
+
+import pandas as pd
+import pytest
+
+from src.components.visualization import DataVisualization
+from src.utils.aggregate_cube import AggregateCube
+
+FILTERS = [
+    {'p_ufs': None, 'p_years': None, 'p_year_months': None},
+    {'p_ufs': ['PA'], 'p_years': None, 'p_year_months': None},
+    {'p_ufs': None, 'p_years': [2024], 'p_year_months': None},
+    {'p_ufs': ['AM', 'MT'], 'p_years': [2023, 2025], 'p_year_months': None},
+    {'p_ufs': None, 'p_years': None, 'p_year_months': [202312, 202401, 202402]},
+    {'p_ufs': ['PA'], 'p_years': None, 'p_year_months': [202405]},
+    {'p_ufs': ['SP'], 'p_years': None, 'p_year_months': None},  # valor ausente da base
+]
+
+
+@pytest.fixture(name='visualization')
+def visualization_fixture():
+    """Só os cálculos em pandas (_compute_*), sem banco nem Streamlit."""
+    return DataVisualization.__new__(DataVisualization)
+
+
+def filtered(df, params):
+    """Recorte dos registros com os mesmos filtros das RPCs."""
+    mask = df['YEAR'] > 0
+    if params['p_ufs']:
+        mask &= df['UF'].isin(params['p_ufs'])
+    if params['p_years'] is not None:
+        mask &= df['YEAR'].isin(params['p_years'])
+    if params['p_year_months'] is not None:
+        mask &= (df['YEAR'].astype(int) * 100 + df['MONTH'].astype(int)).isin(params['p_year_months'])
+    return df[mask]
+
+
+def by_key(frame, key):
+    """Resultado sem depender da ordem (agregações sem corte ou sem empates definidos)."""
+    return frame.astype({key: object}).sort_values(key).reset_index(drop=True)
+
+
+def test_unordered_aggregates_match_pandas(make_dataset, visualization):
+    df = make_dataset()
+    cube = AggregateCube(df)
+    for params in FILTERS:
+        subset = filtered(df, params)
+        for rpc_name, compute, key in [
+            ('dashboard_counts_by_uf', visualization._compute_counts_by_uf, 'UF'),
+            ('dashboard_value_by_type', visualization._compute_value_by_type, 'TIPO_INFRACAO'),
+            ('dashboard_counts_by_gravity', visualization._compute_counts_by_gravity, 'GRAVIDADE_INFRACAO'),
+            ('dashboard_counts_by_status', visualization._compute_counts_by_status, 'DES_STATUS_FORMULARIO'),
+            ('dashboard_offender_summary', visualization._compute_offender_summary, 'doc_type'),
+        ]:
+            pd.testing.assert_frame_equal(by_key(cube.answer(rpc_name, params), key), by_key(compute(subset), key),
+                                          check_dtype=False, check_index_type=False, obj=f"{rpc_name} {params}")
+
+
+def test_overview_matches_pandas(make_dataset, visualization):
+    df = make_dataset()
+    cube = AggregateCube(df)
+    for params in FILTERS:
+        expected = visualization._compute_overview(filtered(df, params))
+        result = cube.answer('dashboard_overview', params)
+        if expected.empty:
+            assert result.empty
+            continue
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, obj=f"overview {params}")
+
+
+def test_top_municipios_breaks_ties_like_pandas(make_dataset, visualization):
+    # Poucos municípios: recortes pequenos têm vários empates no corte do top
+    df = make_dataset()
+    cube = AggregateCube(df)
+    for params in FILTERS:
+        for limit in [3, 10]:
+            result = cube.answer('dashboard_top_municipios', {**params, 'p_limit': limit})
+            expected = visualization._compute_top_municipios(filtered(df, params), limit)
+            pd.testing.assert_frame_equal(result, expected.reset_index(drop=True), check_dtype=False,
+                                          check_index_type=False, obj=f"top_municipios {params} {limit}")
+
+
+@pytest.mark.parametrize('top_k', [3, 25])
+def test_top_offenders_breaks_ties_like_pandas(make_dataset, visualization, top_k):
+    # Valores redondos fazem infratores empatarem; top_k pequeno força a soma completa
+    df = make_dataset()
+    df = df.assign(VAL_AUTO_INFRACAO=df['VAL_AUTO_INFRACAO'].round(-4))
+    cube = AggregateCube(df, top_k=top_k)
+    for params in FILTERS:
+        for doc_type in ['CPF', 'CNPJ']:
+            result = cube.answer('dashboard_top_offenders', {**params, 'p_doc_type': doc_type, 'p_limit': 10})
+            expected = visualization._compute_top_offenders(filtered(df, params), doc_type, 10)
+            pd.testing.assert_frame_equal(result, expected.astype(object).reset_index(drop=True), check_dtype=False,
+                                          check_index_type=False, obj=f"top_offenders {params} {doc_type}")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Testes da carga paralela (src/utils/bulk_loader.py) com um cliente falso:
+divisão do lote em 413, repetição em 429 e falha definitiva nos demais erros.
+"""
+
+import threading
+
+import httpx
+from postgrest.exceptions import APIError
+
+from src.utils.bulk_loader import SupabaseBulkLoader, is_payload_error, is_retryable_error
+
+
+class FakeInsert:
+    def __init__(self, client, records):
+        self.client = client
+        self.records = records
+
+    def execute(self):
+        error = self.client.fail(self.records)
+        if error is not None and not self.client.commit_before_error:
+            raise error
+        with self.client.lock:
+            self.client.inserted.extend(self.records)
+        if error is not None:
+            raise error
+        return type('Result', (), {'data': self.records})()
+
+
+class FakeSupabase:
+    """
+    `fail(records)` devolve o erro da requisição, ou None para aceitá-la. Com
+    `commit_before_error`, o lote é gravado antes do erro (como num timeout de
+    leitura depois do commit).
+    """
+
+    def __init__(self, fail, commit_before_error=False):
+        self.fail = fail
+        self.commit_before_error = commit_before_error
+        self.lock = threading.Lock()
+        self.inserted = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, records):
+        return FakeInsert(self, records)
+
+
+def make_records(count):
+    return [{'NUM_AUTO_INFRACAO': str(1000 + i), 'UF': 'PA'} for i in range(count)]
+
+
+def make_loader(supabase, **kwargs):
+    return SupabaseBulkLoader(supabase, 'ibama_infracao', base_delay=0, max_delay=0,
+                              key_column='NUM_AUTO_INFRACAO', **kwargs)
+
+
+def test_classification_ignores_message_text():
+    duplicate = APIError({'code': '23505', 'message': 'duplicate key value (500) violates 413 timeout connection'})
+    assert not is_payload_error(duplicate) and not is_retryable_error(duplicate)
+
+    assert is_payload_error(APIError({'code': '57014', 'message': 'canceling statement'}))
+    assert is_payload_error(APIError({'code': 413, 'message': 'JSON could not be generated'}))
+    assert is_retryable_error(APIError({'code': 503, 'message': 'JSON could not be generated'}))
+    assert is_retryable_error(httpx.ConnectError('boom'))
+
+    # Resultado incerto: o lote pode ter sido gravado
+    for error in (httpx.ReadTimeout('boom'), httpx.RemoteProtocolError('boom'),
+                  APIError({'code': 502, 'message': 'JSON could not be generated'})):
+        assert not is_payload_error(error) and not is_retryable_error(error)
+
+
+def test_payload_error_splits_batch():
+    supabase = FakeSupabase(lambda records: APIError({'code': 413, 'message': ''}) if len(records) > 100 else None)
+    loader = make_loader(supabase, max_workers=1, initial_batch_size=400, min_batch_size=10)
+    report = loader.load(make_records(1000))
+
+    assert report['successful'] == 1000 and report['failed'] == 0
+    assert report['splits'] > 0
+    assert sorted(r['NUM_AUTO_INFRACAO'] for r in supabase.inserted) == [str(1000 + i) for i in range(1000)]
+
+
+def test_rate_limit_is_retried():
+    calls = []
+
+    def fail(records):
+        calls.append(len(records))
+        return APIError({'code': 429, 'message': ''}) if len(calls) <= 2 else None
+
+    supabase = FakeSupabase(fail)
+    report = make_loader(supabase, max_workers=1, initial_batch_size=50, min_batch_size=10).load(make_records(50))
+
+    assert report['successful'] == 50
+    assert report['retries'] == 2 and report['splits'] == 0
+
+
+def test_permanent_error_is_not_retried_or_split():
+    bad_key = '1007'
+
+    def fail(records):
+        if any(r['NUM_AUTO_INFRACAO'] == bad_key for r in records):
+            return APIError({'code': '23505', 'message': 'duplicate key 500 413 timeout'})
+        return None
+
+    supabase = FakeSupabase(fail)
+    report = make_loader(supabase, max_workers=1, initial_batch_size=10, min_batch_size=10, max_batch_size=10).load(make_records(30))
+
+    assert report['retries'] == 0 and report['splits'] == 0
+    assert report['failed'] == 10 and report['successful'] == 20
+    assert sorted(report['failed_keys']) == [str(1000 + i) for i in range(10)]
+
+
+def test_timeout_after_commit_is_not_resent():
+    calls = []
+
+    def fail(records):
+        calls.append(len(records))
+        return httpx.ReadTimeout('read timed out') if len(calls) == 1 else None
+
+    supabase = FakeSupabase(fail, commit_before_error=True)
+    report = make_loader(supabase, max_workers=1, initial_batch_size=50, min_batch_size=10).load(make_records(100))
+
+    # O lote que estourou o tempo já estava gravado: nenhuma linha entra duas vezes
+    keys = [r['NUM_AUTO_INFRACAO'] for r in supabase.inserted]
+    assert len(keys) == len(set(keys)) == 100
+    assert report['retries'] == 0 and report['splits'] == 0
+    assert report['failed'] == 50 and sorted(report['failed_keys']) == [str(1000 + i) for i in range(50)]
+
+
+def test_connection_error_is_retried_once_sent():
+    calls = []
+
+    def fail(records):
+        calls.append(len(records))
+        return httpx.ConnectError('connection refused') if len(calls) == 1 else None
+
+    supabase = FakeSupabase(fail)
+    report = make_loader(supabase, max_workers=1, initial_batch_size=50, min_batch_size=10).load(make_records(50))
+
+    assert report['successful'] == 50 and report['retries'] == 1
+    assert len(supabase.inserted) == 50
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Testes das funções de agregação do dashboard (sql/dashboard_rpcs.sql) num
+PostgreSQL de verdade: o arquivo inteiro é executado sobre uma tabela
+ibama_infracao só com colunas de texto, como no Supabase, e os resultados
+são conferidos contra o cálculo em pandas de DataVisualization.
+
+O banco vem de TEST_DATABASE_URL ou, sem ela, de um servidor local do
+pacote pgserver; sem nenhum dos dois (ou sem psycopg2), os testes são pulados.
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from conftest import make_dataset
+from src.components.visualization import DataVisualization
+from src.utils.documents import classify_documents
+from test_documents import CASES
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+SQL_FILE = Path(__file__).parent / 'sql' / 'dashboard_rpcs.sql'
+SCHEMA = 'dashboard_rpcs_test'
+TEXT_COLUMNS = ['NUM_AUTO_INFRACAO', 'DAT_HORA_AUTO_INFRACAO', 'UF', 'COD_MUNICIPIO', 'MUNICIPIO',
+                'TIPO_INFRACAO', 'GRAVIDADE_INFRACAO', 'DES_STATUS_FORMULARIO', 'NOME_INFRATOR',
+                'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO']
+
+
+def _database_url(tmp_path_factory) -> str:
+    url = os.getenv('TEST_DATABASE_URL')
+    if url:
+        return url
+    pgserver = pytest.importorskip('pgserver', reason='defina TEST_DATABASE_URL ou instale pgserver')
+    server = pgserver.get_server(str(tmp_path_factory.mktemp('pgdata')), cleanup_mode='stop')
+    return server.get_uri()
+
+
+def _as_text(value):
+    """Valor como o upload grava no Supabase: texto, ou NULL para vazios."""
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+@pytest.fixture(name='dataset', scope='module')
+def dataset_fixture():
+    df = make_dataset(rows=2000)
+    df['NUM_AUTO_INFRACAO'] = df['id'].astype(str)
+    return df
+
+
+@pytest.fixture(name='cursor', scope='module')
+def cursor_fixture(tmp_path_factory, dataset):
+    """Esquema descartável com a tabela carregada e o arquivo SQL inteiro executado."""
+    connection = psycopg2.connect(_database_url(tmp_path_factory))
+    connection.autocommit = True
+    cursor = connection.cursor()
+    cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}')
+    columns = ', '.join(f'"{column}" text' for column in TEXT_COLUMNS)
+    cursor.execute(f'CREATE TABLE ibama_infracao (id bigserial PRIMARY KEY, {columns})')
+
+    rows = [tuple(_as_text(value) for value in row) for row in dataset[TEXT_COLUMNS].itertuples(index=False)]
+    placeholders = ', '.join(['%s'] * len(TEXT_COLUMNS))
+    quoted = ', '.join(f'"{column}"' for column in TEXT_COLUMNS)
+    cursor.executemany(f'INSERT INTO ibama_infracao ({quoted}) VALUES ({placeholders})', rows)
+
+    cursor.execute(SQL_FILE.read_text(encoding='utf-8'))
+    yield cursor
+    cursor.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+    connection.close()
+
+
+@pytest.fixture(name='visualization')
+def visualization_fixture():
+    """Só os cálculos em pandas (_compute_*), sem banco nem Streamlit."""
+    return DataVisualization.__new__(DataVisualization)
+
+
+def call(cursor, function_name: str, **params) -> pd.DataFrame:
+    """Chama a função com argumentos nomeados, como o supabase.rpc."""
+    arguments = ', '.join(f'{name} => %({name})s' for name in params)
+    cursor.execute(f'SELECT * FROM {function_name}({arguments})', params)
+    return pd.DataFrame(cursor.fetchall(), columns=[column.name for column in cursor.description])
+
+
+def test_every_function_is_created_and_callable(cursor):
+    cursor.execute("SELECT proname FROM pg_proc WHERE pronamespace = %s::regnamespace", (SCHEMA,))
+    created = {row[0] for row in cursor.fetchall()}
+    declared = {line.split('(')[0].split()[-1] for line in SQL_FILE.read_text(encoding='utf-8').splitlines()
+                if line.startswith('CREATE OR REPLACE FUNCTION')}
+    assert declared and created == declared
+
+    for function_name in sorted(declared):
+        assert len(call(cursor, function_name)) > 0, function_name
+
+
+@pytest.mark.parametrize('doc_type', ['CPF', 'CNPJ'])
+def test_top_offenders_match_pandas(cursor, visualization, dataset, doc_type):
+    result = call(cursor, 'dashboard_top_offenders', p_doc_type=doc_type, p_limit=25)
+    expected = visualization._compute_top_offenders(dataset, doc_type, limit=25)
+
+    assert list(result.columns) == ['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR', 'VAL_AUTO_INFRACAO_NUMERIC']
+    assert result['NOME_INFRATOR'].tolist() == expected['NOME_INFRATOR'].astype(str).tolist()
+    assert result['CPF_CNPJ_INFRATOR'].tolist() == expected['CPF_CNPJ_INFRATOR'].astype(str).tolist()
+    assert result['VAL_AUTO_INFRACAO_NUMERIC'].astype(float).round(2).tolist() == \
+        expected['VAL_AUTO_INFRACAO_NUMERIC'].round(2).tolist()
+
+
+def test_top_offenders_break_ties_by_name_then_document(cursor):
+    cursor.execute(
+        'INSERT INTO ibama_infracao ("NUM_AUTO_INFRACAO", "DAT_HORA_AUTO_INFRACAO", "UF", "NOME_INFRATOR", '
+        '"CPF_CNPJ_INFRATOR", "VAL_AUTO_INFRACAO") VALUES '
+        "('T1', '2030-01-01', 'PA', 'ZECA', '111.111.111-11', '9999999,00'), "
+        "('T2', '2030-01-01', 'PA', 'ZECA', '00000000000', '9999999,00'), "
+        "('T3', '2030-01-01', 'PA', 'ABEL', '22222222222', '9999999,00')"
+    )
+    try:
+        result = call(cursor, 'dashboard_top_offenders', p_years=[2030], p_doc_type='CPF', p_limit=3)
+    finally:
+        cursor.execute("DELETE FROM ibama_infracao WHERE \"NUM_AUTO_INFRACAO\" IN ('T1', 'T2', 'T3')")
+
+    assert list(zip(result['NOME_INFRATOR'], result['CPF_CNPJ_INFRATOR'])) == [
+        ('ABEL', '22222222222'), ('ZECA', '00000000000'), ('ZECA', '111.111.111-11'),
+    ]
+
+
+def test_offender_summary_matches_pandas(cursor, visualization, dataset):
+    result = call(cursor, 'dashboard_offender_summary').set_index('doc_type')['total']
+    expected = visualization._compute_offender_summary(dataset).set_index('doc_type')['total']
+    assert result.sort_index().to_dict() == {str(key): value for key, value in expected.sort_index().items()}
+
+
+def test_document_types_match_python_rule(cursor):
+    documents = [case[0] for case in CASES if isinstance(case[0], str) and case[0]]
+    cursor.executemany(
+        'INSERT INTO ibama_infracao ("NUM_AUTO_INFRACAO", "DAT_HORA_AUTO_INFRACAO", "NOME_INFRATOR", '
+        '"CPF_CNPJ_INFRATOR", "VAL_AUTO_INFRACAO") VALUES (%s, \'2031-01-01\', \'DOC\', %s, \'1\')',
+        [(f'D{i}', document) for i, document in enumerate(documents)]
+    )
+    try:
+        result = call(cursor, 'dashboard_offender_summary', p_years=[2031]).set_index('doc_type')['total']
+    finally:
+        cursor.execute("DELETE FROM ibama_infracao WHERE \"NUM_AUTO_INFRACAO\" LIKE 'D%'")
+
+    expected = pd.Series(classify_documents(pd.Series(documents))).value_counts()
+    assert result.to_dict() == {str(key): value for key, value in expected.items() if value}
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de processo (src/utils/dataset_store.py): carga única por
+chave e versão, recarga quando a versão muda e os limites do LRUCache.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from src.utils.dataset_store import DatasetStore, LRUCache
+
+
+def test_concurrent_loads_run_loader_once():
+    store = DatasetStore()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(timeout=5)
+        return pd.DataFrame({'id': [1, 2, 3]})
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_or_load('base', 'v1', loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert store.stats()['misses'] == 1 and store.stats()['hits'] == 7
+
+
+def test_failed_load_lets_next_caller_retry():
+    store = DatasetStore()
+
+    def failing():
+        raise ConnectionError('offline')
+
+    try:
+        store.get_or_load('base', 'v1', failing)
+    except ConnectionError:
+        pass
+    assert store.get_or_load('base', 'v1', lambda: pd.DataFrame({'id': [1]})).shape == (1, 1)
+
+
+def test_new_version_replaces_entry():
+    store = DatasetStore()
+    first = store.get_or_load('base', 'v1', lambda: pd.DataFrame({'id': [1]}))
+    assert store.get_or_load('base', 'v1', lambda: pd.DataFrame({'id': [9]})) is first
+
+    second = store.get_or_load('base', 'v2', lambda: pd.DataFrame({'id': [1, 2]}))
+    assert len(second) == 2
+    assert store.peek('base', 'v1') is None
+    assert store.peek('base') is second
+    assert len(store.stats()['entries']) == 1
+
+
+def test_empty_results_and_invalid_entries_are_reloaded():
+    store = DatasetStore()
+    assert store.get_or_load('base', 'v1', lambda: pd.DataFrame()).empty
+    assert store.peek('base') is None
+
+    narrow = store.get_or_load('base', 'v1', lambda: pd.DataFrame({'id': [1]}))
+    wide = store.get_or_load('base', 'v1', lambda: narrow.assign(UF=['PA']),
+                             is_valid=lambda df: 'UF' in df.columns)
+    assert list(wide.columns) == ['id', 'UF']
+    assert store.peek('base', 'v1') is wide
+
+
+def test_invalidate_by_prefix():
+    store = DatasetStore()
+    store.get_or_load('ibama:records', 'v1', lambda: pd.DataFrame({'id': [1]}))
+    store.get_or_load('ibama:cube', 'v1', lambda: pd.DataFrame({'id': [1]}))
+    store.get_or_load('outro', 'v1', lambda: pd.DataFrame({'id': [1]}))
+
+    store.invalidate('ibama:')
+    assert [entry['key'] for entry in store.stats()['entries']] == ['outro']
+
+
+def test_version_probe_is_reused_within_ttl():
+    store = DatasetStore(version_ttl=60)
+    versions = iter(['v1', 'v2'])
+    assert store.get_version('ibama', lambda: next(versions)) == 'v1'
+    assert store.get_version('ibama', lambda: next(versions)) == 'v1'
+    assert store.get_version('ibama', lambda: next(versions), force=True) == 'v2'
+
+    expiring = DatasetStore(version_ttl=0)
+    versions = iter(['v1', 'v2'])
+    expiring.get_version('ibama', lambda: next(versions))
+    assert expiring.get_version('ibama', lambda: next(versions)) == 'v2'
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' passa a ser o menos usado
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['size'] == 2
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 1
+
+
+def test_lru_items_expire_after_ttl():
+    cache = LRUCache(maxsize=4, ttl=0.05)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+    cache.put('a', 2)
+    assert cache.get('a') == 2
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Testes da classificação e do mascaramento de CPF/CNPJ (src/utils/documents.py).
+As regras de tipo são conferidas também contra a expressão usada em
+sql/dashboard_rpcs.sql, para que Python e SQL não divirjam.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.documents import classify_documents, describe_documents, mask_documents
+
+CASES = [
+    # (documento, DOC_TYPE, DOC_KEY, DOC_MASKED)
+    ('123.456.789-01', 'CPF', '12345678901', '123.***.***-01'),
+    ('12345678901', 'CPF', '12345678901', '123.***.***-01'),
+    (' 123 456 789 01 ', 'CPF', '12345678901', '123.***.***-01'),
+    ('12.345.678/0001-95', 'CNPJ', '12345678000195', '12.345.678/0001-95'),
+    ('12345678000195', 'CNPJ', '12345678000195', '12.345.678/0001-95'),
+    ('1234567890', 'OUTRO', '1234567890', '1234567890'),
+    ('123456789012', 'OUTRO', '123456789012', '123456789012'),
+    ('123.456.789-0X', 'OUTRO', None, '123.456.789-0X'),
+    ('', 'OUTRO', None, ''),
+    (None, 'OUTRO', None, None),
+    (np.nan, 'OUTRO', None, None),
+]
+
+
+def sql_doc_type(document) -> str:
+    """Mesmo CASE de dashboard_offender_summary em sql/dashboard_rpcs.sql."""
+    key = re.sub(r'[-./\s]', '', document) if isinstance(document, str) else ''
+    if re.fullmatch(r'\d{11}', key):
+        return 'CPF'
+    if re.fullmatch(r'\d{14}', key):
+        return 'CNPJ'
+    return 'OUTRO'
+
+
+@pytest.mark.parametrize('document,doc_type,doc_key,doc_masked', CASES)
+def test_describe_documents(document, doc_type, doc_key, doc_masked):
+    row = describe_documents(pd.Series([document], dtype=object)).iloc[0]
+    assert row['DOC_TYPE'] == doc_type
+    assert (row['DOC_KEY'] if pd.notna(row['DOC_KEY']) else None) == doc_key
+    assert (row['DOC_MASKED'] if pd.notna(row['DOC_MASKED']) else None) == doc_masked
+
+
+def test_classification_matches_sql_rule():
+    documents = pd.Series([case[0] for case in CASES], dtype=object)
+    assert list(classify_documents(documents)) == [sql_doc_type(document) for document in documents]
+
+
+def test_cpf_mask_hides_the_middle_digits():
+    masked = mask_documents(pd.Series(['98765432100', '987.654.321-00']))
+    assert masked.tolist() == ['987.***.***-00', '987.***.***-00']
+    assert all(re.fullmatch(r'\d{3}\.\*{3}\.\*{3}-\d{2}', value) for value in masked)
+
+
+def test_keeps_index_with_repeated_labels():
+    documents = pd.Series(['12345678901', '12345678000195', None], index=[7, 7, 3])
+    described = describe_documents(documents)
+    assert described.index.tolist() == [7, 7, 3]
+    assert described['DOC_TYPE'].tolist() == ['CPF', 'CNPJ', 'OUTRO']
+    assert list(described['DOC_TYPE'].cat.categories) == ['CPF', 'CNPJ', 'OUTRO']
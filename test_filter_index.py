@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de filtros do chatbot (src/utils/filter_index.py): cada
+recorte é conferido contra as máscaras do pandas na base inteira.
+"""
+
+import pandas as pd
+
+from src.utils.filter_index import FilterIndex
+
+
+def masked(df, years=None, ufs=None, tipos=None, gravidades=None, doc_type=None):
+    """Filtro original do chatbot: uma máscara por filtro sobre todas as linhas."""
+    mask = pd.Series(True, index=df.index)
+    if years:
+        mask &= df['YEAR'].isin(years)
+    if ufs:
+        mask &= df['UF'].isin(ufs)
+    if tipos:
+        mask &= df['TIPO_INFRACAO'].astype(str).str.lower().isin([tipo.lower() for tipo in tipos])
+    if gravidades:
+        mask &= df['GRAVIDADE_INFRACAO'].isin(gravidades)
+    if doc_type:
+        mask &= df['DOC_TYPE'] == doc_type
+    return df[mask]
+
+
+def test_apply_matches_masks(make_dataset):
+    df = make_dataset()
+    index = FilterIndex(df)
+    for filters in [
+        {'years': [2025]},
+        {'ufs': ['PA', 'AM'], 'tipos': ['FAUNA']},
+        {'years': [2024, 2025], 'ufs': ['MT'], 'gravidades': ['Grave'], 'doc_type': 'CNPJ'},
+        {'tipos': ['flora', 'Pesca'], 'doc_type': 'CPF'},
+        {'ufs': ['SP']},  # valor ausente da base
+    ]:
+        pd.testing.assert_frame_equal(index.apply(df, filters), masked(df, **filters))
+
+
+def test_without_filters_returns_same_frame(make_dataset):
+    df = make_dataset()
+    index = FilterIndex(df)
+    assert index.apply(df, {}) is df
+    assert index.apply(df, {'years': [], 'ufs': None}) is df
+
+
+def test_matches_only_indexed_frame(make_dataset):
+    df = make_dataset()
+    index = FilterIndex(df)
+    assert index.matches(df)
+    assert not index.matches(df.copy())
+    assert not index.matches(df.iloc[:100])
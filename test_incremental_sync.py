@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Testes da sincronização incremental (src/utils/incremental_sync.py), sem rede:
+o Supabase é substituído por um cliente falso que registra as remoções.
+"""
+
+import httpx
+import pandas as pd
+import pytest
+from postgrest.exceptions import APIError
+
+from src.utils.incremental_sync import add_row_hashes, apply_sync_deletes, build_sync_plan, diff_against_stored
+from src.utils.serialization import dataframe_to_records
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+        self._ids = None
+
+    def select(self, columns, **kwargs):
+        if self.client.error is not None:
+            raise self.client.error
+        unknown = set(columns.split(',')) - set(self.client.rows[0])
+        if unknown:
+            raise APIError({'code': '42703', 'message': f"column ibama_infracao.{unknown.pop()} does not exist"})
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def delete(self):
+        return self
+
+    def in_(self, column, values):
+        self._ids = list(values)
+        return self
+
+    def execute(self):
+        if self._ids is not None:
+            self.client.deleted.extend(self._ids)
+            return type('Result', (), {'data': []})()
+        start, end = getattr(self, '_range', (0, 0))
+        return type('Result', (), {'data': self.client.rows[start:end + 1]})()
+
+
+class FakeSupabase:
+    """Tabela com id, NUM_AUTO_INFRACAO e DT_ULT_ALTERACAO, como o PostgREST devolve."""
+
+    def __init__(self, rows, error=None):
+        self.rows = rows
+        self.deleted = []
+        self.error = error
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def stored_rows(csv):
+    """As linhas do CSV como voltam do banco: chave numérica e data ISO com fuso."""
+    return [
+        {'id': i + 1, 'NUM_AUTO_INFRACAO': float(key),
+         'DT_ULT_ALTERACAO': pd.Timestamp(changed).tz_localize('UTC').isoformat()}
+        for i, (key, changed) in enumerate(zip(csv['NUM_AUTO_INFRACAO'], csv['DT_ULT_ALTERACAO']))
+    ]
+
+
+CSV = pd.DataFrame({
+    'NUM_AUTO_INFRACAO': ['1001', '1002', '1003', '1004'],
+    'DT_ULT_ALTERACAO': ['2024-05-01 10:00:00', '2024-05-02 11:30:00', '2024-06-01 00:00:00', '2025-01-15 08:00:00'],
+    'UF': ['PA', 'AM', 'MT', 'PA'],
+})
+
+
+def test_round_trip_is_unchanged():
+    plan = diff_against_stored(CSV, pd.DataFrame(stored_rows(CSV)))
+    assert plan['to_upsert'].empty
+    assert plan['unchanged'] == len(CSV)
+    assert plan['replace_ids'] == {} and plan['vanished_ids'] == []
+
+
+def test_changed_new_and_vanished():
+    supabase = FakeSupabase(stored_rows(CSV))
+    new_csv = CSV.copy()
+    new_csv.loc[1, 'DT_ULT_ALTERACAO'] = '2024-07-01 09:00:00'
+    new_csv = pd.concat([new_csv.drop(index=3), pd.DataFrame({
+        'NUM_AUTO_INFRACAO': ['1005'], 'DT_ULT_ALTERACAO': ['2025-02-01 00:00:00'], 'UF': ['AC']})])
+
+    plan = build_sync_plan(supabase, 'ibama_infracao', new_csv)
+    assert sorted(plan['to_upsert']['NUM_AUTO_INFRACAO']) == ['1002', '1005']
+    assert plan['replace_ids'] == {'1002': [2]}
+    assert plan['vanished_ids'] == [4]
+    # Nada é removido antes da carga
+    assert supabase.deleted == []
+
+    apply_sync_deletes(supabase, 'ibama_infracao', plan, failed_keys=[])
+    assert supabase.deleted == [2, 4]
+
+
+def test_failed_reinsert_keeps_old_row():
+    supabase = FakeSupabase(stored_rows(CSV))
+    new_csv = CSV.copy()
+    new_csv['DT_ULT_ALTERACAO'] = '2026-01-01 00:00:00'
+
+    plan = build_sync_plan(supabase, 'ibama_infracao', new_csv)
+    assert plan['changed'] == len(CSV)
+
+    # O loader devolve as chaves como foram enviadas (aqui, numéricas)
+    apply_sync_deletes(supabase, 'ibama_infracao', plan, failed_keys=[1001.0, '1003'])
+    assert sorted(supabase.deleted) == [2, 4]
+
+
+def test_full_load_then_incremental_is_unchanged():
+    # Tabela com a coluna ROW_HASH, ainda com uma linha da carga anterior
+    supabase = FakeSupabase([{'id': 1, 'NUM_AUTO_INFRACAO': 1.0, 'DT_ULT_ALTERACAO': None, 'ROW_HASH': None}])
+
+    # Recarga completa (SYNC_MODE=full): o hash vai junto com as linhas
+    loaded = add_row_hashes(supabase, 'ibama_infracao', CSV)
+    assert loaded['ROW_HASH'].notna().all()
+    supabase.rows = [dict(record, **stored) for record, stored in zip(dataframe_to_records(loaded), stored_rows(CSV))]
+
+    plan = build_sync_plan(supabase, 'ibama_infracao', CSV)
+    assert plan['changed'] == 0
+    assert plan['to_upsert'].empty
+    assert plan['unchanged'] == len(CSV)
+
+
+@pytest.mark.parametrize('error', [
+    httpx.ReadTimeout('timed out'),
+    APIError({'code': '503', 'message': 'Service Unavailable'}),
+    APIError({'code': 'PGRST301', 'message': 'JWT expired'}),
+])
+def test_failed_column_check_is_not_a_missing_column(error):
+    supabase = FakeSupabase(stored_rows(CSV), error=error)
+    with pytest.raises(type(error)):
+        add_row_hashes(supabase, 'ibama_infracao', CSV)
+    with pytest.raises(type(error)):
+        build_sync_plan(supabase, 'ibama_infracao', CSV)
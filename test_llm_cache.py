@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Testes do cache de respostas dos LLMs (src/utils/llm_cache.py), sem rede:
+o provedor é substituído por um stub que conta as chamadas.
+"""
+
+from src.utils.llm_cache import LLMCache, normalize_prompt
+from src.utils.llm_integration import LLMIntegration
+
+
+class StubLLM(LLMIntegration):
+    """LLMIntegration com um provedor falso em vez das APIs."""
+
+    def __init__(self, cache: LLMCache):
+        super().__init__(database=None)
+        self.llm_cache = cache
+        self.calls = []
+
+    def get_available_providers(self):
+        return {"groq": True, "gemini": True}
+
+    def _call_provider(self, provider, prompt, system_prompt, temperature, max_tokens):
+        self.calls.append((provider, prompt, temperature, max_tokens))
+        return f"SELECT COUNT(*) FROM ibama_infracao -- resposta {len(self.calls)}"
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Quantas   infrações no PARÁ?  ") == normalize_prompt("quantas infrações no pará")
+
+
+def test_repeated_question_uses_cache(tmp_path):
+    llm = StubLLM(LLMCache(str(tmp_path)))
+
+    first = llm.generate_sql("Quantas infrações em 2025?", "groq")
+    again = llm.generate_sql("quantas  infrações em 2025", "groq")
+
+    assert first == again
+    assert len(llm.calls) == 1
+    assert llm.llm_cache.stats()['hits'] == 1
+
+    # Outro provedor ou outros parâmetros são outra chave
+    llm.generate_sql("Quantas infrações em 2025?", "gemini")
+    llm.generate_sql("Quantas infrações em 2025?", "groq", max_tokens=200)
+    assert len(llm.calls) == 3
+
+
+def test_cache_survives_new_instance(tmp_path):
+    StubLLM(LLMCache(str(tmp_path))).generate_sql("Top 5 estados", "groq")
+
+    llm = StubLLM(LLMCache(str(tmp_path)))
+    llm.generate_sql("Top 5 estados", "groq")
+    assert llm.calls == []
+
+
+def test_nonzero_temperature_bypasses_cache(tmp_path):
+    llm = StubLLM(LLMCache(str(tmp_path)))
+    llm.generate_analysis("Explique os dados", "groq", temperature=0.3)
+    llm.generate_analysis("Explique os dados", "groq", temperature=0.3)
+    assert len(llm.calls) == 2
+
+    llm = StubLLM(LLMCache(str(tmp_path), cache_nonzero_temperature=True))
+    llm.generate_analysis("Explique os dados", "groq", temperature=0.3)
+    llm.generate_analysis("Explique os dados", "groq", temperature=0.3)
+    assert len(llm.calls) == 1
+
+
+def test_schema_change_invalidates(tmp_path):
+    llm = StubLLM(LLMCache(str(tmp_path)))
+    llm.generate_sql("Top 5 estados", "groq")
+    llm._get_system_prompt = lambda: "esquema novo"
+    llm.generate_sql("Top 5 estados", "groq")
+    assert len(llm.calls) == 2
+
+
+def test_size_bound(tmp_path):
+    cache = LLMCache(str(tmp_path), max_size_mb=0.01)
+    for i in range(50):
+        cache.put(LLMCache.make_key("groq", "modelo", f"pergunta {i}", 0.0, 500), "x" * 1000)
+    assert cache.stats()['size_mb'] <= 0.01
+    assert cache.get(LLMCache.make_key("groq", "modelo", "pergunta 49", 0.0, 500)) is not None
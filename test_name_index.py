@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de nomes e documentos (src/utils/name_index.py): a busca é
+conferida contra o fuzzywuzzy em todos os nomes distintos, e as linhas
+contra máscaras do pandas.
+"""
+
+import numpy as np
+from fuzzywuzzy import process
+
+from conftest import FIRST, LAST, offender_names
+from src.utils.documents import describe_documents
+from src.utils.name_index import MAX_CANDIDATES, NameIndex, normalize_names
+
+
+def assert_search_matches_full_scan(index, df, question, limit=5):
+    found = index.search(question, min_score=90, limit=limit)
+    expected = dict(process.extractBests(question, df['NOME_INFRATOR'].dropna().unique(),
+                                         score_cutoff=90, limit=None))
+
+    # Nomes empatados no escore podem sair em outra ordem: compara os escores e a pertinência
+    assert set(found) <= set(expected)
+    assert sorted((expected[name] for name in found), reverse=True) == \
+        sorted(expected.values(), reverse=True)[:limit]
+
+
+def test_search_matches_full_scan(make_dataset):
+    df = make_dataset()
+    index = NameIndex(df)
+    # 'Carlos Ribeiro' tem mais de 5 nomes acima do corte, com escores empatados
+    for question in ['josé da silva', 'Madeireira Santa Rosa', 'agropecuaria rio verde',
+                     'francisca costa gomes', 'Carlos Ribeiro', 'empresa inexistente']:
+        assert_search_matches_full_scan(index, df, question)
+
+
+def test_rows_for_names_matches_isin(make_dataset):
+    df = make_dataset()
+    index = NameIndex(df)
+    names = index.search('Carlos Ribeiro') + ['NOME QUE NAO EXISTE']
+    np.testing.assert_array_equal(index.rows_for_names(names), np.flatnonzero(df['NOME_INFRATOR'].isin(names)))
+    assert len(index.rows_for_names([])) == 0
+
+
+def test_rows_for_document_matches_mask(make_dataset):
+    df = make_dataset()
+    index = NameIndex(df)
+    keys = describe_documents(df['CPF_CNPJ_INFRATOR'])['DOC_KEY']
+
+    # Documentos gravados formatados e só com dígitos caem na mesma chave
+    for digits in keys.dropna().unique()[:20]:
+        np.testing.assert_array_equal(index.rows_for_document(digits), np.flatnonzero((keys == digits).to_numpy()))
+    assert len(index.rows_for_document('99999999999999')) == 0
+
+
+def test_tied_candidates_beyond_cap_are_all_scored(make_dataset):
+    # Centenas de nomes contêm 'CARLOS' e 'RIBEIRO': todos empatam em trigramas, e
+    # 'CARLOS SILVA RIBEIRO' (escore maior, palavras separadas) precisa entrar no grupo
+    tied = [f"CARLOS RIBEIRO {last} {first}{suffix}" for last in LAST for first in FIRST
+            for suffix in ('', ' FILHO', ' NETO', ' JUNIOR')]
+    assert len(tied) > MAX_CANDIDATES
+    names = offender_names() + tied
+    df = make_dataset(rows=len(names), names=names)
+    index = NameIndex(df)
+
+    def trigrams(name):
+        """Trigramas de cada palavra, sem trigramas entre palavras."""
+        padded = [f"  {word}  " for word in name.split()]
+        return {word[i:i + 3] for word in padded for i in range(len(word) - 2)}
+
+    wanted = trigrams('CARLOS RIBEIRO')
+    normalized = normalize_names(df['NOME_INFRATOR'].dropna().drop_duplicates())
+    expected = set(df['NOME_INFRATOR'].dropna().drop_duplicates()[normalized.map(lambda name: wanted <= trigrams(name))])
+    candidates = set(index.names[index.candidates('Carlos Ribeiro')])
+
+    # Nenhum empatado fica de fora por ser mais longo (o mais longo inclusive)
+    assert len(expected) > MAX_CANDIDATES
+    assert expected <= candidates
+    assert max(tied, key=len) in candidates
+    assert_search_matches_full_scan(index, df, 'Carlos Ribeiro')
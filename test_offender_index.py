@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de infratores (src/utils/offender_index.py): os rankings são
+conferidos contra um groupby do pandas sobre as linhas filtradas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.offender_index import OffenderIndex
+
+FILTERS = [
+    {},
+    {'years': [2024]},
+    {'ufs': ['PA', 'AM'], 'tipos': ['fauna']},
+    {'years': [2023, 2025], 'gravidades': ['Grave'], 'doc_type': 'CNPJ'},
+    {'ufs': ['MT'], 'years': [2024], 'tipos': ['Flora'], 'gravidades': ['Leve'], 'doc_type': 'CPF'},
+]
+
+
+def grouped_totals(df, by, years=None, ufs=None, tipos=None, gravidades=None, doc_type=None):
+    """Total por (nome, documento) nas linhas filtradas, como o chatbot fazia antes do índice."""
+    if years:
+        df = df[df['YEAR'].isin(years)]
+    if ufs:
+        df = df[df['UF'].isin(ufs)]
+    if tipos:
+        df = df[df['TIPO_INFRACAO'].astype(str).str.lower().isin([tipo.lower() for tipo in tipos])]
+    if gravidades:
+        df = df[df['GRAVIDADE_INFRACAO'].isin(gravidades)]
+    if doc_type:
+        df = df[df['DOC_TYPE'] == doc_type]
+    grouped = df.groupby(['NOME_INFRATOR', 'CPF_CNPJ_INFRATOR'], observed=True)
+    totals = grouped.size() if by == 'count' else grouped['VAL_AUTO_INFRACAO'].sum()
+    return totals[totals > 0].sort_values(ascending=False)
+
+
+def assert_top_matches(index, df, by, limit=10, **filters):
+    top = index.top(by=by, limit=limit, **filters)
+    expected = grouped_totals(df, by, **filters)
+
+    # Empates podem mudar quem entra no fim da lista: compara os totais e cada infrator devolvido
+    assert len(top) == min(limit, len(expected))
+    assert np.allclose(top[by].to_numpy(dtype=float), expected.head(limit).to_numpy(dtype=float))
+    for _, row in top.iterrows():
+        assert np.isclose(row[by], expected[(row['NOME_INFRATOR'], row['CPF_CNPJ_INFRATOR'])])
+
+
+def test_top_matches_groupby(make_dataset):
+    df = make_dataset()
+    index = OffenderIndex(df)
+    for filters in FILTERS:
+        for by in ('value', 'count'):
+            assert_top_matches(index, df, by, **filters)
+
+
+def test_updated_from_matches_rebuild(make_dataset):
+    df = make_dataset()
+    updated = OffenderIndex(df[df['id'] <= 2000]).updated_from(df)
+    assert updated is not None
+
+    rebuilt = OffenderIndex(df)
+    for filters in FILTERS:
+        for by in ('value', 'count'):
+            pd.testing.assert_frame_equal(updated.top(by=by, **filters), rebuilt.top(by=by, **filters))
+
+
+def test_updated_from_refuses_removed_rows(make_dataset):
+    df = make_dataset()
+    index = OffenderIndex(df[df['id'] <= 2000])
+    # Linhas antigas removidas: a contagem não fecha e o índice precisa ser refeito
+    assert index.updated_from(df[df['id'] > 100]) is None
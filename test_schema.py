@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Testes do esquema canônico (src/utils/schema.py) de que dependem o cubo e os
+índices do chatbot: tipos, tratamento de nulos e vazios e a marca
+`normalized` que evita normalizar duas vezes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.documents import STRING_DTYPE
+from src.utils.schema import CATEGORY_COLUMNS, normalize_dataset
+
+RAW = pd.DataFrame({
+    'id': [1, 2, 3, 4],
+    'NUM_AUTO_INFRACAO': ['A1', 'A2', 'A3', 'A4'],
+    'UF': [' PA ', '', None, 'AM'],
+    'MUNICIPIO': ['ALTAMIRA', 'MANAUS ', np.nan, '  '],
+    'TIPO_INFRACAO': ['Flora', 'Fauna', 'Flora', None],
+    'GRAVIDADE_INFRACAO': ['Leve', None, '', 'Grave'],
+    'DES_STATUS_FORMULARIO': ['Lavrado', 'Julgado', 'Lavrado', 'Lavrado'],
+    'NOME_INFRATOR': ['  JOSÉ DA SILVA ', '', None, 'MADEIREIRA LTDA'],
+    'CPF_CNPJ_INFRATOR': ['123.456.789-01', '', None, '12.345.678/0001-95'],
+    'VAL_AUTO_INFRACAO': ['1500,50', '2000.25', '', 'abc'],
+    'DAT_HORA_AUTO_INFRACAO': ['2024-05-01 10:00:00', 'data inválida', None, '2023-12-31 23:59:59'],
+    'NUM_LATITUDE_AUTO': ['-3,2', '-3.1', '', None],
+    'NUM_LONGITUDE_AUTO': ['-52,2', '-60.0', None, ''],
+}, dtype=object)
+
+
+def present(series: pd.Series) -> list:
+    """Valores da coluna com qualquer nulo (None, NaN, pd.NA) trocado por None."""
+    return [value if pd.notna(value) else None for value in series.astype(object)]
+
+
+def test_dtypes():
+    df = normalize_dataset(RAW)
+    assert df['YEAR'].dtype == 'int16'
+    assert df['MONTH'].dtype == 'int8'
+    assert df['VAL_AUTO_INFRACAO'].dtype == 'float64'
+    assert df['DAT_HORA_AUTO_INFRACAO'].dtype.kind == 'M'
+    assert df['NUM_LATITUDE_AUTO'].dtype == 'float32'
+    assert df['NUM_LONGITUDE_AUTO'].dtype == 'float32'
+    for col in CATEGORY_COLUMNS + ['DOC_TYPE']:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    assert df['NOME_INFRATOR'].dtype == STRING_DTYPE
+    assert df['CPF_CNPJ_INFRATOR'].dtype == STRING_DTYPE
+
+
+def test_values_and_nulls():
+    df = normalize_dataset(RAW)
+    assert df['YEAR'].tolist() == [2024, 0, 0, 2023]
+    assert df['MONTH'].tolist() == [5, 0, 0, 12]
+    assert present(df['VAL_AUTO_INFRACAO']) == [1500.5, 2000.25, None, None]
+    assert present(df['UF']) == ['PA', None, None, 'AM']
+    assert present(df['MUNICIPIO']) == ['ALTAMIRA', 'MANAUS', None, None]
+    assert present(df['GRAVIDADE_INFRACAO']) == ['Leve', None, None, 'Grave']
+    assert present(df['NOME_INFRATOR']) == ['JOSÉ DA SILVA', None, None, 'MADEIREIRA LTDA']
+    assert present(df['CPF_CNPJ_INFRATOR']) == ['123.456.789-01', None, None, '12.345.678/0001-95']
+    assert df['DOC_TYPE'].tolist() == ['CPF', 'OUTRO', 'OUTRO', 'CNPJ']
+    assert present(df['NUM_LATITUDE_AUTO'].astype('float64').round(1)) == [-3.2, -3.1, None, None]
+    # Vazios não viram categorias
+    assert '' not in df['UF'].cat.categories
+
+
+def test_does_not_modify_input():
+    before = RAW.copy()
+    normalize_dataset(RAW)
+    pd.testing.assert_frame_equal(RAW, before)
+    assert not RAW.attrs.get('normalized')
+
+
+def test_second_call_is_a_no_op():
+    df = normalize_dataset(RAW)
+    assert df.attrs['normalized'] is True
+    assert normalize_dataset(df) is df
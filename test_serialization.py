@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Testes da serialização vetorizada (src/utils/serialization.py) contra a
+conversão por célula que os scripts de upload usavam antes
+(make_json_serializable), numa base com textos, números, datas e nulos.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils.serialization import dataframe_to_records, serialize_dataframe
+
+
+def make_json_serializable(obj):
+    """Conversão célula a célula antiga de upload_to_supabase.py."""
+    if pd.isna(obj):
+        return None
+    elif isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    elif isinstance(obj, str):
+        cleaned = obj.strip()
+        return cleaned if cleaned else None
+    return obj
+
+
+MIXED = pd.DataFrame({
+    'NOME_INFRATOR': ['  JOSÉ DA SILVA ', '', None, np.nan, 'MARIA'],
+    'UF': pd.Categorical(['PA', 'AM', None, 'PA', ' MT']),
+    'id': np.array([1, 2, 3, 4, 5], dtype='int64'),
+    'QT_AREA': [1.5, np.nan, 2.0, 0.25, 10.0],
+    'SIT_CANCELADO': np.array([True, False, True, False, True]),
+    'DAT_HORA_AUTO_INFRACAO': pd.to_datetime(['2024-05-01 10:00:00', None, '2023-12-31 23:59:59',
+                                              '2025-01-02 00:00:00', None]),
+    'COD_MUNICIPIO': ['1500602', '', None, '1302603.0', 'abc'],
+    'SEQ_AUTO_INFRACAO': [10.0, np.nan, 30.0, 40.0, 50.0],
+})
+
+
+def test_records_match_legacy_conversion():
+    records = dataframe_to_records(MIXED.drop(columns=['COD_MUNICIPIO', 'SEQ_AUTO_INFRACAO']))
+    for row, record in zip(MIXED.itertuples(index=False), records):
+        for column, value in record.items():
+            expected = make_json_serializable(getattr(row, column))
+            assert value == expected and type(value) is type(expected), (column, value, expected)
+
+
+def test_missing_values_become_none():
+    records = dataframe_to_records(MIXED)
+    assert records[2]['NOME_INFRATOR'] is None  # None
+    assert records[3]['NOME_INFRATOR'] is None  # NaN
+    assert records[2]['UF'] is None
+    assert records[1]['QT_AREA'] is None
+    assert records[1]['DAT_HORA_AUTO_INFRACAO'] is None  # NaT
+    assert records[1]['SEQ_AUTO_INFRACAO'] is None
+
+
+def test_numeric_columns_send_integral_values_as_int():
+    records = dataframe_to_records(MIXED, numeric_columns={'COD_MUNICIPIO', 'SEQ_AUTO_INFRACAO'})
+    assert [record['COD_MUNICIPIO'] for record in records] == [1500602, None, None, 1302603, None]
+    assert [record['SEQ_AUTO_INFRACAO'] for record in records] == [10, None, 30, 40, 50]
+    sent = [record['SEQ_AUTO_INFRACAO'] for record in records] + [record['COD_MUNICIPIO'] for record in records]
+    assert all(type(value) is int for value in sent if value is not None)
+    # Colunas com frações continuam float
+    assert dataframe_to_records(MIXED, numeric_columns={'QT_AREA'})[3]['QT_AREA'] == 0.25
+
+
+def test_datetimes_are_formatted():
+    values = [record['DAT_HORA_AUTO_INFRACAO'] for record in dataframe_to_records(MIXED)]
+    assert values == ['2024-05-01 10:00:00', None, '2023-12-31 23:59:59', '2025-01-02 00:00:00', None]
+
+
+def test_text_is_stripped_and_empty_becomes_none():
+    records = dataframe_to_records(MIXED)
+    assert [record['NOME_INFRATOR'] for record in records] == ['JOSÉ DA SILVA', None, None, None, 'MARIA']
+    assert records[4]['UF'] == 'MT'
+
+
+def test_stringify_sends_trimmed_text():
+    df = pd.DataFrame({
+        'VAL_AUTO_INFRACAO': [' 1500,50 ', '', '   ', None, np.nan],
+        'id': [1, 2, 3, 4, 5],
+        'QT_AREA': [1.5, np.nan, 2.0, 3.0, 4.0],
+    })
+    serialized = serialize_dataframe(df, stringify=True)
+    assert serialized['VAL_AUTO_INFRACAO'].tolist() == ['1500,50', None, None, None, None]
+    assert serialized['id'].tolist() == ['1', '2', '3', '4', '5']
+    assert serialized['QT_AREA'].tolist() == ['1.5', None, '2.0', '3.0', '4.0']
+    # Rodar de novo sobre o resultado não muda nada (o script serializa e depois gera os registros)
+    assert dataframe_to_records(serialized, stringify=True) == serialized.to_dict('records')
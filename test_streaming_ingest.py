@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Testes da ingestão em streaming do ZIP para o DuckDB
+(DataLoader.download_and_process_streaming), sem rede: o download devolve
+um ZIP montado em memória, em blocos.
+"""
+
+import io
+import zipfile
+from types import SimpleNamespace
+
+import duckdb
+import pytest
+
+from src.utils import data_loader
+from src.utils.data_loader import DataLoader
+
+# 2024 tem uma coluna vazia no primeiro lote e texto depois; 2025 traz uma coluna a mais
+CSV_2024 = (
+    "NUM_AUTO_INFRACAO;UF;QT_AREA\n"
+    "1001;PA;\n"
+    "1002;AM;\n"
+    "1003;MT;12,5 ha\n"
+    "1004;PA;\n"
+    "1005;AC;sem medição\n"
+)
+CSV_2025 = (
+    "NUM_AUTO_INFRACAO;UF;QT_AREA;DT_ULT_ALTERACAO\n"
+    "2001;PA;3;2025-01-02 10:00:00\n"
+    "2002;RO;;2025-02-03 11:00:00\n"
+)
+
+
+def build_zip(members: dict, corrupt: str = None) -> bytes:
+    """ZIP sem compressão; `corrupt` tem um byte alterado (falha de CRC ao ler até o fim)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as z:
+        for name, text in members.items():
+            z.writestr(name, text)
+    content = buffer.getvalue()
+    if corrupt:
+        data = members[corrupt].encode()
+        offset = content.index(data) + len(data) - 2
+        content = content[:offset] + b'X' + content[offset + 1:]
+    return content
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.chunk_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+@pytest.fixture(name='make_loader')
+def make_loader_fixture(tmp_path, monkeypatch):
+    """
+    DataLoader com o banco do app em arquivo (memory_limit de 1GB), lotes de
+    2 linhas e o download substituído. `loader.staging_configs` guarda a
+    configuração de cada banco aberto pela ingestão.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def make(content: bytes):
+        response = FakeResponse(content)
+        monkeypatch.setattr(data_loader.requests, 'get', lambda *args, **kwargs: response)
+        database = SimpleNamespace(connection=duckdb.connect(str(tmp_path / 'app.duckdb')))
+        database.connection.execute("SET memory_limit = '1GB'")
+        staging_configs = []
+        original_connect = duckdb.connect
+
+        def connect(path, config=None):
+            staging_configs.append(config)
+            return original_connect(path, config=config)
+
+        monkeypatch.setattr(data_loader.duckdb, 'connect', connect)
+        loader = DataLoader(database=database, streaming=True, max_memory_mb=64)
+        loader.zip_url = 'https://example.invalid/auto_infracao_csv.zip'
+        loader.download_chunk_bytes = 64
+        monkeypatch.setattr(loader, '_rows_per_chunk', lambda: 2)
+        loader.staging_configs = staging_configs
+        return loader, response
+
+    return make
+
+
+def test_loads_members_as_varchar_and_replaces_table(make_loader, tmp_path):
+    loader, response = make_loader(build_zip({
+        'auto_infracao_ano_2024.csv': CSV_2024,
+        'auto_infracao_ano_2025.csv': CSV_2025,
+        'auto_infracao_ano_2019.csv': "NUM_AUTO_INFRACAO;UF\n9001;SP\n",
+    }))
+    connection = loader.database.connection
+    connection.execute("CREATE TABLE ibama_infracao AS SELECT 'antigo' AS NUM_AUTO_INFRACAO")
+    memory_limit = connection.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+
+    assert loader.download_and_process() is True
+
+    rows = connection.execute(
+        'SELECT "NUM_AUTO_INFRACAO", "QT_AREA", "DT_ULT_ALTERACAO" FROM ibama_infracao ORDER BY 1'
+    ).fetchall()
+    assert [row[0] for row in rows] == ['1001', '1002', '1003', '1004', '1005', '2001', '2002']
+    assert rows[2][1] == '12,5 ha' and rows[4][1] == 'sem medição'
+    assert rows[0][2] is None and rows[5][2] == '2025-01-02 10:00:00'
+
+    types = dict(connection.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = 'ibama_infracao'"
+    ).fetchall())
+    assert set(types.values()) == {'VARCHAR'}
+
+    tables = {row[0] for row in connection.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    assert tables == {'ibama_infracao'}
+
+    # O teto vale só para o banco temporário da ingestão; o do app não muda
+    assert loader.staging_configs == [{'memory_limit': '64MB'}]
+    assert connection.execute("SELECT current_setting('memory_limit')").fetchone()[0] == memory_limit
+
+    # O ZIP foi baixado em blocos para um arquivo temporário
+    assert response.chunk_sizes == [64]
+    # O ZIP e o banco temporário (com .wal e spill) foram removidos
+    assert list((tmp_path / 'data').iterdir()) == []
+
+
+def test_failed_member_keeps_table_and_memory_limit(make_loader, tmp_path):
+    loader, _ = make_loader(build_zip({
+        'auto_infracao_ano_2024.csv': CSV_2024,
+        'auto_infracao_ano_2025.csv': CSV_2025,
+    }, corrupt='auto_infracao_ano_2025.csv'))
+    connection = loader.database.connection
+    memory_limit = connection.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+    connection.execute("CREATE TABLE ibama_infracao AS SELECT 'antigo' AS NUM_AUTO_INFRACAO")
+
+    assert loader.download_and_process() is False
+
+    assert connection.execute('SELECT * FROM ibama_infracao').fetchall() == [('antigo',)]
+    tables = {row[0] for row in connection.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    assert tables == {'ibama_infracao'}
+    assert loader.staging_configs == [{'memory_limit': '64MB'}]
+    assert connection.execute("SELECT current_setting('memory_limit')").fetchone()[0] == memory_limit
+    assert list((tmp_path / 'data').iterdir()) == []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Testes da varredura por keyset (src/utils/supabase_utils.py) com um cliente
+falso: faixas com o mesmo número de registros e progresso pela contagem
+exata, mesmo com buracos nos ids.
+"""
+
+from src.utils.supabase_utils import SupabasePaginator
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.rows = client.rows
+        self.columns = None
+        self.count = None
+
+    def select(self, columns, count=None):
+        self.columns = columns.split(',')
+        self.count = count
+        return self
+
+    def order(self, column, desc=False):
+        self.rows = sorted(self.rows, key=lambda row: row[column], reverse=desc)
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] <= value]
+        return self
+
+    def limit(self, size):
+        self.rows = self.rows[:size]
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        data = [dict(row) if self.columns == ['*'] else {column: row[column] for column in self.columns}
+                for row in self.rows]
+        return type('Result', (), {'data': data, 'count': len(self.client.rows) if self.count else None})()
+
+
+class FakeSupabase:
+    def __init__(self, ids):
+        self.rows = [{'id': i, 'UF': 'PA'} for i in ids]
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def make_paginator(supabase, workers=4, page_size=100):
+    paginator = SupabasePaginator(supabase)
+    paginator.max_workers = workers
+    paginator.page_size = page_size
+    paginator.base_delay = 0
+    return paginator
+
+
+def test_keyset_reads_every_row_once_with_id_gaps():
+    # Um bloco denso de ids e uma cauda esparsa: faixas por id ficariam desiguais
+    ids = list(range(1, 2001)) + list(range(100_000, 1_000_000, 1000))
+    paginator = make_paginator(FakeSupabase(ids))
+    progress = []
+    paginator.on_progress = lambda rows, total: progress.append((rows, total))
+
+    records = paginator._fetch_all_keyset('ibama_infracao', 'UF')
+
+    assert [record['id'] for record in records] == ids
+    assert progress[0] == (0, len(ids))
+    assert sum(rows for rows, _ in progress) == len(ids)
+
+
+def test_keyset_ranges_follow_row_positions():
+    ids = list(range(1, 2001)) + list(range(100_000, 1_000_000, 1000))
+    paginator = make_paginator(FakeSupabase(ids))
+    calls = []
+    fetch_range = paginator._fetch_id_range
+    paginator._fetch_id_range = lambda *args: calls.append(args[2:]) or fetch_range(*args)
+
+    paginator._fetch_all_keyset('ibama_infracao', 'UF', total=len(ids))
+
+    sizes = [sum(after < i <= until for i in ids) for after, until in calls]
+    assert len(calls) == 16
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_keyset_small_table_uses_single_range():
+    paginator = make_paginator(FakeSupabase([3, 7, 50]))
+    progress = []
+    paginator.on_progress = lambda rows, total: progress.append((rows, total))
+
+    records = paginator._fetch_all_keyset('ibama_infracao', '*')
+
+    assert [record['id'] for record in records] == [3, 7, 50]
+    assert progress[0] == (0, 3)
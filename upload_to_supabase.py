@@ -1,6 +1,5 @@
 import pandas as pd
 from supabase import create_client, Client
-import time
 import os
 import sys
 import zipfile
@@ -11,10 +10,12 @@ import ssl
 from urllib.request import urlopen, Request
 import subprocess
 import json
-import numpy as np
-from datetime import datetime
 import re
 
+from src.utils.bulk_loader import SupabaseBulkLoader
+from src.utils.incremental_sync import KEY_COLUMN, add_row_hashes, apply_sync_deletes, build_sync_plan
+from src.utils.serialization import dataframe_to_records
+
 print("🌳 Iniciando processo de upload FINAL CORRIGIDO...")
 
 # --- 1. Configuração de variáveis de ambiente ---
@@ -32,10 +33,16 @@ IBAMA_ZIP_URL = get_env_var(
     "IBAMA_ZIP_URL", 
     "https://dadosabertos.ibama.gov.br/dados/SIFISC/auto_infracao/auto_infracao/auto_infracao_csv.zip"
 )
+# 'full' apaga e recarrega a tabela; 'incremental' envia apenas o delta
+SYNC_MODE = os.getenv("SYNC_MODE", "full").strip().lower()
+# Paralelismo e lote inicial da carga (o lote se ajusta durante o envio)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
 
 print(f"Configurações carregadas:")
 print(f"  - Supabase URL: {SUPABASE_URL[:50]}...")
 print(f"  - IBAMA ZIP URL: {IBAMA_ZIP_URL}")
+print(f"  - Modo de sincronização: {SYNC_MODE}")
 
 # --- 2. Schema Real do Supabase (baseado no arquivo fornecido) ---
 def get_real_supabase_columns(supabase: Client) -> set:
@@ -190,27 +197,13 @@ def download_with_requests_http(url):
     return response.content
 
 # --- 4. Processamento com sincronização de schema ---
-def make_json_serializable(obj):
-    """Converte objetos para tipos serializáveis em JSON."""
-    if pd.isna(obj):
-        return None
-    elif isinstance(obj, (pd.Timestamp, datetime)):
-        return obj.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(obj) else None
-    elif isinstance(obj, (np.integer, np.int64)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64)):
-        if np.isnan(obj):
-            return None
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, bytes):
-        return obj.decode('utf-8', errors='ignore')
-    elif isinstance(obj, str):
-        cleaned = str(obj).strip()
-        return cleaned if cleaned else None
-    else:
-        return str(obj) if obj is not None else None
+# Colunas numéricas conhecidas: convertidas com pd.to_numeric na serialização
+NUMERIC_COLUMNS = {
+    'CD_RECEITA_AUTO_INFRACAO', 'SEQ_AUTO_INFRACAO', 'COD_MUNICIPIO', 
+    'COD_INFRACAO', 'NUM_PROCESSO', 'NUM_PESSOA_INFRATOR',
+    'SEQ_NOTIFICACAO', 'SEQ_ACAO_FISCALIZATORIA', 'SEQ_ORDEM_FISCALIZACAO',
+    'SEQ_SOLICITACAO_RECURSO', 'SOLICITACAO_RECURSO'
+}
 
 def sync_dataframe_with_supabase(df: pd.DataFrame, supabase_columns: set) -> pd.DataFrame:
     """Sincroniza DataFrame com colunas reais do Supabase."""
@@ -260,24 +253,8 @@ def sync_dataframe_with_supabase(df: pd.DataFrame, supabase_columns: set) -> pd.
     
     print(f"\n✅ DataFrame sincronizado: {len(df_synced)} registros, {len(df_synced.columns)} colunas")
     
-    # Processa cada coluna para garantir compatibilidade
-    for col in df_synced.columns:
-        df_synced[col] = df_synced[col].apply(make_json_serializable)
-        
-        # Tratamento especial para colunas numéricas conhecidas
-        numeric_columns = {
-            'CD_RECEITA_AUTO_INFRACAO', 'SEQ_AUTO_INFRACAO', 'COD_MUNICIPIO', 
-            'COD_INFRACAO', 'NUM_PROCESSO', 'NUM_PESSOA_INFRATOR',
-            'SEQ_NOTIFICACAO', 'SEQ_ACAO_FISCALIZATORIA', 'SEQ_ORDEM_FISCALIZACAO',
-            'SEQ_SOLICITACAO_RECURSO', 'SOLICITACAO_RECURSO'
-        }
-        
-        if col in numeric_columns:
-            try:
-                df_synced[col] = pd.to_numeric(df_synced[col], errors='coerce')
-                df_synced[col] = df_synced[col].where(pd.notna(df_synced[col]), None)
-            except:
-                print(f"    ⚠️ Erro na conversão numérica de {col}")
+    # A conversão para JSON (NaN, numpy, datas, textos) é feita por coluna,
+    # de forma vetorizada, no momento do upload - ver src/utils/serialization.py
     
     # Valida colunas essenciais
     essential_columns = {'NUM_AUTO_INFRACAO', 'UF', 'TIPO_INFRACAO'}
@@ -374,61 +351,11 @@ def download_and_process_data(supabase_columns: set):
         raise
 
 # --- 6. Upload otimizado ---
-def safe_upload_batch(supabase: Client, table_name: str, data_batch: list, batch_index: int):
-    """Upload seguro de um lote com debug detalhado."""
-    try:
-        # Limpa registros
-        cleaned_batch = []
-        for record in data_batch:
-            cleaned_record = {}
-            for key, value in record.items():
-                if key and key.strip():
-                    if pd.isna(value):
-                        cleaned_record[key] = None
-                    elif isinstance(value, (list, dict)):
-                        cleaned_record[key] = json.dumps(value) if value else None
-                    else:
-                        cleaned_record[key] = value
-            cleaned_batch.append(cleaned_record)
-        
-        # Upload
-        response = supabase.table(table_name).insert(cleaned_batch).execute()
-        
-        if hasattr(response, 'error') and response.error:
-            raise Exception(f"Erro da API: {response.error}")
-        
-        return True, len(cleaned_batch)
-        
-    except Exception as e:
-        error_msg = str(e)
-        
-        # Debug detalhado para primeiros erros
-        if batch_index <= 5:
-            print(f"\n🔍 DEBUG - Lote {batch_index}:")
-            print(f"  Tamanho: {len(data_batch)} registros")
-            print(f"  Colunas: {len(data_batch[0].keys())} colunas")
-            print(f"  Erro: {error_msg[:400]}...")
-            
-            # Mostra as primeiras 10 colunas do registro problemático
-            if data_batch:
-                first_record_keys = list(data_batch[0].keys())[:10]
-                print(f"  Primeiras colunas: {first_record_keys}")
-            
-            # Tenta identificar coluna específica no erro
-            if "could not find" in error_msg.lower():
-                import re
-                match = re.search(r"could not find the '([^']+)'", error_msg, re.IGNORECASE)
-                if match:
-                    problematic_column = match.group(1)
-                    print(f"  🚨 Coluna problemática: {problematic_column}")
-                    
-                    # Verifica se a coluna existe nos dados
-                    if data_batch and problematic_column in data_batch[0]:
-                        print(f"  📋 Coluna EXISTS nos dados - problema pode ser no schema do Supabase")
-                    else:
-                        print(f"  ❌ Coluna NOT EXISTS nos dados")
-        
-        return False, error_msg
+def explain_upload_error(error_msg: str):
+    """Tenta identificar a coluna responsável por um erro de schema."""
+    match = re.search(r"could not find the '([^']+)'", error_msg, re.IGNORECASE)
+    if match:
+        print(f"  🚨 Coluna problemática: {match.group(1)} - verifique o schema do Supabase")
 
 # --- 7. Execução principal ---
 try:
@@ -460,47 +387,51 @@ try:
         print(f"  ❌ Erro na serialização: {e}")
         raise
     
-    # Limpa tabela
-    print(f"🧹 Limpando tabela '{table_name}'...")
-    try:
-        delete_result = supabase.table(table_name).delete().neq('id', -1).execute()
-        print("  ✅ Tabela limpa")
-    except Exception as e:
-        print(f"  ⚠️ Aviso na limpeza: {e}")
-        print("  ⚠️ Continuando com upload...")
+    plan = None
+    if SYNC_MODE == "incremental":
+        # Envia apenas linhas novas/alteradas; as cópias antigas e as linhas que
+        # sumiram do CSV só são removidas depois da carga
+        plan = build_sync_plan(supabase, table_name, df)
+        df = plan['to_upsert']
+        
+        if df.empty:
+            apply_sync_deletes(supabase, table_name, plan)
+            print("✅ Nenhuma alteração a sincronizar - tabela já está atualizada")
+            sys.exit(0)
+    else:
+        # Grava o ROW_HASH já na carga completa para a próxima sincronização
+        # incremental; calculado antes de limpar a tabela, para que uma falha
+        # ao consultar a coluna não a deixe vazia
+        df = add_row_hashes(supabase, table_name, df)
+        
+        # Limpa tabela
+        print(f"🧹 Limpando tabela '{table_name}'...")
+        try:
+            delete_result = supabase.table(table_name).delete().neq('id', -1).execute()
+            print("  ✅ Tabela limpa")
+        except Exception as e:
+            print(f"  ⚠️ Aviso na limpeza: {e}")
+            print("  ⚠️ Continuando com upload...")
     
-    # Upload final em lotes pequenos
-    chunk_size = 25  # Lotes bem pequenos para debug completo
-    total_chunks = (len(df) // chunk_size) + 1
-    print(f"🚀 Upload FINAL: {len(df):,} registros em {total_chunks} lotes de {chunk_size}")
+    # Upload paralelo com lote adaptativo
+    loader = SupabaseBulkLoader(
+        supabase, table_name,
+        max_workers=UPLOAD_WORKERS,
+        initial_batch_size=UPLOAD_BATCH_SIZE,
+        max_failed_batches=10,  # Para após alguns erros para análise detalhada
+        key_column=KEY_COLUMN,
+    )
+    report = loader.load(dataframe_to_records(df, numeric_columns=NUMERIC_COLUMNS))
     
-    successful_uploads = 0
-    failed_uploads = 0
-    errors_log = []
+    if plan is not None:
+        apply_sync_deletes(supabase, table_name, plan, failed_keys=report['failed_keys'])
     
-    for i in range(0, len(df), chunk_size):
-        chunk_index = i // chunk_size + 1
-        print(f"  📤 Lote {chunk_index}/{total_chunks}...", end=" ")
-        
-        chunk = df[i:i + chunk_size]
-        data_to_insert = chunk.to_dict(orient='records')
-        
-        success, result = safe_upload_batch(supabase, table_name, data_to_insert, chunk_index)
-        
-        if success:
-            successful_uploads += result
-            print(f"✅ {result} registros")
-        else:
-            failed_uploads += len(data_to_insert)
-            errors_log.append(f"Lote {chunk_index}: {result}")
-            print(f"❌ Erro")
-            
-            # Para após alguns erros para análise detalhada
-            if chunk_index >= 10:
-                print(f"\n🛑 Parando após {chunk_index} tentativas para análise completa")
-                break
-        
-        time.sleep(0.05)  # Pausa mínima
+    successful_uploads = report['successful']
+    failed_uploads = report['failed']
+    errors_log = report['errors']
+    
+    for error_msg in errors_log[:5]:
+        explain_upload_error(error_msg)
     
     # Relatório final detalhado
     print(f"\n{'='*70}")
@@ -568,7 +499,7 @@ try:
         if failed_uploads > 0:
             print(f"\n💡 PARA RESOLVER REGISTROS COM FALHA:")
             print(f"  1. Analise os erros detalhados acima")
-            print(f"  2. Execute novamente com chunk_size menor")
+            print(f"  2. Execute novamente com UPLOAD_BATCH_SIZE menor")
             print(f"  3. Considere upload dos registros faltantes separadamente")
     else:
         print(f"\n💡 PARA RESOLVER OS PROBLEMAS:")
@@ -1,6 +1,5 @@
 import pandas as pd
 from supabase import create_client, Client
-import time
 import os
 import sys
 import zipfile
@@ -11,6 +10,10 @@ import ssl
 from urllib.request import urlopen
 from urllib.error import URLError
 
+from src.utils.bulk_loader import SupabaseBulkLoader
+from src.utils.incremental_sync import KEY_COLUMN, add_row_hashes, apply_sync_deletes, build_sync_plan
+from src.utils.serialization import dataframe_to_records
+
 print("Iniciando processo de upload para o Supabase...")
 
 # --- 1. Configuração de variáveis de ambiente ---
@@ -28,10 +31,16 @@ IBAMA_ZIP_URL = get_env_var(
     "IBAMA_ZIP_URL", 
     "https://dadosabertos.ibama.gov.br/dados/SIFISC/auto_infracao/auto_infracao/auto_infracao_csv.zip"
 )
+# 'full' apaga e recarrega a tabela; 'incremental' envia apenas o delta
+SYNC_MODE = os.getenv("SYNC_MODE", "full").strip().lower()
+# Paralelismo e lote inicial da carga (o lote se ajusta durante o envio)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
 
 print(f"Configurações carregadas:")
 print(f"  - Supabase URL: {SUPABASE_URL[:50]}...")
 print(f"  - IBAMA ZIP URL: {IBAMA_ZIP_URL}")
+print(f"  - Modo de sincronização: {SYNC_MODE}")
 
 # --- 2. Download e processamento dos dados ---
 def download_and_process_data():
@@ -124,9 +133,6 @@ def download_and_process_data():
             df = df[df['DAT_HORA_AUTO_INFRACAO'].dt.year.isin([2024, 2025, 2026])]
             print(f"Dados filtrados (2024-2026). Shape final: {df.shape}")
         
-        # Remove valores NaN que podem causar problemas no JSON
-        df = df.fillna('')
-        
         return df
         
     except Exception as e:
@@ -147,52 +153,47 @@ print("Conectando ao Supabase...")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 table_name = "ibama_infracao"
 
-# --- 5. Limpar a tabela existente ---
-print(f"Limpando a tabela '{table_name}' no Supabase...")
-try:
-    # Deleta todas as linhas da tabela
-    delete_response = supabase.table(table_name).delete().neq('id', -1).execute()
-    print("  Tabela limpa com sucesso.")
-except Exception as e:
-    print(f"❌ Erro ao limpar a tabela: {e}")
-    raise
-
-# --- 6. Upload dos dados em lotes ---
-chunk_size = 500
-total_chunks = (len(df) // chunk_size) + 1
-print(f"Iniciando upload de {len(df)} registros em {total_chunks} lotes de {chunk_size}...")
-
-successful_uploads = 0
-failed_uploads = 0
-
-for i in range(0, len(df), chunk_size):
-    chunk_index = i // chunk_size + 1
-    print(f"  Processando lote {chunk_index}/{total_chunks}...")
+# --- 5. Limpar a tabela existente (ou calcular o delta) ---
+plan = None
+if SYNC_MODE == "incremental":
+    # Envia apenas linhas novas/alteradas; as cópias antigas e as linhas que
+    # sumiram do CSV só são removidas depois da carga
+    plan = build_sync_plan(supabase, table_name, df)
+    df = plan['to_upsert']
     
-    chunk = df[i:i + chunk_size]
-    data_to_insert = chunk.to_dict(orient='records')
+    if df.empty:
+        apply_sync_deletes(supabase, table_name, plan)
+        print("✅ Nenhuma alteração a sincronizar - tabela já está atualizada.")
+        sys.exit(0)
+else:
+    # Grava o ROW_HASH já na carga completa para a próxima sincronização
+    # incremental; calculado antes de limpar a tabela, para que uma falha
+    # ao consultar a coluna não a deixe vazia
+    df = add_row_hashes(supabase, table_name, df)
     
+    print(f"Limpando a tabela '{table_name}' no Supabase...")
     try:
-        # Executa a inserção
-        response = supabase.table(table_name).insert(data_to_insert).execute()
-        
-        # Verifica se houve erro
-        if hasattr(response, 'error') and response.error:
-            raise Exception(f"Erro da API do Supabase: {response.error.message}")
-        
-        successful_uploads += len(data_to_insert)
-        print(f"  ✅ Lote {chunk_index} enviado com sucesso. {len(data_to_insert)} registros inseridos.")
-        
-        # Pausa para não sobrecarregar a API
-        time.sleep(1)
-        
+        # Deleta todas as linhas da tabela
+        delete_response = supabase.table(table_name).delete().neq('id', -1).execute()
+        print("  Tabela limpa com sucesso.")
     except Exception as e:
-        failed_uploads += len(data_to_insert)
-        print(f"  ❌ Falha no lote {chunk_index}: {e}")
-        
-        # Para uploads críticos, você pode querer interromper aqui
-        # raise
-        continue
+        print(f"❌ Erro ao limpar a tabela: {e}")
+        raise
+
+# --- 6. Upload dos dados em lotes paralelos ---
+loader = SupabaseBulkLoader(
+    supabase, table_name,
+    max_workers=UPLOAD_WORKERS,
+    initial_batch_size=UPLOAD_BATCH_SIZE,
+    key_column=KEY_COLUMN,
+)
+report = loader.load(dataframe_to_records(df))
+
+if plan is not None:
+    apply_sync_deletes(supabase, table_name, plan, failed_keys=report['failed_keys'])
+
+successful_uploads = report['successful']
+failed_uploads = report['failed']
 
 # --- 7. Relatório final ---
 print(f"\n{'='*50}")
@@ -1,6 +1,5 @@
 import pandas as pd
 from supabase import create_client, Client
-import time
 import os
 import sys
 import zipfile
@@ -11,9 +10,12 @@ import ssl
 from urllib.request import urlopen, Request
 import subprocess
 import json
-import numpy as np
 from datetime import datetime
 
+from src.utils.bulk_loader import SupabaseBulkLoader
+from src.utils.incremental_sync import KEY_COLUMN, add_row_hashes, apply_sync_deletes, build_sync_plan
+from src.utils.serialization import dataframe_to_records, serialize_dataframe
+
 print("🌳 IBAMA Upload SIMPLIFICADO - Apenas Colunas Existentes v3.1...")
 
 # --- 1. Configuração ---
@@ -21,6 +23,11 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 IBAMA_ZIP_URL = os.getenv("IBAMA_ZIP_URL", 
     "https://dadosabertos.ibama.gov.br/dados/SIFISC/auto_infracao/auto_infracao/auto_infracao_csv.zip")
+# 'full' apaga e recarrega a tabela; 'incremental' envia apenas o delta
+SYNC_MODE = os.getenv("SYNC_MODE", "full").strip().lower()
+# Paralelismo e lote inicial da carga (o lote se ajusta durante o envio)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
 
 # --- 2. DEFINIÇÃO MANUAL DAS COLUNAS PRINCIPAIS ---
 # Baseado no CSV verificado, usando apenas as colunas mais importantes
@@ -45,6 +52,7 @@ ESSENTIAL_COLUMNS = [
     'TP_PESSOA_INFRATOR',          # Tipo pessoa
     'MOTIVACAO_CONDUTA',           # Motivação
     'EFEITO_MEIO_AMBIENTE',        # Efeito ambiental
+    'DT_ULT_ALTERACAO',            # Última alteração (sincronização incremental)
 ]
 
 def test_supabase_columns(supabase_client):
@@ -137,8 +145,7 @@ def clean_data_simple(df, working_columns):
     print(f"📊 Registros: {len(df_filtered):,}")
     
     # Limpeza básica
-    for col in df_filtered.columns:
-        df_filtered[col] = df_filtered[col].apply(lambda x: None if pd.isna(x) else str(x).strip() if x != '' else None)
+    df_filtered = serialize_dataframe(df_filtered, stringify=True)
     
     return df_filtered
 
@@ -148,57 +155,50 @@ def upload_simple(df_clean, supabase_client):
     
     table_name = "ibama_infracao"
     
-    # Limpa tabela
-    try:
-        supabase_client.table(table_name).delete().neq('NUM_AUTO_INFRACAO', 'IMPOSSIBLE_VALUE').execute()
-        print("✅ Tabela limpa")
-    except Exception as e:
-        print(f"⚠️ Aviso ao limpar: {e}")
-    
-    # Upload em lotes pequenos
-    chunk_size = 100  # Bem pequeno para máxima compatibilidade
-    successful = 0
-    failed = 0
-    
-    for i in range(0, len(df_clean), chunk_size):
-        chunk_num = (i // chunk_size) + 1
-        total_chunks = (len(df_clean) // chunk_size) + 1
+    plan = None
+    if SYNC_MODE == "incremental":
+        # Envia apenas linhas novas/alteradas; as cópias antigas e as linhas que
+        # sumiram do CSV só são removidas depois da carga
+        plan = build_sync_plan(supabase_client, table_name, df_clean)
+        df_clean = plan['to_upsert']
         
-        chunk = df_clean[i:i + chunk_size]
+        if df_clean.empty:
+            apply_sync_deletes(supabase_client, table_name, plan)
+            print("✅ Nenhuma alteração a sincronizar - tabela já está atualizada")
+            return 0, 0
+    else:
+        # Grava o ROW_HASH já na carga completa para a próxima sincronização
+        # incremental; calculado antes de limpar a tabela, para que uma falha
+        # ao consultar a coluna não a deixe vazia
+        df_clean = add_row_hashes(supabase_client, table_name, df_clean)
         
+        # Limpa tabela
         try:
-            data_to_insert = chunk.to_dict(orient='records')
-            
-            # Limpa dados especiais
-            for record in data_to_insert:
-                for key, value in record.items():
-                    if isinstance(value, (np.integer, np.int64)):
-                        record[key] = int(value)
-                    elif isinstance(value, (np.floating, np.float64)):
-                        record[key] = float(value) if not np.isnan(value) else None
-                    elif pd.isna(value):
-                        record[key] = None
-            
-            # Upload
-            response = supabase_client.table(table_name).insert(data_to_insert).execute()
-            
-            successful += len(data_to_insert)
-            print(f"  📤 Lote {chunk_num}/{total_chunks}: ✅ {len(data_to_insert)} registros")
-            
-            time.sleep(0.2)  # Pausa pequena
-            
+            supabase_client.table(table_name).delete().neq('NUM_AUTO_INFRACAO', 'IMPOSSIBLE_VALUE').execute()
+            print("✅ Tabela limpa")
         except Exception as e:
-            failed += len(chunk)
-            print(f"  📤 Lote {chunk_num}/{total_chunks}: ❌ {str(e)[:60]}...")
-            
-            # Para no primeiro erro para debug
-            if chunk_num == 1:
-                print(f"🔍 Primeiro lote falhou - dados:")
-                print(f"    Colunas: {list(chunk.columns)}")
-                print(f"    Amostra: {chunk.iloc[0].to_dict()}")
-                break
+            print(f"⚠️ Aviso ao limpar: {e}")
+    
+    data_to_insert = dataframe_to_records(df_clean)
+    
+    # Upload paralelo com lote adaptativo
+    loader = SupabaseBulkLoader(
+        supabase_client, table_name,
+        max_workers=UPLOAD_WORKERS,
+        initial_batch_size=UPLOAD_BATCH_SIZE,
+        max_failed_batches=3,
+        key_column=KEY_COLUMN,
+    )
+    report = loader.load(data_to_insert)
     
-    return successful, failed
+    if plan is not None:
+        apply_sync_deletes(supabase_client, table_name, plan, failed_keys=report['failed_keys'])
+    
+    if report['errors']:
+        print(f"🔍 Primeiro erro: {report['errors'][0][:300]}")
+        print(f"    Colunas: {list(df_clean.columns)}")
+    
+    return report['successful'], report['failed']
 
 # --- 5. Execução principal ---
 def main():
@@ -229,6 +229,10 @@ def main():
         
         # 6. Relatório
         total = successful + failed
+        if total == 0 and SYNC_MODE == "incremental":
+            # Nada mudou desde a última execução
+            return 0
+        
         success_rate = (successful / total * 100) if total > 0 else 0
         
         print(f"\n{'='*50}")